@@ -1,316 +1,183 @@
 import streamlit as st
+from conexao import ConexaoPlanilha, criar_cliente
+from medicao import Medicao, gravar_log, medir
+from parsers import MOTORES, MOTOR_PADRAO
+from ingestao import processar_lote, resumo_codificacoes, WORKERS_PADRAO
+from cache import CacheLeitura
 import pandas as pd
-from bs4 import BeautifulSoup
-import gspread
-from google.oauth2.service_account import Credentials
-from datetime import datetime
-import re
-import unicodedata
+from armazem import ArmazemLocal
+from painel import METRICA_PADRAO, filtrar, preparar_painel
+from indicadores import NOMES_GRANULARIDADE, TABELAS_INDICADORES, particoes_periodo, ranking, recortar_periodo
+import rotina
+from rotina import ID_PLANILHA_MESTRA, montar_aproveitamento, montar_comissoes
+from registros import sem_texto_original
+from tarefas import CONCLUIDA, FALHOU, TIPO_GRAVACAO, TIPO_RECONSTRUCAO, TIPO_SINCRONIZACAO, FilaTarefas
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(page_title="Central de Relatórios WLM", layout="wide", page_icon="🔒")
-ID_PLANILHA_MESTRA = "1XibBlm2x46Dk5bf4JvfrMepD4gITdaOtTALSgaFcwV0"
 
 # --- AUXILIARES ---
-def remover_acentos(texto):
-    return ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
-
-def conectar_sheets():
-    scope = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-    credentials_dict = st.secrets["gcp_service_account"]
-    creds = Credentials.from_service_account_info(credentials_dict, scopes=scope)
-    client = gspread.authorize(creds)
-    return client
-
-def converter_br_para_float(valor):
-    """
-    Limpa o valor para garantir que seja processável como número.
-    Nota: A divisão por 100 ocorrerá APENAS na exportação final.
-    """
-    if pd.isna(valor) or valor == "": 
-        return 0.0
-    
-    if isinstance(valor, (int, float)): 
-        return float(valor)
-    
-    valor_str = str(valor).strip()
-    valor_str = valor_str.replace('\xa0', '').replace('R$', '').strip()
-
-    if not valor_str:
-        return 0.0
-
-    # Remove ponto de milhar se existir
-    if '.' in valor_str and ',' in valor_str: 
-        valor_str = valor_str.replace('.', '')
-    
-    # Troca vírgula por ponto para o Python entender
-    valor_str = valor_str.replace(',', '.')
-
-    try: 
-        return float(valor_str)
-    except: 
-        return 0.0
-
-def padronizar_data_quatro_digitos(data_str):
-    """
-    NOVA FUNÇÃO CRÍTICA:
-    Transforma '08/12/25' em '08/12/2025'.
-    Garante que as chaves de data sejam idênticas para o merge.
-    """
-    if pd.isna(data_str) or data_str == "":
-        return ""
-    
-    data_str = str(data_str).strip()
-    
-    # Verifica se tem barras
-    if '/' in data_str:
-        partes = data_str.split('/')
-        # Se tiver 3 partes (dia, mes, ano)
-        if len(partes) == 3:
-            dia, mes, ano = partes
-            # Se o ano tiver apenas 2 dígitos, adiciona '20' na frente
-            if len(ano) == 2:
-                ano = '20' + ano
-            
-            # Reconstrói a data padronizada com zeros à esquerda se precisar (ex: 8 vira 08)
-            return f"{dia.zfill(2)}/{mes.zfill(2)}/{ano}"
-            
-    return data_str
+# Cliente, planilha e abas são criados uma vez por servidor e reaproveitados (conexao.py).
+@st.cache_resource
+def obter_conexao():
+    return ConexaoPlanilha(lambda: criar_cliente(st.secrets["gcp_service_account"]))
+
+def abrir_planilha_mestra():
+    return obter_conexao().planilha(ID_PLANILHA_MESTRA)
+
+# Cada ação guarda sua medição (etapas + chamadas à API) para o painel "Performance".
+def registrar_medicao(medicao, onde=st):
+    st.session_state["ultima_acao_api"] = str(medicao)
+    historico = st.session_state.setdefault("medicoes", [])
+    historico.append(medicao.como_dict())
+    del historico[:-10]
+    if st.session_state.get("log_desempenho"): gravar_log(medicao)
+    if onde is not None: onde.caption(f"🔌 {medicao}")
+
+# A senha só é relida da aba Config a cada 5 minutos, não a cada rerun.
+@st.cache_data(ttl=300, show_spinner=False)
+def ler_senha_config():
+    sh = abrir_planilha_mestra()
+    try: return sh.worksheet("Config").acell('B1').value
+    except: return 'admin'
 
 def verificar_acesso():
-    try:
-        client = conectar_sheets()
-        sh = client.open_by_key(ID_PLANILHA_MESTRA)
-        try: return sh.worksheet("Config").acell('B1').value
-        except: return 'admin'
+    try: return ler_senha_config()
     except: return None
 
 # --- PARSERS (LEITURA) ---
-def parse_comissoes(arquivos):
-    dados = []
-    for arquivo in arquivos:
-        try:
-            arquivo.seek(0)
-            try: conteudo = arquivo.read().decode("utf-8")
-            except: 
-                arquivo.seek(0)
-                conteudo = arquivo.read().decode("latin-1")
-            
-            soup = BeautifulSoup(conteudo, "html.parser")
-            texto_completo = soup.get_text(separator=" ", strip=True)
-            match_data = re.search(r"até\s+(\d{2}/\d{2}/\d{4})", texto_completo, re.IGNORECASE)
-            data_relatorio = match_data.group(1) if match_data else datetime.now().strftime("%d/%m/%Y")
-            
-            tecnico_atual = None
-            for linha in soup.find_all("tr"):
-                texto_linha = linha.get_text(separator=" ", strip=True).upper()
-                if "TOTAL DA FILIAL" in texto_linha or "TOTAL DA EMPRESA" in texto_linha: break
-                
-                if "TOTAL DO FUNCIONARIO" in texto_linha:
-                    try: tecnico_atual = texto_linha.split("TOTAL DO FUNCIONARIO")[1].replace(":", "").strip().split()[0]
-                    except: continue 
-                
-                if tecnico_atual and "HORAS VENDIDAS:" in texto_linha:
-                    celulas = linha.find_all("td")
-                    for celula in celulas:
-                        txt = celula.get_text(strip=True).upper()
-                        if "HORAS" in txt and any(c.isdigit() for c in txt) and "VENDIDAS" not in txt:
-                            valor_limpo = txt.replace("HORAS", "").strip()
-                            dados.append([data_relatorio, arquivo.name, tecnico_atual, valor_limpo])
-                            break 
-        except Exception as e: st.error(f"Erro no arquivo {arquivo.name}: {e}")
-    return dados
-
-def parse_aproveitamento(arquivos):
-    dados = []
-    for arquivo in arquivos:
-        try:
-            arquivo.seek(0)
-            try: conteudo = arquivo.read().decode("utf-8")
-            except:
-                try: conteudo = arquivo.read().decode("latin-1")
-                except: conteudo = arquivo.read().decode("utf-16")
-            
-            soup = BeautifulSoup(conteudo, "html.parser")
-            tecnico_atual_aprov = None
-            linhas = soup.find_all("tr")
-            for linha in linhas:
-                texto_original = linha.get_text(separator=" ", strip=True).upper()
-                texto_limpo = remover_acentos(texto_original)
-                
-                if "TOTAL FILIAL:" in texto_original: break
-                if "MECANICO" in texto_limpo and "TOT.MEC" not in texto_limpo:
-                    try:
-                        parte_direita = texto_limpo.split("MECANICO")[1].replace(":", "").strip()
-                        if "-" in parte_direita: tecnico_atual_aprov = parte_direita.split("-")[0].strip()
-                        else: tecnico_atual_aprov = parte_direita.split()[0]
-                    except: continue
-                
-                if "TOT.MEC.:" in texto_original: tecnico_atual_aprov = None; continue
-                
-                if tecnico_atual_aprov:
-                    celulas = linha.find_all("td")
-                    if not celulas: continue
-                    txt_cel0 = celulas[0].get_text(strip=True)
-                    if re.match(r"\d{2}/\d{2}/\d{2}", txt_cel0):
-                        try:
-                            if len(celulas) >= 4:
-                                dados.append([
-                                    txt_cel0.split()[0], 
-                                    arquivo.name, 
-                                    tecnico_atual_aprov, 
-                                    celulas[1].get_text(strip=True), 
-                                    celulas[2].get_text(strip=True), 
-                                    celulas[3].get_text(strip=True)
-                                ])
-                        except: continue
-        except Exception as e: st.error(f"Erro no arquivo {arquivo.name}: {e}")
-    return dados
-
-# --- GRAVAÇÃO ---
-def atualizar_planilha_preservando_formato(sh, nome_aba, df_final):
-    try:
-        ws = sh.worksheet(nome_aba)
-    except:
-        ws = sh.add_worksheet(title=nome_aba, rows=2000, cols=20)
-
-    if not ws.get_all_values():
-        ws.update('A1', [df_final.columns.values.tolist()])
-        try: ws.format('A1:Z1', {'textFormat': {'bold': True}})
-        except: pass
-
-    ws.batch_clear(["A2:Z10000"])
-    
-    # Preenche vazios com 0.0
-    df_final = df_final.fillna(0.0)
-    
-    dados_para_enviar = df_final.values.tolist()
-    if dados_para_enviar:
-        ws.update('A2', dados_para_enviar)
-        
-    return True
-
-# --- UPSERT ---
-def salvar_com_upsert(nome_aba, novos_dados_df, colunas_chaves):
-    client = conectar_sheets()
-    sh = client.open_by_key(ID_PLANILHA_MESTRA)
-    
-    try:
-        ws = sh.worksheet(nome_aba)
-        dados_antigos = ws.get_all_records()
-        df_antigo = pd.DataFrame(dados_antigos)
-    except:
-        df_antigo = pd.DataFrame()
-
-    if not df_antigo.empty:
-        for col in df_antigo.columns: df_antigo[col] = df_antigo[col].astype(str)
-    for col in novos_dados_df.columns: novos_dados_df[col] = novos_dados_df[col].astype(str)
-
-    df_total = pd.concat([df_antigo, novos_dados_df])
-    df_final = df_total.drop_duplicates(subset=colunas_chaves, keep='last')
-    
-    atualizar_planilha_preservando_formato(sh, nome_aba, df_final)
-    return len(df_final)
-
-# --- UNIFICAÇÃO (COM PADRONIZAÇÃO DE DATA + CORREÇÃO /100) ---
-def processar_unificacao():
-    try:
-        client = conectar_sheets()
-        sh = client.open_by_key(ID_PLANILHA_MESTRA)
-        ws_com = sh.worksheet("Comissoes")
-        ws_aprov = sh.worksheet("Aproveitamento")
-
-        dados_com = ws_com.get_all_records()
-        dados_aprov = ws_aprov.get_all_records()
-
-        if not dados_com or not dados_aprov: return False
-
-        df_com = pd.DataFrame(dados_com)
-        df_aprov = pd.DataFrame(dados_aprov)
-
-        # Limpeza e Padronização
-        df_com.columns = [c.strip() for c in df_com.columns]
-        df_aprov.columns = [c.strip() for c in df_aprov.columns]
-        renomear_comissao = {"Data Processamento": "Data", "Sigla Técnico": "Técnico"}
-        df_com.rename(columns=renomear_comissao, inplace=True)
-
-        cols_com = ['Data', 'Técnico', 'Horas Vendidas']
-        df_com = df_com[[c for c in cols_com if c in df_com.columns]]
-        cols_aprov = ['Data', 'Técnico', 'Disp', 'TP', 'TG']
-        df_aprov = df_aprov[[c for c in cols_aprov if c in df_aprov.columns]]
-
-        # --- APLICA A CORREÇÃO DE DATA AQUI ---
-        # Antes de fazer o Merge, garantimos que "25" vira "2025"
-        if 'Data' in df_com.columns:
-            df_com['Data'] = df_com['Data'].apply(padronizar_data_quatro_digitos)
-        
-        if 'Data' in df_aprov.columns:
-            df_aprov['Data'] = df_aprov['Data'].apply(padronizar_data_quatro_digitos)
-
-        # Conversão Numérica Inicial
-        cols_numericas = ['Horas Vendidas', 'Disp', 'TP', 'TG']
-        for col in cols_numericas:
-            if col in df_com.columns: df_com[col] = df_com[col].apply(converter_br_para_float)
-            if col in df_aprov.columns: df_aprov[col] = df_aprov[col].apply(converter_br_para_float)
-
-        # Merge
-        df_com['Key_D'] = df_com['Data'].astype(str)
-        df_com['Key_T'] = df_com['Técnico'].astype(str)
-        df_aprov['Key_D'] = df_aprov['Data'].astype(str)
-        df_aprov['Key_T'] = df_aprov['Técnico'].astype(str)
-
-        df_final = pd.merge(
-            df_com, df_aprov, 
-            left_on=['Key_D', 'Key_T'], right_on=['Key_D', 'Key_T'], 
-            how='outer', suffixes=('_C', '_A')
+# A extração em si fica em parsers.py e roda em processos separados (ingestao.py).
+@st.cache_resource
+def obter_cache_leitura():
+    return CacheLeitura()
+
+# Arquivos já gravados (índice no armazém) e repetidos no envio nem são lidos.
+def ler_uploads(tipo, arquivos, motor=MOTOR_PADRAO, workers=WORKERS_PADRAO):
+    # Sem a planilha (disco vazio e sem rede), vale o índice local.
+    try: armazem = preparar_armazem()
+    except Exception: armazem = obter_armazem()
+    conhecidos = armazem.arquivos_conhecidos(tipo)
+    with medir(f"Leitura {tipo}") as medicao:
+        lote = processar_lote(
+            tipo, [(arquivo.name, arquivo.getvalue()) for arquivo in arquivos], motor, workers, obter_cache_leitura(), conhecidos,
         )
-        df_final.fillna(0.0, inplace=True)
-        
-        # Consolidar Chaves (Data e Técnico)
-        df_final['Data'] = df_final.apply(lambda x: x['Data_C'] if x['Data_C'] != 0 and str(x['Data_C']) != "0" else x['Data_A'], axis=1)
-        df_final['Técnico'] = df_final.apply(lambda x: x['Técnico_C'] if x['Técnico_C'] != 0 and str(x['Técnico_C']) != "0" else x['Técnico_A'], axis=1)
-
-        cols_finais = ['Data', 'Técnico', 'Horas Vendidas', 'Disp', 'TP', 'TG']
-        df_final = df_final[[c for c in cols_finais if c in df_final.columns]]
-
-        # --- A REGRA DE OURO (CORREÇÃO DECIMAL) ---
-        # Divide todas as colunas numéricas por 100 antes de salvar no Consolidado.
-        for col in ['Horas Vendidas', 'Disp', 'TP', 'TG']:
-             if col in df_final.columns:
-                 df_final[col] = df_final[col] / 100.0
-
-        atualizar_planilha_preservando_formato(sh, "Consolidado", df_final)
-        return True
-    except Exception as e:
-        print(f"Erro unificação: {e}")
-        return False
-
-# --- ROTINA MESTRA ---
-def executar_rotina_global(df_com=None, df_aprov=None):
-    status_msg = st.empty()
-    bar = st.progress(0)
-    try:
-        if df_com is not None and not df_com.empty:
-            status_msg.info("💾 Salvando Comissões...")
-            salvar_com_upsert("Comissoes", df_com, ["Data Processamento", "Sigla Técnico"])
-            bar.progress(40)
-        
-        if df_aprov is not None and not df_aprov.empty:
-            status_msg.info("💾 Salvando Aproveitamento...")
-            salvar_com_upsert("Aproveitamento", df_aprov, ["Data", "Técnico"])
-            bar.progress(70)
-            
-        status_msg.info("🔄 Unificando bases e Padronizando Datas...")
-        sucesso = processar_unificacao()
-        bar.progress(100)
-        
-        if sucesso:
-            status_msg.success("✅ Sucesso! Dados Consolidados, Datas Alinhadas e Valores Corrigidos.")
-            st.balloons()
-        else:
-            status_msg.warning("⚠️ Salvo, mas erro na unificação.")
-            
-    except Exception as e: status_msg.error(f"Erro: {e}")
+    mostrar_conhecidos(lote)
+    for nome, erro in lote.erros: st.error(f"Erro no arquivo {nome}: {erro}")
+    st.caption(f"Cache de leitura: {lote.acertos_cache} reaproveitado(s), {lote.falhas_cache} lido(s) agora")
+    codificacoes = resumo_codificacoes(lote.codificacoes)
+    if codificacoes: st.caption(f"Codificação detectada: {codificacoes}")
+    # Reruns que só reaproveitam o cache não entram no histórico.
+    if lote.falhas_cache: registrar_medicao(medicao, onde=None)
+    return lote.tabela, lote.arquivos
+
+def mostrar_conhecidos(lote):
+    if not (lote.conhecidos or lote.repetidos): return
+    linhas = [
+        f"- **{nome}**: já importado em {registro['Importado em']}"
+        + (f" como {registro['Arquivo']}" if registro["Arquivo"] != nome else "")
+        + (f" (até {registro['Data Relatório']}, {registro['Linhas']} linha(s))" if registro["Data Relatório"] else f" ({registro['Linhas']} linha(s))")
+        for nome, registro in lote.conhecidos
+    ] + [f"- **{nome}**: igual a {original} neste envio" for nome, original in lote.repetidos]
+    st.info(f"⏭️ {len(linhas)} arquivo(s) ignorado(s):\n" + "\n".join(linhas))
+
+def parse_comissoes(arquivos, motor=MOTOR_PADRAO, workers=WORKERS_PADRAO):
+    return ler_uploads("comissoes", arquivos, motor, workers)
+
+def parse_aproveitamento(arquivos, motor=MOTOR_PADRAO, workers=WORKERS_PADRAO):
+    return ler_uploads("aproveitamento", arquivos, motor, workers)
+
+# As leituras já vêm tipadas (registros.py): as datas só são formatadas na tela.
+def mostrar_previa(df):
+    formato_data = {col: st.column_config.DateColumn(format="DD/MM/YYYY") for col in ("Data", "Data Processamento") if col in df.columns}
+    st.dataframe(sem_texto_original(df), height=200, column_config=formato_data)
+
+# --- ARMAZÉM LOCAL ---
+# Base de verdade em Parquet (armazem.py); a Planilha Mestra recebe só as diferenças.
+@st.cache_resource
+def obter_armazem():
+    return ArmazemLocal()
+
+@st.cache_resource
+def tabelas_importadas():
+    return set()
+
+def preparar_armazem():
+    return rotina.preparar_armazem(obter_armazem(), abrir_planilha_mestra, tabelas_importadas())
+
+# --- PAINEL ---
+# Só lê as partições (meses) escolhidas; a chave inclui a versão delas no armazém,
+# então uma gravação nesses meses gera um cache novo.
+@st.cache_data(ttl=600, show_spinner=False)
+def carregar_painel(meses, versao_consolidado):
+    return preparar_painel(obter_armazem().ler("Consolidado", list(meses)))
+
+# Indicadores já agregados pela unificação (indicadores.py): só leitura das partições.
+# Semanas que começam no mês anterior e terminam nos escolhidos também entram.
+@st.cache_data(ttl=600, show_spinner=False)
+def carregar_indicadores(granularidade, meses, versao):
+    df = obter_armazem().ler(TABELAS_INDICADORES[granularidade], particoes_periodo(granularidade, meses))
+    return recortar_periodo(df, granularidade, meses)
+
+def versao_indicadores(armazem, granularidade, meses):
+    return armazem.versao(TABELAS_INDICADORES[granularidade], particoes_periodo(granularidade, meses))
+
+FORMATO_INDICADORES = {
+    "Período": st.column_config.DateColumn(format="DD/MM/YYYY"),
+    "Eficiência": st.column_config.NumberColumn(format="percent"),
+    "Produtividade": st.column_config.NumberColumn(format="percent"),
+}
+
+def formatar_mes(mes):
+    return f"{mes[5:]}/{mes[:4]}"
+
+# --- ROTINA MESTRA (EM SEGUNDO PLANO) ---
+# Upsert -> unificação -> sincronização ficam em rotina.py (o mesmo caminho do cli.py)
+# e rodam na thread da fila (tarefas.py): o botão só enfileira, a tela acompanha.
+@st.cache_resource
+def obter_fila():
+    fila = FilaTarefas()
+    armazem, importadas, conexao = obter_armazem(), tabelas_importadas(), obter_conexao()
+    fila.iniciar(
+        lambda: rotina.preparar_armazem(armazem, lambda: conexao.planilha(ID_PLANILHA_MESTRA), importadas),
+        lambda: conexao.planilha(ID_PLANILHA_MESTRA),
+    )
+    return fila
+
+def enfileirar(tipo, df_com=None, df_aprov=None, arquivos=None):
+    tarefa_id = obter_fila().enviar(tipo, df_com, df_aprov, arquivos)
+    st.session_state.setdefault("tarefas", []).append(tarefa_id)
+    return tarefa_id
+
+MENSAGENS_CONCLUSAO = {
+    TIPO_GRAVACAO: "✅ Sucesso! Dados Consolidados, Datas Alinhadas e Valores Corrigidos.",
+    TIPO_RECONSTRUCAO: "Consolidado reconstruído.",
+    TIPO_SINCRONIZACAO: "Planilha Mestra sincronizada.",
+}
+
+def acompanhar_tarefas():
+    fila = obter_fila()
+    minhas = st.session_state.setdefault("tarefas", [])
+    for tarefa in fila.listar(limite=5):
+        if tarefa.ativa:
+            st.progress(tarefa.percentual, text=f"#{tarefa.id} {tarefa.nome}: {tarefa.mensagem}")
+        elif tarefa.estado == FALHOU:
+            col_msg, col_repetir = st.columns([4, 1])
+            col_msg.warning(f"⚠️ #{tarefa.id} {tarefa.nome} falhou: {tarefa.erro}")
+            # Repetir retoma da etapa que falhou (as concluídas ficam registradas na tarefa).
+            if col_repetir.button("🔁 Repetir", key=f"repetir_{tarefa.id}") and fila.repetir(tarefa.id):
+                if tarefa.id not in minhas: minhas.append(tarefa.id)
+                st.rerun()
+
+    # Tarefas desta sessão que terminaram: aviso final e medição no painel "Performance".
+    terminadas = [t for t in (fila.buscar(tarefa_id) for tarefa_id in minhas) if t is not None and not t.ativa]
+    for tarefa in terminadas:
+        minhas.remove(tarefa.id)
+        if tarefa.medicao: registrar_medicao(Medicao.de_dict(tarefa.medicao), onde=None)
+        if tarefa.estado == CONCLUIDA: st.session_state["aviso_tarefa"] = tarefa.tipo
+    if terminadas:
+        carregar_painel.clear()
+        carregar_indicadores.clear()
+        st.rerun()
 
 # --- INTERFACE ---
 st.sidebar.title("Login Seguro")
@@ -318,36 +185,64 @@ senha = st.sidebar.text_input("Senha:", type="password")
 
 if senha == verificar_acesso():
     st.sidebar.success("Acesso Liberado")
+    # "bs4" é o leitor antigo, mantido para comparar resultados com o "stream".
+    motor_leitura = st.sidebar.radio("Motor de leitura", MOTORES, index=MOTORES.index(MOTOR_PADRAO))
+    cache_leitura = obter_cache_leitura()
+    st.sidebar.caption(f"Cache de leitura (sessão do servidor): {cache_leitura.acertos} acertos / {cache_leitura.falhas} falhas")
+    workers_leitura = st.sidebar.number_input("Processos de leitura", min_value=1, max_value=max(WORKERS_PADRAO, 1), value=WORKERS_PADRAO)
+    pendencias = obter_armazem().pendencias()
+    if pendencias:
+        st.sidebar.caption("Pendente de envio: " + ", ".join(f"{t} ({'tudo' if n is None else n})" for t, n in pendencias.items()))
+        if st.sidebar.button("☁️ Sincronizar pendências"):
+            st.sidebar.info(f"Sincronização enfileirada (tarefa #{enfileirar(TIPO_SINCRONIZACAO)}).")
+    if "ultima_acao_api" in st.session_state:
+        st.sidebar.caption(f"Última ação: {st.session_state['ultima_acao_api']}")
+    st.sidebar.checkbox("Gravar log de desempenho", key="log_desempenho", help="Acrescenta cada medição em .cache/desempenho.jsonl")
     st.title("🏭 Central de Processamento WLM")
     
     aba1, aba2 = st.tabs(["💰 Comissões", "⚙️ Aproveitamento"])
     df_comissao_global = None
     df_aprov_global = None
+    arquivos_novos = []
 
     with aba1:
         st.header("Upload Comissões")
         files_com = st.file_uploader("Arquivos HTML", accept_multiple_files=True, key="up_com")
         if files_com:
-            dados_c = parse_comissoes(files_com)
-            if dados_c:
-                df_comissao_global = pd.DataFrame(dados_c, columns=["Data Processamento", "Nome do Arquivo", "Sigla Técnico", "Horas Vendidas"])
-                st.dataframe(df_comissao_global, height=200)
+            dados_c, arquivos_c = parse_comissoes(files_com, motor_leitura, workers_leitura)
+            arquivos_novos.append(arquivos_c)
+            if len(dados_c):
+                df_comissao_global = montar_comissoes(dados_c)
+                mostrar_previa(df_comissao_global)
 
     with aba2:
         st.header("Upload Aproveitamento")
         files_aprov = st.file_uploader("Arquivos HTML/SLK", accept_multiple_files=True, key="up_aprov")
         if files_aprov:
-            dados_a = parse_aproveitamento(files_aprov)
-            if dados_a:
-                df_aprov_global = pd.DataFrame(dados_a, columns=["Data", "Arquivo", "Técnico", "Disp", "TP", "TG"])
-                st.dataframe(df_aprov_global, height=200)
+            dados_a, arquivos_a = parse_aproveitamento(files_aprov, motor_leitura, workers_leitura)
+            arquivos_novos.append(arquivos_a)
+            if len(dados_a):
+                df_aprov_global = montar_aproveitamento(dados_a)
+                mostrar_previa(df_aprov_global)
 
     st.divider()
     col_btn, col_txt = st.columns([1, 4])
     with col_btn:
         if st.button("🚀 GRAVAR TUDO E ATUALIZAR", type="primary"):
-            if df_comissao_global is None and df_aprov_global is None: st.warning("Sem arquivos.")
-            else: executar_rotina_global(df_comissao_global, df_aprov_global)
+            # Só arquivos já importados: nada a gravar, nenhuma escrita na planilha.
+            if df_comissao_global is None and df_aprov_global is None: st.warning("Sem arquivos novos.")
+            else: enfileirar(TIPO_GRAVACAO, df_comissao_global, df_aprov_global, pd.concat(arquivos_novos, ignore_index=True))
+    with col_txt:
+        # Reparo: recalcula o Consolidado inteiro a partir das abas de origem.
+        if st.button("🛠️ Reconstruir Consolidado completo"): enfileirar(TIPO_RECONSTRUCAO)
+
+    if "aviso_tarefa" in st.session_state:
+        tipo_concluido = st.session_state.pop("aviso_tarefa")
+        st.success(MENSAGENS_CONCLUSAO.get(tipo_concluido, "Concluído."))
+        if tipo_concluido == TIPO_GRAVACAO: st.balloons()
+    # Só fica consultando a fila (a cada 2s) enquanto houver tarefa rodando ou desta sessão.
+    em_andamento = bool(st.session_state.get("tarefas")) or bool(obter_fila().ativas())
+    st.fragment(run_every=2 if em_andamento else None)(acompanhar_tarefas)()
 
     # --- NOVO BLOCO: VISUALIZAÇÃO CORRIGIDA ---
     st.divider()
@@ -356,48 +251,64 @@ if senha == verificar_acesso():
     # Checkbox para carregar apenas quando necessário (economiza tempo)
     if st.checkbox("Carregar Visualização da Planilha Mestra", value=True):
         try:
-            client_viz = conectar_sheets()
-            sh_viz = client_viz.open_by_key(ID_PLANILHA_MESTRA)
-            ws_cons = sh_viz.worksheet("Consolidado")
-            dados_cons = ws_cons.get_all_records()
-
-            if dados_cons:
-                df_viz = pd.DataFrame(dados_cons)
-                
-                # VERIFICAÇÃO E CORREÇÃO DE EXIBIÇÃO
-                if 'Data' in df_viz.columns and 'Técnico' in df_viz.columns:
-                    
-                    # 1. Converter Data Texto para Data Real (Ordenação)
-                    # dayfirst=True é vital para ler 10/12 como 10 de Dezembro
-                    df_viz['Data'] = pd.to_datetime(df_viz['Data'], dayfirst=True, errors='coerce')
-                    
-                    # 2. Criar a Pivot Table (Tabela Dinâmica)
-                    # Ajuste 'TP' para 'Horas Vendidas' ou 'TG' se quiser ver outro dado
-                    val_col = 'TP' if 'TP' in df_viz.columns else df_viz.columns[2]
-                    
-                    df_pivot = df_viz.pivot_table(
-                        index='Técnico', 
-                        columns='Data', 
-                        values=val_col, 
-                        aggfunc='sum', 
-                        fill_value=0
-                    )
-                    
-                    # 3. Ordenar Cronologicamente as Colunas (Datas)
-                    df_pivot = df_pivot.sort_index(axis=1)
-                    
-                    # 4. Formatar Cabeçalho para "dd/mm" (Resolve colunas largas)
-                    df_pivot.columns = df_pivot.columns.strftime('%d/%m')
-                    
-                    # 5. Exibir limpo (Sem cores, sem st.style)
-                    st.write(f"Visualizando: **{val_col}**")
-                    st.dataframe(df_pivot, use_container_width=True)
-                else:
-                    st.warning("Colunas 'Data' e 'Técnico' necessárias para visualização.")
-            else:
+            # Pivots prontos em cache (painel.py); filtros só recortam, sem chamada à API.
+            armazem = preparar_armazem()
+            meses_disponiveis = armazem.meses("Consolidado")
+            meses = meses_disponiveis[-1:]
+            if len(meses_disponiveis) > 1:
+                # Um mês ou um intervalo: só essas partições são lidas (padrão: o mês mais recente).
+                mes_inicio, mes_fim = st.select_slider(
+                    "Meses", options=meses_disponiveis, value=(meses_disponiveis[-1], meses_disponiveis[-1]), format_func=formatar_mes,
+                )
+                meses = meses_disponiveis[meses_disponiveis.index(mes_inicio):meses_disponiveis.index(mes_fim) + 1]
+            dados_painel = carregar_painel(tuple(meses), armazem.versao("Consolidado", meses))
+
+            if dados_painel is None:
+                st.warning("Colunas 'Data' e 'Técnico' necessárias para visualização.")
+            elif not dados_painel.tecnicos:
                 st.info("Planilha 'Consolidado' está vazia.")
+            else:
+                metricas = list(dados_painel.pivots)
+                col_met, col_per, col_tec = st.columns([1, 2, 3])
+                val_col = col_met.selectbox("Métrica", metricas, index=metricas.index(METRICA_PADRAO) if METRICA_PADRAO in metricas else 0)
+                periodo = col_per.date_input(
+                    "Período", value=(dados_painel.data_min, dados_painel.data_max),
+                    min_value=dados_painel.data_min, max_value=dados_painel.data_max,
+                ) if dados_painel.data_min else ()
+                tecnicos = col_tec.multiselect("Técnicos", dados_painel.tecnicos)
+
+                inicio, fim = (tuple(periodo) + (None, None))[:2] if isinstance(periodo, (tuple, list)) else (periodo, periodo)
+                df_pivot = filtrar(dados_painel, val_col, inicio, fim or inicio, tecnicos)
+
+                # Exibir limpo (Sem cores, sem st.style)
+                st.write(f"Visualizando: **{val_col}**")
+                st.dataframe(df_pivot, use_container_width=True)
+
+                # Ranking dos meses escolhidos: soma das linhas mensais prontas, razões refeitas sobre as somas.
+                st.subheader("🏆 Indicadores por técnico")
+                df_mes = carregar_indicadores("mes", tuple(meses), versao_indicadores(armazem, "mes", meses))
+                st.caption("Eficiência = TP / TG · Produtividade = TP / Disp")
+                st.dataframe(ranking(df_mes, tecnicos), use_container_width=True, column_config=FORMATO_INDICADORES)
+
+                granularidade = st.radio(
+                    "Por período", list(NOMES_GRANULARIDADE), format_func=NOMES_GRANULARIDADE.get, horizontal=True, index=1,
+                )
+                if granularidade == "semana":
+                    st.caption("Cada semana (de segunda a domingo) aparece em todos os meses que toca.")
+                df_periodo = carregar_indicadores(granularidade, tuple(meses), versao_indicadores(armazem, granularidade, meses))
+                if tecnicos and not df_periodo.empty: df_periodo = df_periodo[df_periodo["Técnico"].isin(tecnicos)]
+                st.dataframe(df_periodo, use_container_width=True, hide_index=True, column_config=FORMATO_INDICADORES)
         except Exception as e:
             st.error(f"Erro ao carregar visualização: {e}")
 
+    # --- PERFORMANCE ---
+    # Últimas medições desta sessão: tempo por etapa e chamadas à API com tamanho do payload.
+    if st.session_state.get("medicoes"):
+        with st.expander("⏱️ Performance"):
+            for registro in reversed(st.session_state["medicoes"]):
+                st.markdown(f"**{registro['nome']}** · {registro['inicio']} · {registro['segundos']:.2f}s")
+                if registro["etapas"]: st.dataframe(registro["etapas"], use_container_width=True)
+                if registro["api"]: st.dataframe(registro["api"], use_container_width=True)
+
 else:
     if senha: st.error("Senha incorreta.")
@@ -0,0 +1,523 @@
+"""
+Armazém local (Parquet particionado por mês) das abas Comissoes,
+Aproveitamento e Consolidado.
+
+O armazém é a base de verdade: gravações e leituras (unificação, painel)
+acontecem aqui, em disco local. A Planilha Mestra vira destino de
+sincronização: cada gravação anota como pendentes as linhas novas ou com
+algum valor diferente do já guardado, e sincronizar() envia só essas
+linhas para o Google Sheets.
+
+Na planilha, cada partição tem a sua aba (Comissoes_2025_12,
+Consolidado_2025_12, ..., Comissoes_sem_data): uma sincronização só lê e
+escreve as abas dos meses que mudaram. As abas únicas antigas (Comissoes,
+Aproveitamento, Consolidado) só são lidas na importação; na primeira
+sincronização que der certo depois dela, cada uma é renomeada para
+"<Tabela> (antiga)" (as linhas já estão no armazém e nas abas por mês) e
+deixa de ser lida ou escrita. Apagá-la fica a critério de quem usa a planilha.
+
+As tabelas de indicadores (indicadores.py) ficam só aqui: não têm aba na
+planilha nem pendências, e podem ser recalculadas a partir do Consolidado.
+
+O índice de arquivos (_Arquivos) guarda um registro por relatório já
+gravado (tipo, SHA-256, data do relatório, linhas, quando): a leitura pula
+os arquivos conhecidos. Ele vai para uma aba oculta da planilha, de onde é
+importado se o disco do servidor começar vazio.
+
+Comissoes e Aproveitamento ficam tipados (registros.py: datas, categorias
+e números); só o envio para a planilha os formata como texto. Partições
+gravadas como texto por versões anteriores são convertidas uma vez, ao
+abrir o armazém, e as abas correspondentes são reenviadas.
+
+Layout em disco:
+    .dados/<Tabela>/mes=AAAA-MM/dados.parquet
+    .dados/<Tabela>/_pendente.parquet   linhas ainda não enviadas
+    .dados/<Tabela>/_reescrever         marca reenvio completo das abas (lista os meses
+                                        que deixaram de existir, cujas abas são limpas)
+    .dados/<Tabela>/_formato            versão do formato das partições
+    .dados/<Tabela>/_importada          a tabela já foi importada da planilha (sem
+                                        ela, não há reenvio completo das abas)
+    .dados/_Arquivos/dados.parquet      índice de arquivos (sem partição)
+    .dados/_Arquivos/_pendente.parquet  registros ainda não enviados à aba oculta
+"""
+import os
+import re
+import shutil
+import threading
+import time
+
+import pandas as pd
+from gspread.utils import numericise_all
+
+from indicadores import CHAVES_INDICADORES, TABELAS_INDICADORES
+from medicao import etapa
+from normalizacao import padronizar_datas_serie
+from registros import ESQUEMAS, chaves_texto, para_texto, tipar
+from planilha import (
+    EscritorPlanilha,
+    atualizar_planilha_preservando_formato,
+    obter_ou_criar_aba,
+    obter_ou_criar_aba_oculta,
+    upsert_incremental,
+)
+
+DIRETORIO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".dados")
+PARTICAO_SEM_DATA = "sem-data"
+# 2: Comissoes/Aproveitamento tipados (até a 1, tudo texto).
+VERSAO_FORMATO = 2
+
+# Tabela -> (coluna de data usada na partição, colunas-chave, gravar como texto na planilha)
+TABELAS = {
+    "Comissoes": ("Data Processamento", ["Data Processamento", "Sigla Técnico"], True),
+    "Aproveitamento": ("Data", ["Data", "Técnico"], True),
+    "Consolidado": ("Data", ["Data", "Técnico"], False),
+}
+# Tabelas só do armazém (sem aba, nunca sincronizadas), no mesmo formato de TABELAS.
+TABELAS_LOCAIS = {tabela: ("Período", CHAVES_INDICADORES, None) for tabela in TABELAS_INDICADORES.values()}
+COLUNAS_TEXTO_CONSOLIDADO = ["Data", "Técnico"]
+# Índice dos relatórios já gravados, um registro por (tipo, SHA-256 do conteúdo).
+ABA_ARQUIVOS = "_Arquivos"
+CHAVES_ARQUIVOS = ["Tipo", "Hash"]
+COLUNAS_ARQUIVOS = CHAVES_ARQUIVOS + ["Arquivo", "Data Relatório", "Linhas", "Importado em"]
+FORMATO_IMPORTADO_EM = "%d/%m/%Y %H:%M:%S"
+SUFIXO_ABA_ANTIGA = " (antiga)"
+_ABA_DE_PARTICAO = re.compile(r"(?P<tabela>.+)_(?P<particao>\d{4}_\d{2}|sem_data)")
+
+
+def _definicao(tabela):
+    return TABELAS[tabela] if tabela in TABELAS else TABELAS_LOCAIS[tabela]
+
+
+def mes_da_data(datas):
+    """'08/12/25' (ou a data tipada) -> '2025-12'; datas fora do padrão dd/mm/aaaa vão para a partição sem-data."""
+    if pd.api.types.is_datetime64_any_dtype(datas.dtype):
+        return pd.Series(datas.dt.strftime("%Y-%m"), index=datas.index, dtype=object).fillna(PARTICAO_SEM_DATA)
+    padronizadas = padronizar_datas_serie(datas).astype(str)
+    partes = padronizadas.str.extract(r"^\d{2}/(\d{2})/(\d{4})$")
+    meses = partes[1] + "-" + partes[0]
+    return meses.where(partes[0].notna(), PARTICAO_SEM_DATA)
+
+
+def aba_da_particao(tabela, mes):
+    """('Comissoes', '2025-12') -> 'Comissoes_2025_12'; a partição sem-data vai para 'Comissoes_sem_data'."""
+    return f"{tabela}_{mes.replace('-', '_')}"
+
+
+def particao_da_aba(tabela, titulo):
+    """Inverso de aba_da_particao; None se a aba não for uma partição da tabela."""
+    encontrado = _ABA_DE_PARTICAO.fullmatch(titulo)
+    if encontrado is None or encontrado["tabela"] != tabela: return None
+    return encontrado["particao"].replace("_", "-")
+
+
+class ArmazemLocal:
+    def __init__(self, diretorio=DIRETORIO_PADRAO):
+        self.diretorio = diretorio
+        self._trava = threading.RLock()
+        os.makedirs(diretorio, exist_ok=True)
+        for tabela in TABELAS:
+            if tabela.lower() in ESQUEMAS: self._migrar(tabela)
+
+    # --- CAMINHOS ---
+    def _pasta(self, tabela):
+        return os.path.join(self.diretorio, tabela)
+
+    def _arquivo_particao(self, tabela, mes):
+        return os.path.join(self._pasta(tabela), f"mes={mes}", "dados.parquet")
+
+    def _arquivo_pendente(self, tabela):
+        return os.path.join(self._pasta(tabela), "_pendente.parquet")
+
+    def _marca_reescrever(self, tabela):
+        return os.path.join(self._pasta(tabela), "_reescrever")
+
+    def _arquivo_formato(self, tabela):
+        return os.path.join(self._pasta(tabela), "_formato")
+
+    def _marca_importada(self, tabela):
+        return os.path.join(self._pasta(tabela), "_importada")
+
+    def importada(self, tabela):
+        """True depois da importação da planilha (mesmo que ela não tivesse linhas)."""
+        return os.path.exists(self._marca_importada(tabela))
+
+    def _marcar_importada(self, tabela):
+        os.makedirs(self._pasta(tabela), exist_ok=True)
+        with open(self._marca_importada(tabela), "w"): pass
+
+    def particoes(self, tabela):
+        pasta = self._pasta(tabela)
+        if not os.path.isdir(pasta): return []
+        return sorted(p[len("mes="):] for p in os.listdir(pasta) if p.startswith("mes="))
+
+    def meses(self, tabela):
+        """Partições com data (AAAA-MM), em ordem; sem a sem-data."""
+        return [mes for mes in self.particoes(tabela) if mes != PARTICAO_SEM_DATA]
+
+    def vazio(self, tabela):
+        return not self.particoes(tabela)
+
+    def versao(self, tabela, meses=None):
+        """Muda a cada gravação na tabela (ou nos meses pedidos): serve de chave para caches de leitura."""
+        meses = self.particoes(tabela) if meses is None else meses
+        return tuple(
+            (mes, os.stat(self._arquivo_particao(tabela, mes)).st_mtime_ns)
+            for mes in meses if os.path.exists(self._arquivo_particao(tabela, mes))
+        )
+
+    # --- LEITURA ---
+    @staticmethod
+    def _ler_parquet(caminho):
+        return pd.read_parquet(caminho) if os.path.exists(caminho) else pd.DataFrame()
+
+    def ler(self, tabela, meses=None):
+        """Lê a tabela inteira ou só as partições (AAAA-MM) pedidas."""
+        with self._trava:
+            meses = self.particoes(tabela) if meses is None else meses
+            partes = [self._ler_parquet(self._arquivo_particao(tabela, m)) for m in meses]
+        partes = [p for p in partes if not p.empty]
+        if not partes: return pd.DataFrame()
+        if len(partes) == 1: return partes[0]
+        # Cada partição tem as próprias categorias: o concat as junta como object e _tipar refaz.
+        return self._tipar(tabela, pd.concat(partes, ignore_index=True))
+
+    # --- GRAVAÇÃO ---
+    @staticmethod
+    def _tipar(tabela, df):
+        """Comissoes/Aproveitamento no esquema tipado (registros.py); nas demais, Data e Técnico como texto."""
+        if tabela.lower() in ESQUEMAS: return tipar(df, ESQUEMAS[tabela.lower()])
+        df = df.copy()
+        for col in COLUNAS_TEXTO_CONSOLIDADO:
+            if col in df.columns: df[col] = df[col].astype(str)
+        return df
+
+    def _migrar(self, tabela):
+        """Converte as partições gravadas em formato anterior e marca as abas para reenvio completo."""
+        formato = self._arquivo_formato(tabela)
+        with self._trava:
+            if os.path.exists(formato):
+                with open(formato) as f:
+                    if f.read().strip() == str(VERSAO_FORMATO): return
+            if self.particoes(tabela):
+                coluna_data, chaves, _ = TABELAS[tabela]
+                df = self._tipar(tabela, self.ler(tabela))
+                # As datas passam a ter 4 dígitos: '08/12/25' e '08/12/2025' viram a mesma chave.
+                df = df.drop_duplicates(subset=chaves, keep="last")
+                antigos = set(self.particoes(tabela))
+                for mes in antigos: os.remove(self._arquivo_particao(tabela, mes))
+                for mes, parte in df.groupby(mes_da_data(df[coluna_data]), sort=False):
+                    self._gravar_particao(tabela, mes, parte.reset_index(drop=True))
+                for mes in antigos - set(self.particoes(tabela)):
+                    shutil.rmtree(os.path.dirname(self._arquivo_particao(tabela, mes)), ignore_errors=True)
+                pendente = self._arquivo_pendente(tabela)
+                if os.path.exists(pendente): os.remove(pendente)
+                self._marcar_reescrever(tabela)
+            os.makedirs(self._pasta(tabela), exist_ok=True)
+            with open(formato, "w") as f: f.write(str(VERSAO_FORMATO))
+
+    def _gravar_particao(self, tabela, mes, df):
+        self._gravar_parquet(self._arquivo_particao(tabela, mes), df)
+
+    @staticmethod
+    def _gravar_parquet(caminho, df):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = caminho + ".tmp"
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, caminho)
+
+    def _anotar_pendente(self, tabela, df, chaves=None):
+        chaves = chaves or _definicao(tabela)[1]
+        caminho = self._arquivo_pendente(tabela)
+        pendente = self._tipar(tabela, pd.concat([self._ler_parquet(caminho), df], ignore_index=True))
+        pendente = pendente.drop_duplicates(subset=chaves, keep="last")
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        pendente.to_parquet(caminho, index=False)
+
+    @staticmethod
+    def _alteradas(df, existente):
+        """Linhas de df que não estão iguais (todas as colunas) em existente: chaves novas ou valores mudados."""
+        colunas = list(df.columns)
+        if existente.empty or not set(colunas) <= set(existente.columns): return df
+
+        # Categorias de partições diferentes não se comparam no merge: como texto, sim.
+        def comparavel(d):
+            return d[colunas].astype({c: str for c in colunas if isinstance(d[c].dtype, pd.CategoricalDtype)})
+        marcadas = comparavel(df).merge(comparavel(existente).drop_duplicates(), on=colunas, how="left", indicator=True)
+        return df[(marcadas["_merge"] == "left_only").to_numpy()]
+
+    def upsert(self, tabela, novos_dados_df, colunas_chaves=None):
+        """
+        Mescla as linhas nas partições afetadas (a última vence por chave) e
+        anota como pendentes para a planilha (se a tabela tiver abas) só as
+        novas ou alteradas. Devolve todas as chaves gravadas.
+        """
+        coluna_data, chaves_padrao, _ = _definicao(tabela)
+        colunas_chaves = colunas_chaves or chaves_padrao
+        df = self._tipar(tabela, novos_dados_df).drop_duplicates(subset=colunas_chaves, keep="last")
+        if df.empty: return []
+
+        with self._trava, etapa(f"armazém local {tabela}", linhas=len(df)) as extras:
+            alteradas = []
+            for mes, parte in df.groupby(mes_da_data(df[coluna_data]), sort=False):
+                existente = self._ler_parquet(self._arquivo_particao(tabela, mes))
+                if tabela in TABELAS: alteradas.append(self._alteradas(parte, existente))
+                total = self._tipar(tabela, pd.concat([existente, parte], ignore_index=True))
+                total = total.drop_duplicates(subset=colunas_chaves, keep="last")
+                self._gravar_particao(tabela, mes, total)
+            alteradas = [parte for parte in alteradas if not parte.empty]
+            if alteradas:
+                self._anotar_pendente(tabela, pd.concat(alteradas, ignore_index=True))
+            if tabela in TABELAS: extras["alteradas"] = sum(len(parte) for parte in alteradas)
+        # Todas as chaves, mesmo as sem mudança: uma unificação que falhou antes é refeita por inteiro.
+        return chaves_texto(df, colunas_chaves)
+
+    def _marcar_reescrever(self, tabela, meses_antigos=()):
+        """Marca a tabela para reenvio completo; os meses antigos (um por linha) têm as abas limpas."""
+        caminho = self._marca_reescrever(tabela)
+        antigos = set(meses_antigos) | self._meses_marcados(tabela)
+        with open(caminho, "w") as f: f.write("".join(f"{mes}\n" for mes in sorted(antigos)))
+
+    def _meses_marcados(self, tabela):
+        caminho = self._marca_reescrever(tabela)
+        if not os.path.exists(caminho): return set()
+        with open(caminho) as f: return {linha.strip() for linha in f if linha.strip()}
+
+    def substituir(self, tabela, df):
+        """Troca o conteúdo inteiro da tabela e marca as abas (se houver) para reenvio completo."""
+        coluna_data, _, _ = _definicao(tabela)
+        df = self._tipar(tabela, df)
+        with self._trava:
+            antigos = set(self.particoes(tabela)) | self._meses_marcados(tabela)
+            importada = self.importada(tabela)
+            shutil.rmtree(self._pasta(tabela), ignore_errors=True)
+            os.makedirs(self._pasta(tabela), exist_ok=True)
+            if importada: self._marcar_importada(tabela)
+            if not df.empty:
+                for mes, parte in df.groupby(mes_da_data(df[coluna_data]), sort=False):
+                    self._gravar_particao(tabela, mes, parte.reset_index(drop=True))
+            if tabela in TABELAS: self._marcar_reescrever(tabela, antigos)
+
+    # --- PLANILHA MESTRA ---
+    @staticmethod
+    def _ler_aba(ws, tabela):
+        if tabela == "Consolidado": return pd.DataFrame(ws.get_all_records())
+        valores = ws.get_all_values()
+        if len(valores) < 2: return pd.DataFrame()
+        cabecalho = valores[0]
+        return pd.DataFrame([linha + [""] * (len(cabecalho) - len(linha)) for linha in valores[1:]], columns=cabecalho)
+
+    def importar_da_planilha(self, sh, tabela):
+        """
+        Carga a partir das abas da tabela: as abas por mês e, antes delas, a
+        aba única antiga, se existir. O disco do servidor pode começar vazio,
+        ou já ter linhas gravadas antes da importação (cli.py com
+        --sem-sincronizar): nesse caso as linhas da planilha só completam as
+        do armazém, que vencem na mesma chave. Se só havia a aba antiga, a
+        tabela fica marcada para reenvio completo, o que cria as abas por mês
+        na próxima sincronização. Devolve quantas chaves vieram da planilha.
+        """
+        _, chaves, _ = TABELAS[tabela]
+        abas = {ws.title: ws for ws in sh.worksheets()}
+        mensais = sorted(titulo for titulo in abas if particao_da_aba(tabela, titulo))
+        partes = [self._ler_aba(abas[titulo], tabela) for titulo in ([tabela] if tabela in abas else []) + mensais]
+        partes = [p for p in partes if not p.empty]
+        novas = 0
+        with self._trava:
+            if partes:
+                coluna_data, _, _ = TABELAS[tabela]
+                # As abas por mês vêm depois da antiga: na mesma chave, vale a linha delas.
+                df = self._tipar(tabela, pd.concat(partes, ignore_index=True)).drop_duplicates(subset=chaves, keep="last")
+                for mes, parte in df.groupby(mes_da_data(df[coluna_data]), sort=False):
+                    existente = self._ler_parquet(self._arquivo_particao(tabela, mes))
+                    total = self._tipar(tabela, pd.concat([parte, existente], ignore_index=True))
+                    total = total.drop_duplicates(subset=chaves, keep="last").reset_index(drop=True)
+                    novas += len(total) - len(existente)
+                    self._gravar_particao(tabela, mes, total)
+                if not mensais: self._marcar_reescrever(tabela)
+            self._marcar_importada(tabela)
+        return novas
+
+    def pendencias(self):
+        """Quantidade de linhas aguardando envio por tabela (None = reenvio completo)."""
+        resumo = {}
+        for tabela in TABELAS:
+            if os.path.exists(self._marca_reescrever(tabela)): resumo[tabela] = None
+            elif os.path.exists(self._arquivo_pendente(tabela)):
+                resumo[tabela] = len(self._ler_parquet(self._arquivo_pendente(tabela)))
+        if os.path.exists(self._arquivo_pendente(ABA_ARQUIVOS)):
+            resumo[ABA_ARQUIVOS] = len(self._ler_parquet(self._arquivo_pendente(ABA_ARQUIVOS)))
+        return resumo
+
+    # --- ÍNDICE DE ARQUIVOS ---
+    def _arquivo_indice(self):
+        return os.path.join(self._pasta(ABA_ARQUIVOS), "dados.parquet")
+
+    def arquivos(self):
+        """Índice dos relatórios já gravados (colunas COLUNAS_ARQUIVOS)."""
+        with self._trava: return self._ler_parquet(self._arquivo_indice())
+
+    def arquivos_conhecidos(self, tipo):
+        """{SHA-256: registro do índice} dos relatórios desse tipo já gravados."""
+        df = self.arquivos()
+        if df.empty: return {}
+        df = df[df["Tipo"] == tipo]
+        return dict(zip(df["Hash"], df.to_dict("records")))
+
+    def _mesclar_indice(self, df):
+        total = pd.concat([self._ler_parquet(self._arquivo_indice()), df], ignore_index=True)
+        self._gravar_parquet(self._arquivo_indice(), total.drop_duplicates(subset=CHAVES_ARQUIVOS, keep="last"))
+
+    def registrar_arquivos(self, arquivos):
+        """Acrescenta ao índice os arquivos recém-gravados (sem Importado em) e os anota para a aba oculta."""
+        if arquivos is None or arquivos.empty: return
+        df = arquivos.copy()
+        df["Importado em"] = time.strftime(FORMATO_IMPORTADO_EM)
+        df = df[COLUNAS_ARQUIVOS]
+        with self._trava:
+            self._mesclar_indice(df)
+            self._anotar_pendente(ABA_ARQUIVOS, df, CHAVES_ARQUIVOS)
+
+    def importar_arquivos_da_planilha(self, sh):
+        """Carga do índice a partir da aba oculta (se existir); os registros locais vencem."""
+        try: df = self._ler_aba(sh.worksheet(ABA_ARQUIVOS), ABA_ARQUIVOS)
+        except: df = pd.DataFrame()
+        with self._trava:
+            if not df.empty:
+                df = df.reindex(columns=COLUNAS_ARQUIVOS, fill_value="")
+                df["Linhas"] = pd.to_numeric(df["Linhas"], errors="coerce").fillna(0).astype("int64")
+                local = self._ler_parquet(self._arquivo_indice())
+                self._gravar_parquet(self._arquivo_indice(), pd.concat([df, local], ignore_index=True)
+                                     .drop_duplicates(subset=CHAVES_ARQUIVOS, keep="last"))
+            self._marcar_importada(ABA_ARQUIVOS)
+        return len(df)
+
+    @staticmethod
+    def _para_planilha(df, como_texto):
+        if como_texto: return para_texto(df)
+        # Devolve às chaves o tipo que o get_all_records produziria (ex.: técnico 7 e não "7").
+        df = df.copy()
+        for col in COLUNAS_TEXTO_CONSOLIDADO:
+            if col in df.columns: df[col] = numericise_all(df[col].tolist())
+        return df
+
+    def _tirar_pendencias(self):
+        """
+        Foto do que falta enviar, apagando as marcas (chamar com a trava):
+        {tabela: (partições {mês: df} ou None, meses a limpar, linhas pendentes ou None)}.
+        Com reenvio completo vão todas as partições; senão, só as linhas pendentes.
+        """
+        # Reenvio completo sem a importação apagaria das abas o histórico que o armazém não tem.
+        nao_importadas = [t for t in TABELAS if os.path.exists(self._marca_reescrever(t)) and not self.importada(t)]
+        if nao_importadas:
+            raise RuntimeError(f"Reenvio completo de {', '.join(nao_importadas)} antes da importação da planilha "
+                               "(rotina.preparar_armazem); nada foi enviado.")
+        foto = {}
+        for tabela in list(TABELAS) + [ABA_ARQUIVOS]:
+            reescrever, pendente = self._marca_reescrever(tabela), self._arquivo_pendente(tabela)
+            if tabela in TABELAS and os.path.exists(reescrever):
+                particoes = {mes: self.ler(tabela, [mes]) for mes in self.particoes(tabela)}
+                foto[tabela] = (particoes, self._meses_marcados(tabela) - set(particoes), None)
+                os.remove(reescrever)
+            elif os.path.exists(pendente):
+                foto[tabela] = (None, set(), self._ler_parquet(pendente))
+            else: continue
+            if os.path.exists(pendente): os.remove(pendente)
+        return foto
+
+    def _devolver_pendencias(self, foto):
+        """Envio falhou: remarca o que estava na foto, sem passar por cima do anotado durante o envio."""
+        for tabela, (particoes, limpar, df) in foto.items():
+            if particoes is not None:
+                self._marcar_reescrever(tabela, limpar)
+                continue
+            if df.empty: continue
+            caminho = self._arquivo_pendente(tabela)
+            chaves = CHAVES_ARQUIVOS if tabela == ABA_ARQUIVOS else TABELAS[tabela][1]
+            pendente = pd.concat([df, self._ler_parquet(caminho)], ignore_index=True)
+            if tabela != ABA_ARQUIVOS: pendente = self._tipar(tabela, pendente)
+            self._gravar_parquet(caminho, pendente.drop_duplicates(subset=chaves, keep="last"))
+
+    def _reescrever_abas(self, sh, tabela, particoes, limpar, como_texto, escritor, existentes):
+        """Reescreve a aba de cada partição e limpa as abas de meses que deixaram de existir."""
+        total = 0
+        for mes, df in particoes.items():
+            with etapa(f"sincronização {aba_da_particao(tabela, mes)} (completa)", linhas=len(df)):
+                atualizar_planilha_preservando_formato(sh, aba_da_particao(tabela, mes), self._para_planilha(df, como_texto), escritor)
+            total += len(df)
+        for mes in sorted(limpar):
+            if aba_da_particao(tabela, mes) in existentes: escritor.limpar(existentes[aba_da_particao(tabela, mes)], "A2:Z")
+        return total
+
+    @staticmethod
+    def _pendentes_por_aba(tabela, df):
+        """Linhas pendentes -> [(aba do mês, linhas)], em ordem de mês."""
+        if df.empty: return []
+        return [(aba_da_particao(tabela, mes), parte) for mes, parte in df.groupby(mes_da_data(df[TABELAS[tabela][0]]), sort=True)]
+
+    def _enviar(self, sh, foto):
+        enviados = {}
+        escritor = EscritorPlanilha(sh)
+        por_aba = {tabela: self._pendentes_por_aba(tabela, df) for tabela, (particoes, _, df) in foto.items()
+                   if particoes is None and tabela in TABELAS}
+        # O cabeçalho de todas as abas tocadas vem numa leitura só.
+        titulos = [aba for partes in por_aba.values() for aba, _ in partes]
+        titulos += [aba_da_particao(tabela, mes) for tabela, (particoes, _, _) in foto.items() if particoes is not None for mes in particoes]
+        if ABA_ARQUIVOS in foto: titulos.append(ABA_ARQUIVOS)
+        existentes = escritor.ler_cabecalhos(titulos) if titulos else {}
+
+        for tabela, (particoes, limpar, df) in foto.items():
+            if tabela == ABA_ARQUIVOS:
+                if not df.empty:
+                    with etapa(f"sincronização {ABA_ARQUIVOS}", linhas=len(df)):
+                        ws = existentes.get(ABA_ARQUIVOS) or obter_ou_criar_aba_oculta(sh, ABA_ARQUIVOS)
+                        upsert_incremental(ws, df, CHAVES_ARQUIVOS, escritor=escritor)
+                enviados[tabela] = len(df)
+                continue
+            _, chaves, como_texto = TABELAS[tabela]
+            if particoes is not None:
+                enviados[tabela] = self._reescrever_abas(sh, tabela, particoes, limpar, como_texto, escritor, existentes)
+                continue
+            for aba, parte in por_aba[tabela]:
+                with etapa(f"sincronização {aba}", linhas=len(parte)):
+                    upsert_incremental(existentes.get(aba) or obter_ou_criar_aba(sh, aba), self._para_planilha(parte, como_texto), chaves,
+                                       como_texto=como_texto, escritor=escritor)
+            enviados[tabela] = len(df)
+        if escritor.pendente:
+            with etapa("envio à planilha") as extras:
+                extras["requisicoes"] = escritor.enviar()
+        return enviados, existentes
+
+    def _aposentar_abas_antigas(self, sh, existentes):
+        """Renomeia as abas únicas antigas das tabelas já importadas (não são mais lidas nem escritas)."""
+        antigas = [
+            existentes[tabela] for tabela in TABELAS
+            if tabela in existentes and self.importada(tabela) and tabela + SUFIXO_ABA_ANTIGA not in existentes
+        ]
+        if not antigas: return
+        with etapa("renomeação das abas antigas", abas=len(antigas)):
+            sh.batch_update({"requests": [
+                {"updateSheetProperties": {"properties": {"sheetId": ws.id, "title": ws.title + SUFIXO_ABA_ANTIGA}, "fields": "title"}}
+                for ws in antigas
+            ]})
+
+    def sincronizar(self, sh):
+        """
+        Envia para a planilha só o que mudou desde a última sincronização, nas
+        abas dos meses afetados. As escritas de todas as tabelas saem juntas no
+        fim (poucas requisições). A trava do armazém só é segurada para tirar a
+        foto das pendências: o envio (com as esperas da cota e das repetições)
+        corre sem ela, e o painel e as gravações seguem enquanto isso. Se o
+        envio falhar, as pendências da foto voltam a ficar marcadas.
+
+        Depois do envio, as abas únicas antigas das tabelas importadas ganham
+        o sufixo " (antiga)". Se isso falhar, o erro sobe como falha da
+        sincronização (os dados já foram enviados e não voltam a ficar
+        pendentes); a troca de nome é tentada de novo no próximo envio.
+        """
+        with self._trava: foto = self._tirar_pendencias()
+        try: enviados, existentes = self._enviar(sh, foto)
+        except Exception:
+            with self._trava: self._devolver_pendencias(foto)
+            raise
+        self._aposentar_abas_antigas(sh, existentes)
+        return enviados
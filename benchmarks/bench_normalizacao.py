@@ -0,0 +1,108 @@
+"""
+Benchmark da normalização: regra escalar com Series.apply x versão vetorizada.
+
+Gera colunas sintéticas no formato das abas (números BR, datas com ano de
+2 ou 4 dígitos, vazios e lixo) e confere que os resultados são idênticos.
+
+    python benchmarks/bench_normalizacao.py --linhas 1000000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from normalizacao import (  # noqa: E402
+    converter_br_para_float,
+    converter_br_para_float_serie,
+    escolher_chave,
+    padronizar_data_quatro_digitos,
+    padronizar_datas_serie,
+)
+
+
+def gerar_numeros(n, rng):
+    inteiros = rng.integers(0, 300, n)  # horas: poucas centenas de valores distintos por coluna
+    centavos = rng.integers(0, 100, n)
+    base = np.char.add(np.char.add(inteiros.astype(str), ","), np.char.zfill(centavos.astype(str), 2))
+    valores = base.astype(object)
+    sorteio = rng.random(n)
+    valores[sorteio < 0.05] = ""
+    valores[(sorteio >= 0.05) & (sorteio < 0.08)] = "R$ 1.234,56"
+    valores[(sorteio >= 0.08) & (sorteio < 0.10)] = "-"
+    valores[(sorteio >= 0.10) & (sorteio < 0.12)] = 1500
+    valores[(sorteio >= 0.12) & (sorteio < 0.13)] = None
+    return pd.Series(valores, dtype=object)
+
+
+def gerar_datas(n, rng):
+    dias = np.char.zfill(rng.integers(1, 29, n).astype(str), 2)
+    meses = rng.integers(1, 13, n).astype(str)
+    anos = np.where(rng.random(n) < 0.5, "25", "2025")
+    datas = np.char.add(np.char.add(np.char.add(np.char.add(dias, "/"), meses), "/"), anos).astype(object)
+    sorteio = rng.random(n)
+    datas[sorteio < 0.03] = ""
+    datas[(sorteio >= 0.03) & (sorteio < 0.05)] = " 8/1/25 "
+    datas[(sorteio >= 0.05) & (sorteio < 0.06)] = "sem data"
+    return pd.Series(datas, dtype=object)
+
+
+def cronometrar(funcao, repeticoes):
+    """Melhor tempo de N execuções, com o GC desligado (como o timeit)."""
+    melhor = float("inf")
+    gc.disable()
+    try:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = funcao()
+            melhor = min(melhor, time.perf_counter() - inicio)
+    finally:
+        gc.enable()
+    return resultado, melhor
+
+
+def iguais(a, b):
+    a, b = a.to_numpy(), b.to_numpy()
+    if a.dtype.kind == "f":
+        return bool(np.array_equal(a, b, equal_nan=True))
+    return a.tolist() == b.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.semente)
+    numeros = gerar_numeros(args.linhas, rng)
+    datas = gerar_datas(args.linhas, rng)
+    chave_c = pd.Series(np.where(rng.random(args.linhas) < 0.3, 0.0, datas.to_numpy()), dtype=object)
+
+    casos = [
+        ("converter_br_para_float", lambda: numeros.apply(converter_br_para_float), lambda: converter_br_para_float_serie(numeros)),
+        ("padronizar_data_quatro_digitos", lambda: datas.apply(padronizar_data_quatro_digitos), lambda: padronizar_datas_serie(datas)),
+        (
+            "consolidar chave (Data_C/Data_A)",
+            lambda: pd.DataFrame({"c": chave_c, "a": datas}).apply(lambda x: x["c"] if x["c"] != 0 and str(x["c"]) != "0" else x["a"], axis=1),
+            lambda: escolher_chave(chave_c, datas),
+        ),
+    ]
+
+    print(f"{args.linhas:,} linhas")
+    for nome, escalar, vetorizada in casos:
+        esperado, t_escalar = cronometrar(escalar, args.repeticoes)
+        obtido, t_vetor = cronometrar(vetorizada, args.repeticoes)
+        status = "OK" if iguais(esperado, obtido) else "DIFERENTE"
+        print(f"{nome:34s} apply {t_escalar:8.3f}s | vetorizado {t_vetor:7.3f}s | {t_escalar / t_vetor:5.1f}x | {status}")
+        if status != "OK": sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
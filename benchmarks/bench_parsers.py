@@ -0,0 +1,135 @@
+"""
+Benchmark das regras de cada parser: laço anterior (NFD por caractere e
+re.match sem compilar em toda <tr>) x pré-filtros, tabela de acentos e
+regex compilada.
+
+As <tr> são extraídas uma vez só (motor stream) e as duas versões das regras
+rodam sobre as mesmas linhas; a extração completa (HTML + regras) sai em
+seguida. Confere que os registros são idênticos e mostra linhas/segundo.
+
+    python benchmarks/bench_parsers.py --tecnicos 200 --dias 31 --arquivos 4
+"""
+import argparse
+import gc
+import os
+import re
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.gerador_relatorios import gerar_lote  # noqa: E402
+from decodificacao import decodificar  # noqa: E402
+from parsers import (  # noqa: E402
+    EXTRATORES,
+    MOTOR_STREAM,
+    _abrir_fonte,
+    _registros_aproveitamento,
+    _registros_comissoes,
+)
+
+
+# --- REGRAS ANTERIORES (REFERÊNCIA) ---
+def _remover_acentos_anterior(texto):
+    return ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+
+
+def _comissoes_anterior(linhas):
+    tecnico_atual = None
+    for linha in linhas:
+        texto_linha = linha.texto.upper()
+        if "TOTAL DA FILIAL" in texto_linha or "TOTAL DA EMPRESA" in texto_linha: break
+
+        if "TOTAL DO FUNCIONARIO" in texto_linha:
+            try: tecnico_atual = texto_linha.split("TOTAL DO FUNCIONARIO")[1].replace(":", "").strip().split()[0]
+            except: continue
+
+        if tecnico_atual and "HORAS VENDIDAS:" in texto_linha:
+            for celula in linha.celulas:
+                txt = celula.upper()
+                if "HORAS" in txt and any(c.isdigit() for c in txt) and "VENDIDAS" not in txt:
+                    yield tecnico_atual, txt.replace("HORAS", "").strip()
+                    break
+
+
+def _aproveitamento_anterior(linhas):
+    tecnico_atual_aprov = None
+    for linha in linhas:
+        texto_original = linha.texto.upper()
+        texto_limpo = _remover_acentos_anterior(texto_original)
+
+        if "TOTAL FILIAL:" in texto_original: break
+        if "MECANICO" in texto_limpo and "TOT.MEC" not in texto_limpo:
+            try:
+                parte_direita = texto_limpo.split("MECANICO")[1].replace(":", "").strip()
+                if "-" in parte_direita: tecnico_atual_aprov = parte_direita.split("-")[0].strip()
+                else: tecnico_atual_aprov = parte_direita.split()[0]
+            except: continue
+
+        if "TOT.MEC.:" in texto_original: tecnico_atual_aprov = None; continue
+
+        if tecnico_atual_aprov:
+            celulas = linha.celulas
+            if not celulas: continue
+            txt_cel0 = celulas[0]
+            if re.match(r"\d{2}/\d{2}/\d{2}", txt_cel0):
+                try:
+                    if len(celulas) >= 4:
+                        yield tecnico_atual_aprov, txt_cel0.split()[0], celulas[1], celulas[2], celulas[3]
+                except: continue
+
+
+REGRAS = {
+    "comissoes": (_comissoes_anterior, _registros_comissoes),
+    "aproveitamento": (_aproveitamento_anterior, _registros_aproveitamento),
+}
+
+
+def cronometrar(funcao, repeticoes):
+    """Melhor tempo de N execuções, com o GC desligado (como o timeit)."""
+    melhor = float("inf")
+    gc.disable()
+    try:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = funcao()
+            melhor = min(melhor, time.perf_counter() - inicio)
+    finally:
+        gc.enable()
+    return resultado, melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tecnicos", type=int, default=200)
+    parser.add_argument("--dias", type=int, default=31)
+    parser.add_argument("--arquivos", type=int, default=4, help="arquivos de Aproveitamento (Comissões: um por dia)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    comissoes, aproveitamento = gerar_lote(args.tecnicos, args.dias, args.arquivos, args.semente)
+    for tipo, arquivos in (("comissoes", comissoes), ("aproveitamento", aproveitamento)):
+        textos = [(nome, decodificar(dados)[0]) for nome, dados in arquivos]
+        linhas = [list(_abrir_fonte(texto, MOTOR_STREAM).linhas()) for _, texto in textos]
+        total = sum(len(lista) for lista in linhas)
+        anterior, nova = REGRAS[tipo]
+
+        esperado, t_anterior = cronometrar(lambda: [r for lista in linhas for r in anterior(lista)], args.repeticoes)
+        obtido, t_nova = cronometrar(lambda: [r for lista in linhas for r in nova(lista)], args.repeticoes)
+        _, t_extracao = cronometrar(
+            lambda: [r for nome, texto in textos for r in EXTRATORES[tipo](nome, texto, MOTOR_STREAM)], args.repeticoes,
+        )
+        status = "OK" if esperado == obtido else "DIFERENTE"
+        print(f"{tipo} ({len(arquivos)} arquivos, {total:,} <tr>, {len(obtido):,} registros)")
+        print(
+            f"  regras    anterior {total / t_anterior:12,.0f} <tr>/s | novas {total / t_nova:12,.0f} <tr>/s"
+            f" | {t_anterior / t_nova:5.1f}x | {status}"
+        )
+        print(f"  extração completa (HTML + regras) {total / t_extracao:12,.0f} <tr>/s")
+        if status != "OK": sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
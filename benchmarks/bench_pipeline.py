@@ -0,0 +1,164 @@
+"""
+Benchmark do pipeline inteiro sobre relatórios sintéticos.
+
+Gera Comissões/Aproveitamento com gerador_relatorios.py e cronometra cada
+etapa: decodificação, leitura (parser), gravação numa planilha em memória
+(planilha_falsa.py), normalização, merge e pivot do painel. O resultado
+sai em JSON para acompanhar regressões de uma execução para outra.
+
+    python benchmarks/bench_pipeline.py --tecnicos 60 --dias 31 --arquivos 4 --saida bench.json
+    python benchmarks/bench_pipeline.py --comparar bench.json    # sai com 1 se alguma etapa piorar
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.gerador_relatorios import gerar_lote  # noqa: E402
+from decodificacao import decodificar  # noqa: E402
+from painel import preparar_painel  # noqa: E402
+from parsers import EXTRATORES, MOTOR_PADRAO, MOTORES  # noqa: E402
+from planilha import obter_ou_criar_aba, upsert_incremental  # noqa: E402
+from planilha_falsa import PlanilhaFalsa  # noqa: E402
+from registros import para_texto  # noqa: E402
+from rotina import montar_aproveitamento, montar_comissoes  # noqa: E402
+from unificacao import (  # noqa: E402
+    ABA_APROVEITAMENTO,
+    ABA_COMISSOES,
+    CHAVES_APROVEITAMENTO,
+    CHAVES_COMISSOES,
+    juntar,
+    normalizar,
+)
+
+
+def cronometrar(funcao, repeticoes, preparar=None):
+    """Executa repeticoes vezes (com o GC desligado) e devolve (mínimo, média, último resultado)."""
+    tempos, resultado = [], None
+    for _ in range(repeticoes):
+        argumentos = preparar() if preparar else ()
+        gc.collect()
+        gc.disable()
+        try:
+            inicio = time.perf_counter()
+            resultado = funcao(*argumentos)
+            tempos.append(time.perf_counter() - inicio)
+        finally:
+            gc.enable()
+    return min(tempos), sum(tempos) / len(tempos), resultado
+
+
+def ler_textos(tipo, textos, motor):
+    extrator = EXTRATORES[tipo]
+    return [linha for nome, texto in textos for linha in extrator(nome, texto, motor)]
+
+
+def gravar(df_com, df_aprov):
+    sh = PlanilhaFalsa()
+    upsert_incremental(obter_ou_criar_aba(sh, ABA_COMISSOES), para_texto(df_com), CHAVES_COMISSOES)
+    upsert_incremental(obter_ou_criar_aba(sh, ABA_APROVEITAMENTO), para_texto(df_aprov), CHAVES_APROVEITAMENTO)
+    return sh
+
+
+def executar(args):
+    comissoes, aproveitamento = gerar_lote(args.tecnicos, args.dias, args.arquivos, args.semente)
+    arquivos = comissoes + aproveitamento
+    r = args.repeticoes
+    etapas = {}
+
+    def registrar(nome, medida, linhas):
+        """linhas pode ser um número ou uma função do resultado da etapa."""
+        minimo, media, resultado = medida
+        linhas = linhas(resultado) if callable(linhas) else linhas
+        etapas[nome] = {
+            "min_s": round(minimo, 6), "media_s": round(media, 6), "linhas": linhas,
+            "linhas_por_s": round(linhas / minimo, 1) if minimo > 0 else None,
+        }
+        print(f"{nome:<14} {minimo:9.4f}s  ({linhas} linhas)", file=sys.stderr)
+        return resultado
+
+    textos = registrar("decodificacao", cronometrar(lambda: [(n, decodificar(d)[0]) for n, d in arquivos], r), len(arquivos))
+    textos_com, textos_aprov = textos[:len(comissoes)], textos[len(comissoes):]
+
+    linhas_com, linhas_aprov = registrar(
+        "leitura",
+        cronometrar(lambda: (ler_textos("comissoes", textos_com, args.motor), ler_textos("aproveitamento", textos_aprov, args.motor)), r),
+        lambda lidas: len(lidas[0]) + len(lidas[1]),
+    )
+    df_com, df_aprov = montar_comissoes(linhas_com), montar_aproveitamento(linhas_aprov)
+    total_origem = len(df_com) + len(df_aprov)
+
+    sh = registrar("gravacao", cronometrar(gravar, r, lambda: (df_com.copy(), df_aprov.copy())), total_origem)
+
+    # Como na reconstrução completa: os dois lados voltam da planilha pelo get_all_records.
+    registros_com = pd.DataFrame(sh.worksheet(ABA_COMISSOES).get_all_records())
+    registros_aprov = pd.DataFrame(sh.worksheet(ABA_APROVEITAMENTO).get_all_records())
+    normalizados = registrar(
+        "normalizacao", cronometrar(normalizar, r, lambda: (registros_com.copy(), registros_aprov.copy())), total_origem,
+    )
+    consolidado = registrar(
+        "merge", cronometrar(juntar, r, lambda: (normalizados[0].copy(), normalizados[1].copy())), total_origem,
+    )
+    registrar("pivot", cronometrar(preparar_painel, r, lambda: (consolidado,)), len(consolidado))
+
+    return {
+        "parametros": {k: getattr(args, k) for k in ("tecnicos", "dias", "arquivos", "motor", "semente", "repeticoes")},
+        "ambiente": {
+            "python": platform.python_version(), "pandas": pd.__version__,
+            "plataforma": platform.platform(), "cpus": os.cpu_count(),
+        },
+        "volume": {
+            "arquivos_comissoes": len(comissoes), "arquivos_aproveitamento": len(aproveitamento),
+            "bytes": sum(len(d) for _, d in arquivos), "linhas_comissoes": len(df_com),
+            "linhas_aproveitamento": len(df_aprov), "linhas_consolidado": len(consolidado),
+        },
+        "etapas": etapas,
+    }
+
+
+def comparar(relatorio, caminho_anterior, tolerancia):
+    """Imprime a razão atual/anterior por etapa; devolve True se alguma passou da tolerância."""
+    with open(caminho_anterior, encoding="utf-8") as f: anterior = json.load(f)
+    piorou = False
+    for nome, etapa in relatorio["etapas"].items():
+        antes = anterior.get("etapas", {}).get(nome)
+        if not antes or not antes["min_s"]: continue
+        razao = etapa["min_s"] / antes["min_s"]
+        marca = "  <-- regressão" if razao > tolerancia else ""
+        print(f"{nome:<14} {antes['min_s']:9.4f}s -> {etapa['min_s']:9.4f}s  ({razao:.2f}x){marca}", file=sys.stderr)
+        piorou |= razao > tolerancia
+    return piorou
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tecnicos", type=int, default=40)
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--arquivos", type=int, default=4, help="arquivos de Aproveitamento (Comissões: um por dia)")
+    parser.add_argument("--motor", choices=MOTORES, default=MOTOR_PADRAO)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=1.25, help="razão atual/anterior aceita por etapa")
+    args = parser.parse_args()
+
+    relatorio = executar(args)
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f: f.write(texto + "\n")
+    else:
+        print(texto)
+
+    if args.comparar and comparar(relatorio, args.comparar, args.tolerancia): sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
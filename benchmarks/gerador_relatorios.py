@@ -0,0 +1,83 @@
+"""
+Relatórios sintéticos de Comissões e Aproveitamento, no formato que os
+parsers esperam (TOTAL DO FUNCIONARIO / HORAS VENDIDAS:, MECÂNICO /
+TOT.MEC.: / TOTAL FILIAL:), com o lixo típico do relatório real em volta:
+linhas de OS, subtotais e a parte depois do total da filial.
+
+    from benchmarks.gerador_relatorios import gerar_lote
+    comissoes, aproveitamento = gerar_lote(tecnicos=40, dias=30, arquivos=4)
+"""
+import random
+from datetime import date, timedelta
+
+DIAS_SEMANA = ["SEG", "TER", "QUA", "QUI", "SEX", "SAB", "DOM"]
+NOMES = ["JOSÉ DA SILVA", "JOÃO PEREIRA", "ANTÔNIO SOUZA", "MÁRCIO LIMA", "CÉSAR ROCHA", "LUÍS GONÇALVES"]
+
+
+def siglas_tecnicos(quantidade):
+    """AAA, AAB, ... (três letras, como nos relatórios)."""
+    letras = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return [letras[i // 676 % 26] + letras[i // 26 % 26] + letras[i % 26] for i in range(quantidade)]
+
+
+def _horas(rng):
+    return f"{rng.randint(0, 300)},{rng.randint(0, 99):02d}"
+
+
+def gerar_comissoes(tecnicos, data_relatorio, rng, os_por_tecnico=8, lixo_final=200):
+    """Um relatório de Comissões (HTML, utf-8) com um bloco por técnico."""
+    partes = [
+        "<html><head><meta charset='utf-8'><title>Comissões</title></head><body>",
+        f"<p>Relatório de comissões - período de 01/{data_relatorio:%m/%Y} até {data_relatorio:%d/%m/%Y}</p>",
+        "<table>",
+    ]
+    for sigla in tecnicos:
+        nome = rng.choice(NOMES)
+        for n in range(os_por_tecnico):
+            partes.append(f"<tr><td>OS {rng.randint(10000, 99999)}</td><td>{nome}</td><td>{_horas(rng)}</td><td>R$ {_horas(rng)}</td></tr>")
+        partes.append(f"<tr><td colspan='4'>TOTAL DO FUNCIONARIO: {sigla} {nome}</td></tr>")
+        partes.append(f"<tr><td>HORAS VENDIDAS:</td><td>{_horas(rng)} HORAS</td><td>VALOR:</td><td>R$ {_horas(rng)}</td></tr>")
+    partes.append("<tr><td>TOTAL DA FILIAL</td><td></td></tr>")
+    partes += [f"<tr><td>RESUMO {i}</td><td>{_horas(rng)}</td></tr>" for i in range(lixo_final)]
+    partes.append("</table></body></html>")
+    return "\n".join(partes).encode("utf-8")
+
+
+def gerar_aproveitamento(tecnicos, datas, rng, lixo_final=200):
+    """Um relatório de Aproveitamento (HTML, latin-1) com uma linha por técnico e dia."""
+    partes = [
+        "<html><head><meta charset='iso-8859-1'><title>Aproveitamento</title></head><body><table>",
+        "<tr><td>APROVEITAMENTO DE TEMPO MECÂNICO</td></tr>",
+    ]
+    for sigla in tecnicos:
+        partes.append(f"<tr><td colspan='4'>MECÂNICO: {sigla} - {rng.choice(NOMES)}</td></tr>")
+        partes.append("<tr><td>DATA</td><td>T. DISP</td><td>TP</td><td>TG</td></tr>")
+        for dia in datas:
+            partes.append(
+                f"<tr><td>{dia:%d/%m/%y} {DIAS_SEMANA[dia.weekday()]}</td>"
+                f"<td>{rng.randint(0, 9)},{rng.randint(0, 99):02d}</td><td>{_horas(rng)}</td><td>{_horas(rng)}</td></tr>"
+            )
+        partes.append(f"<tr><td>TOT.MEC.:</td><td>{_horas(rng)}</td><td>{_horas(rng)}</td><td>{_horas(rng)}</td></tr>")
+    partes.append("<tr><td>TOTAL FILIAL:</td><td>0,00</td></tr>")
+    partes += [f"<tr><td>OBSERVAÇÃO {i}</td></tr>" for i in range(lixo_final)]
+    partes.append("</table></body></html>")
+    return "\n".join(partes).encode("latin-1")
+
+
+def gerar_lote(tecnicos=40, dias=30, arquivos=4, semente=42, inicio=date(2025, 12, 1)):
+    """
+    Gera (comissoes, aproveitamento), cada um uma lista de (nome, bytes).
+    Os dias são repartidos entre os arquivos: cada arquivo de Comissões é o
+    fechamento de um dia e cada arquivo de Aproveitamento cobre sua fatia de dias.
+    """
+    rng = random.Random(semente)
+    siglas = siglas_tecnicos(tecnicos)
+    datas = [inicio + timedelta(days=i) for i in range(dias)]
+    fatias = [datas[i::arquivos] for i in range(arquivos)]
+
+    comissoes, aproveitamento = [], []
+    for i, fatia in enumerate(fatias):
+        for dia in fatia:
+            comissoes.append((f"comissoes_{dia:%Y%m%d}_{i}.html", gerar_comissoes(siglas, dia, rng)))
+        if fatia: aproveitamento.append((f"aproveitamento_{i}.html", gerar_aproveitamento(siglas, sorted(fatia), rng)))
+    return comissoes, aproveitamento
@@ -0,0 +1,91 @@
+"""
+Cache em disco das leituras, indexado pelo SHA-256 do conteúdo do arquivo
+(e pelo tipo, pelo motor de leitura e pela versão dos parsers).
+
+Reenviar (ou reprocessar num rerun do Streamlit) um relatório já lido
+devolve a tabela tipada (registros.py) direto do SQLite, guardada em
+Parquet, e a data do relatório, sem passar pelo parser. Quando o arquivo passa do limite de
+tamanho, as entradas usadas há mais tempo saem.
+"""
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from parsers import MOTOR_PADRAO, VERSAO_PARSER
+
+CAMINHO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "leituras.sqlite")
+LIMITE_PADRAO_BYTES = 256 * 1024 * 1024
+
+
+def hash_conteudo(dados):
+    return hashlib.sha256(dados).hexdigest()
+
+
+class CacheLeitura:
+    def __init__(self, caminho=CAMINHO_PADRAO, limite_bytes=LIMITE_PADRAO_BYTES):
+        self.caminho = caminho
+        self.limite_bytes = limite_bytes
+        self.acertos = 0
+        self.falhas = 0
+        self._trava = threading.Lock()
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with self._conectar() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS leituras (
+                    chave TEXT PRIMARY KEY,
+                    linhas BLOB NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    ultimo_acesso REAL NOT NULL
+                )""")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_leituras_acesso ON leituras (ultimo_acesso)")
+            # Caches criados antes do índice de arquivos não têm a data do relatório.
+            if "data_relatorio" not in {coluna[1] for coluna in con.execute("PRAGMA table_info(leituras)")}:
+                con.execute("ALTER TABLE leituras ADD COLUMN data_relatorio TEXT")
+
+    def _conectar(self):
+        return sqlite3.connect(self.caminho, timeout=30)
+
+    @staticmethod
+    def chave(tipo, hash_arquivo, motor=MOTOR_PADRAO):
+        # O motor entra na chave: a leitura de um não pode responder pelo outro (comparação entre motores).
+        return f"{tipo}:{motor}:{VERSAO_PARSER}:{hash_arquivo}"
+
+    def buscar(self, chave):
+        """Devolve (tabela, data do relatório) guardados para a chave, ou None se não houver."""
+        with self._trava, self._conectar() as con:
+            registro = con.execute("SELECT linhas, data_relatorio FROM leituras WHERE chave = ?", (chave,)).fetchone()
+            if registro is None:
+                self.falhas += 1
+                return None
+            con.execute("UPDATE leituras SET ultimo_acesso = ? WHERE chave = ?", (time.time(), chave))
+            self.acertos += 1
+        return pd.read_parquet(io.BytesIO(registro[0])), registro[1]
+
+    def guardar(self, chave, tabela, data_relatorio=None):
+        dados = tabela.to_parquet(index=False)
+        with self._trava, self._conectar() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO leituras (chave, linhas, tamanho, ultimo_acesso, data_relatorio) VALUES (?, ?, ?, ?, ?)",
+                (chave, dados, len(dados), time.time(), data_relatorio),
+            )
+            self._despejar(con)
+
+    def _despejar(self, con):
+        total = con.execute("SELECT COALESCE(SUM(tamanho), 0) FROM leituras").fetchone()[0]
+        if total <= self.limite_bytes: return
+        removidas = []
+        for chave, tamanho in con.execute("SELECT chave, tamanho FROM leituras ORDER BY ultimo_acesso"):
+            if total <= self.limite_bytes: break
+            removidas.append((chave,))
+            total -= tamanho
+        con.executemany("DELETE FROM leituras WHERE chave = ?", removidas)
+
+    def limpar(self):
+        with self._trava, self._conectar() as con:
+            con.execute("DELETE FROM leituras")
+        self.acertos = self.falhas = 0
@@ -0,0 +1,169 @@
+"""
+Linha de comando: lê diretórios (ou globs) de relatórios e roda a mesma
+rotina do botão "GRAVAR TUDO E ATUALIZAR", sem abrir o navegador.
+
+    python cli.py --comissoes "relatorios/comissoes/*.html" --aproveitamento relatorios/aproveitamento/
+    python cli.py --aproveitamento arquivo_2025/ --sem-sincronizar
+    python cli.py --reconstruir
+
+As credenciais vêm de um JSON da service account ou do secrets.toml do
+Streamlit (seção [gcp_service_account]). Sai com código 1 se algum arquivo
+falhar na leitura, se a unificação falhar ou se a sincronização não terminar.
+A gravação espera a trava da planilha (tarefas.py) se o app estiver gravando.
+Arquivos já importados (índice de arquivos do armazém) são pulados.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from armazem import DIRETORIO_PADRAO, ArmazemLocal
+from cache import CacheLeitura
+from conexao import ConexaoPlanilha, criar_cliente
+from ingestao import WORKERS_PADRAO, processar_lote, resumo_codificacoes
+from medicao import CAMINHO_LOG, gravar_log, medir
+from parsers import MOTOR_PADRAO, MOTORES
+import rotina
+from tarefas import FilaTarefas
+
+EXTENSOES = (".html", ".htm", ".slk")
+SECRETS_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+
+
+def listar_arquivos(entradas):
+    """Expande diretórios (recursivamente, só HTML/SLK) e globs, sem repetir arquivos."""
+    arquivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            encontrados = [
+                os.path.join(raiz, nome)
+                for raiz, _, nomes in os.walk(entrada) for nome in nomes
+                if nome.lower().endswith(EXTENSOES)
+            ]
+        else:
+            encontrados = glob.glob(entrada, recursive=True) or ([entrada] if os.path.isfile(entrada) else [])
+        arquivos.extend(sorted(encontrados))
+    return list(dict.fromkeys(arquivos))
+
+
+def carregar_credenciais(caminho):
+    if caminho.lower().endswith(".json"):
+        with open(caminho, encoding="utf-8") as f: return json.load(f)
+    try: import tomllib
+    except ImportError:
+        import toml
+        return dict(toml.load(caminho)["gcp_service_account"])
+    with open(caminho, "rb") as f: return dict(tomllib.load(f)["gcp_service_account"])
+
+
+def imprimir(mensagem):
+    print(mensagem, flush=True)
+
+
+def ler_tipo(tipo, caminhos, motor, workers, cache, armazem):
+    if not caminhos: return [], [], None
+    imprimir(f"📄 Lendo {len(caminhos)} arquivo(s) de {tipo}...")
+    inicio = time.perf_counter()
+    arquivos = []
+    for caminho in caminhos:
+        with open(caminho, "rb") as f: arquivos.append((os.path.basename(caminho), f.read()))
+    lote = processar_lote(tipo, arquivos, motor, workers, cache, armazem.arquivos_conhecidos(tipo))
+    for nome, registro in lote.conhecidos: imprimir(f"   ⏭️ {nome}: já importado em {registro['Importado em']}")
+    for nome, original in lote.repetidos: imprimir(f"   ⏭️ {nome}: igual a {original}")
+    for nome, erro in lote.erros: imprimir(f"   ❌ Erro no arquivo {nome}: {erro}")
+    codificacoes = resumo_codificacoes(lote.codificacoes)
+    if codificacoes: imprimir(f"   codificação: {codificacoes}")
+    imprimir(
+        f"   {len(lote.tabela)} linha(s) em {time.perf_counter() - inicio:.1f}s "
+        f"(cache: {lote.acertos_cache} reaproveitado(s), {lote.falhas_cache} lido(s) agora)"
+    )
+    return lote.tabela, lote.erros, lote.arquivos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa relatórios de Comissões/Aproveitamento sem a interface web.")
+    parser.add_argument("--comissoes", nargs="+", default=[], metavar="CAMINHO", help="diretórios, arquivos ou globs de Comissões")
+    parser.add_argument("--aproveitamento", nargs="+", default=[], metavar="CAMINHO", help="diretórios, arquivos ou globs de Aproveitamento")
+    parser.add_argument("--reconstruir", action="store_true", help="recalcula o Consolidado inteiro depois da gravação")
+    parser.add_argument("--sem-sincronizar", action="store_true",
+                        help="grava só no armazém local; o envio fica pendente (a importação inicial da planilha acontece mesmo assim)")
+    parser.add_argument("--motor", choices=MOTORES, default=MOTOR_PADRAO)
+    parser.add_argument("--workers", type=int, default=WORKERS_PADRAO)
+    parser.add_argument("--credenciais", default=SECRETS_PADRAO, help="JSON da service account ou secrets.toml do Streamlit")
+    parser.add_argument("--planilha", default=rotina.ID_PLANILHA_MESTRA, help="ID da Planilha Mestra")
+    parser.add_argument("--armazem", default=DIRETORIO_PADRAO, help="diretório do armazém local")
+    parser.add_argument("--log-desempenho", nargs="?", const=CAMINHO_LOG, metavar="ARQUIVO", help=f"acrescenta a medição da execução ao log (padrão: {CAMINHO_LOG})")
+    args = parser.parse_args(argv)
+
+    caminhos_com = listar_arquivos(args.comissoes)
+    caminhos_aprov = listar_arquivos(args.aproveitamento)
+    if (args.comissoes or args.aproveitamento) and not (caminhos_com or caminhos_aprov):
+        imprimir("Nenhum arquivo encontrado.")
+        return 1
+    if not (caminhos_com or caminhos_aprov or args.reconstruir):
+        parser.error("informe --comissoes, --aproveitamento ou --reconstruir")
+
+    conexao = ConexaoPlanilha(lambda: criar_cliente(carregar_credenciais(args.credenciais)))
+    abrir_planilha = lambda: conexao.planilha(args.planilha)
+    armazem = ArmazemLocal(args.armazem)
+    cache = CacheLeitura()
+    fila = FilaTarefas()
+
+    with medir("cli") as medicao:
+        linhas_com, erros_com, arquivos_com = ler_tipo("comissoes", caminhos_com, args.motor, args.workers, cache, armazem)
+        linhas_aprov, erros_aprov, arquivos_aprov = ler_tipo("aproveitamento", caminhos_aprov, args.motor, args.workers, cache, armazem)
+        falhou = bool(erros_com or erros_aprov)
+        arquivos_novos = pd.concat([a for a in (arquivos_com, arquivos_aprov) if a is not None], ignore_index=True) if (caminhos_com or caminhos_aprov) else None
+
+        ocupada_por = fila.dono_trava(args.planilha)
+        if ocupada_por: imprimir(f"⏳ Aguardando a gravação em andamento ({ocupada_por})...")
+        with fila.trava(args.planilha, esperar=True):
+            try:
+                # Mesmo sem sincronizar: um disco vazio precisa do histórico da planilha antes de gravar.
+                rotina.preparar_armazem(armazem, abrir_planilha)
+                df_com, df_aprov = rotina.montar_comissoes(linhas_com), rotina.montar_aproveitamento(linhas_aprov)
+                progresso = lambda percentual, mensagem: imprimir(f"[{percentual:3d}%] {mensagem}")
+
+                if df_com is not None or df_aprov is not None:
+                    resultado = rotina.executar_rotina(
+                        armazem, abrir_planilha, df_com, df_aprov, progresso,
+                        sincronizar=not (args.sem_sincronizar or args.reconstruir),
+                        arquivos=arquivos_novos,
+                    )
+                    if not resultado.unificado:
+                        imprimir("⚠️ Salvo, mas erro na unificação.")
+                        falhou = True
+                    if resultado.erro_sincronizacao is not None:
+                        imprimir(f"⚠️ Salvo localmente, mas a sincronização falhou: {resultado.erro_sincronizacao}")
+                        falhou = True
+
+                if args.reconstruir:
+                    resultado = rotina.executar_reconstrucao(armazem, abrir_planilha, progresso, sincronizar=not args.sem_sincronizar)
+                    if not resultado.unificado:
+                        imprimir("⚠️ Não foi possível reconstruir o Consolidado.")
+                        falhou = True
+                    elif resultado.erro_sincronizacao is not None:
+                        imprimir(f"⚠️ Consolidado reconstruído localmente, mas a sincronização falhou: {resultado.erro_sincronizacao}")
+                        falhou = True
+            except Exception as e:
+                imprimir(f"❌ Erro: {e}")
+                falhou = True
+
+    pendencias = armazem.pendencias()
+    if pendencias:
+        imprimir("Pendente de envio: " + ", ".join(f"{t} ({'tudo' if n is None else n})" for t, n in pendencias.items()))
+    for registro in medicao.etapas:
+        extras = ", ".join(f"{k}={v}" for k, v in registro.items() if k not in ("etapa", "segundos"))
+        imprimir(f"⏱️ {registro['etapa']:<45} {registro['segundos']:8.3f}s" + (f"  ({extras})" if extras else ""))
+    imprimir(f"🔌 {medicao}")
+    if args.log_desempenho: gravar_log(medicao, args.log_desempenho)
+    imprimir("❌ Terminado com falhas." if falhou else "✅ Concluído.")
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Conexão única com o Google Sheets, reaproveitada entre reruns.
+
+O cliente autorizado, a Planilha Mestra e cada aba são criados uma vez e
+guardados (no app, dentro de um st.cache_resource). A sessão HTTP é uma
+AuthorizedSession com pool de conexões: o token é renovado por ela mesma
+quando expira, sem recriar o cliente.
+
+Toda chamada que vai à API passa por chamar(): conta no total do servidor
+e entra na medição aberta (medicao.py) com tempo e tamanho do payload.
+Antes de sair, a chamada pega uma ficha do limitador (leituras e escritas
+têm cotas por minuto separadas na API); se a API responder 429 ou 5xx, ela
+é repetida com espera exponencial. Para rodar sem rede, troque a fábrica
+do cliente por planilha_falsa.ClienteFalso (que também simula cota).
+"""
+import random
+import threading
+import time
+from collections import Counter
+
+from medicao import registrar_api, registrar_etapa
+
+ESCOPOS = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+TAMANHO_POOL = 10
+
+# Métodos de Spreadsheet/Worksheet que fazem requisição à API.
+METODOS_API = frozenset({
+    "acell", "add_worksheet", "append_rows", "batch_clear", "batch_get", "batch_update",
+    "del_worksheet", "fetch_sheet_metadata", "format", "get_all_records", "get_all_values",
+    "row_values", "update", "values_batch_clear", "values_batch_get", "values_batch_update", "worksheet", "worksheets",
+})
+METODOS_ESCRITA = frozenset({
+    "add_worksheet", "append_rows", "batch_clear", "batch_update", "del_worksheet", "format",
+    "update", "values_batch_clear", "values_batch_update",
+})
+# Repetir depois de um 5xx pode duplicar o efeito destes; só o 429 (recusada) é seguro.
+METODOS_NAO_IDEMPOTENTES = frozenset({"add_worksheet", "append_rows", "del_worksheet"})
+
+# A cota da API é de 60 leituras e 60 escritas por minuto por usuário: 50/min
+# com rajada de 10 nunca passa de 60 em nenhuma janela de um minuto.
+LIMITE_POR_MINUTO = 50
+RAJADA = 10
+STATUS_REPETIR = frozenset({429, 500, 502, 503, 504})
+TENTATIVAS = 6
+ESPERA_INICIAL = 1.0
+ESPERA_MAXIMA = 64.0
+
+
+def criar_cliente(info_conta_servico, tamanho_pool=TAMANHO_POOL):
+    """Cliente gspread sobre uma AuthorizedSession com pool de conexões HTTP."""
+    import gspread
+    from google.auth.transport.requests import AuthorizedSession
+    from google.oauth2.service_account import Credentials
+    from requests.adapters import HTTPAdapter
+
+    creds = Credentials.from_service_account_info(info_conta_servico, scopes=ESCOPOS)
+    sessao = AuthorizedSession(creds)
+    sessao.mount("https://", HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool))
+    return gspread.authorize(creds, session=sessao)
+
+
+class LimitadorTaxa:
+    """Balde de fichas: até `rajada` chamadas seguidas, depois `por_minuto` em ritmo constante."""
+
+    def __init__(self, por_minuto=LIMITE_POR_MINUTO, rajada=RAJADA, relogio=time.monotonic, dormir=time.sleep):
+        self.taxa = por_minuto / 60.0
+        self.capacidade = float(rajada)
+        self.fichas = float(rajada)
+        self._relogio = relogio
+        self._dormir = dormir
+        self._ultimo = relogio()
+        self._trava = threading.Lock()
+
+    def aguardar(self):
+        """Pega uma ficha, dormindo o necessário; devolve quantos segundos esperou."""
+        with self._trava:
+            agora = self._relogio()
+            self.fichas = min(self.capacidade, self.fichas + (agora - self._ultimo) * self.taxa)
+            self._ultimo = agora
+            # A ficha é reservada já (o saldo pode ficar negativo): threads concorrentes entram na fila.
+            self.fichas -= 1
+            espera = -self.fichas / self.taxa if self.fichas < 0 else 0.0
+        if espera: self._dormir(espera)
+        return espera
+
+
+def status_http(erro):
+    """Código HTTP de um erro da API (gspread.exceptions.APIError ou equivalente), ou None."""
+    codigo = getattr(erro, "code", None)
+    if isinstance(codigo, int) and codigo > 0: return codigo
+    return getattr(getattr(erro, "response", None), "status_code", None)
+
+
+def _espera_sugerida(erro):
+    """Retry-After da resposta, em segundos (0 se não houver)."""
+    cabecalhos = getattr(getattr(erro, "response", None), "headers", None) or {}
+    try: return float(cabecalhos.get("Retry-After", 0))
+    except (TypeError, ValueError): return 0.0
+
+
+def tamanho_payload(metodo, args, kwargs, resultado):
+    """(linhas, células) enviadas ou recebidas numa chamada, para a medição."""
+    if metodo == "values_batch_update":
+        corpo = kwargs.get("body", args[0] if args else None) or {}
+        valores = [linha for item in corpo.get("data", []) for linha in item["values"]]
+    elif metodo in ("update", "append_rows"):
+        valores = kwargs.get("values", args[0] if args else None) or []
+    elif metodo == "batch_update":
+        valores = [linha for item in (kwargs.get("data", args[0] if args else None) or []) for linha in item["values"]]
+    elif metodo == "batch_get":
+        valores = [linha for faixa in resultado for linha in faixa]
+    elif metodo == "values_batch_get":
+        valores = [linha for faixa in resultado.get("valueRanges", []) for linha in faixa.get("values", [])]
+    elif metodo == "get_all_values":
+        valores = resultado
+    elif metodo == "get_all_records":
+        return len(resultado), sum(len(registro) for registro in resultado)
+    elif metodo == "row_values":
+        valores = [resultado]
+    else:
+        return 0, 0
+    return len(valores), sum(len(linha) for linha in valores)
+
+
+class _Contado:
+    """Repassa tudo ao objeto do gspread, contando as chamadas que vão à API."""
+
+    def __init__(self, alvo, conexao):
+        self._alvo = alvo
+        self._conexao = conexao
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._alvo, nome)
+        if nome not in METODOS_API or not callable(atributo): return atributo
+
+        def chamada(*args, **kwargs):
+            return self._conexao.chamar(nome, atributo, *args, **kwargs)
+        return chamada
+
+
+class _AbaConectada(_Contado):
+    """Worksheet contada; aba.spreadsheet devolve a planilha contada, não a do gspread."""
+
+    def __init__(self, alvo, conexao, planilha):
+        super().__init__(alvo, conexao)
+        self.spreadsheet = planilha
+
+
+class PlanilhaConectada(_Contado):
+    """Spreadsheet com as abas guardadas: worksheet() só vai à API na primeira vez."""
+
+    def __init__(self, alvo, conexao):
+        super().__init__(alvo, conexao)
+        self._abas = {}
+        self._trava = threading.Lock()
+
+    def worksheet(self, titulo):
+        with self._trava:
+            if titulo not in self._abas:
+                self._abas[titulo] = _AbaConectada(self._conexao.chamar("worksheet", self._alvo.worksheet, titulo), self._conexao, self)
+            return self._abas[titulo]
+
+    def worksheets(self):
+        """
+        Lista as abas (uma chamada) e já guarda os handles para os worksheet()
+        seguintes; handles de títulos que sumiram (abas renomeadas ou apagadas) saem.
+        """
+        abas = self._conexao.chamar("worksheets", self._alvo.worksheets)
+        with self._trava:
+            self._abas = {aba.title: self._abas.get(aba.title) or _AbaConectada(aba, self._conexao, self) for aba in abas}
+            return list(self._abas.values())
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        with self._trava:
+            aba = self._conexao.chamar("add_worksheet", self._alvo.add_worksheet, title=title, rows=rows, cols=cols, **kwargs)
+            self._abas[title] = _AbaConectada(aba, self._conexao, self)
+            return self._abas[title]
+
+    def del_worksheet(self, aba):
+        with self._trava:
+            self._abas.pop(aba.title, None)
+            return self._conexao.chamar("del_worksheet", self._alvo.del_worksheet, getattr(aba, "_alvo", aba))
+
+
+class ConexaoPlanilha:
+    def __init__(self, fabrica_cliente, por_minuto=LIMITE_POR_MINUTO, tentativas=TENTATIVAS, dormir=time.sleep):
+        self._fabrica = fabrica_cliente
+        self._cliente = None
+        self._planilhas = {}
+        self._trava = threading.RLock()
+        self._dormir = dormir
+        self.tentativas = tentativas
+        self.limitadores = {
+            "leitura": LimitadorTaxa(por_minuto, dormir=dormir),
+            "escrita": LimitadorTaxa(por_minuto, dormir=dormir),
+        }
+        self.total = Counter()
+
+    # --- HANDLES ---
+    def cliente(self):
+        with self._trava:
+            if self._cliente is None: self._cliente = self._fabrica()
+            return self._cliente
+
+    def planilha(self, chave):
+        with self._trava:
+            if chave not in self._planilhas:
+                self._planilhas[chave] = PlanilhaConectada(self.chamar("open_by_key", self.cliente().open_by_key, chave), self)
+            return self._planilhas[chave]
+
+    # --- CONTAGEM, COTA E REPETIÇÃO ---
+    def chamar(self, metodo, funcao, *args, **kwargs):
+        """
+        Executa uma chamada à API respeitando o limitador e repetindo com espera
+        exponencial (com jitter) em 429/5xx. Cada tentativa soma no total do
+        servidor e na medição aberta (medicao.py); as esperas viram etapas.
+        """
+        limitador = self.limitadores["escrita" if metodo in METODOS_ESCRITA else "leitura"]
+        repetiveis = {429} if metodo in METODOS_NAO_IDEMPOTENTES else STATUS_REPETIR
+        for tentativa in range(self.tentativas):
+            espera = limitador.aguardar()
+            if espera: registrar_etapa("espera do limitador", espera, metodo=metodo)
+            try: return self._chamar_uma_vez(metodo, funcao, *args, **kwargs)
+            except Exception as e:
+                status = status_http(e)
+                if status not in repetiveis or tentativa == self.tentativas - 1: raise
+                espera = max(_espera_sugerida(e), min(ESPERA_MAXIMA, ESPERA_INICIAL * 2 ** tentativa) * random.uniform(1.0, 1.5))
+                registrar_etapa("espera após erro da API", espera, metodo=metodo, status=status, tentativa=tentativa + 1)
+                self._dormir(espera)
+
+    def _chamar_uma_vez(self, metodo, funcao, *args, **kwargs):
+        with self._trava: self.total[metodo] += 1
+        inicio = time.perf_counter()
+        resultado = None
+        try:
+            resultado = funcao(*args, **kwargs)
+            return resultado
+        finally:
+            # Se a chamada falhou, não há resultado para medir.
+            try: linhas, celulas = tamanho_payload(metodo, args, kwargs, resultado)
+            except Exception: linhas, celulas = 0, 0
+            registrar_api(metodo, time.perf_counter() - inicio, linhas, celulas)
@@ -0,0 +1,78 @@
+"""
+Decodificação dos uploads numa passada só.
+
+Em vez de tentar utf-8 no arquivo inteiro e, na falha, decodificar tudo de
+novo em latin-1, olha primeiro o começo do arquivo: BOM (utf-8/16/32),
+UTF-16 sem BOM (bytes nulos intercalados) e o charset declarado em
+<meta>. O conteúdo é lido por um memoryview, sem cópias.
+
+Só o BOM e os bytes nulos indicam UTF-16/32. Um <meta> que declara utf-16
+ou utf-32 num arquivo que chegou até ele como ASCII está errado, e vale
+utf-8 (a mesma regra dos navegadores, WHATWG).
+
+Regra para o resto, igual à de antes: só ASCII -> ascii; UTF-8 válido ->
+utf-8 (mesmo que o <meta> diga outra coisa, caso comum em exportações);
+senão o charset declarado (ex.: windows-1252) ou latin-1 (SLK/ANSI).
+"""
+import codecs
+import re
+
+TAMANHO_AMOSTRA = 4096
+CODIFICACAO_PADRAO = "latin-1"
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+_NAO_ASCII = re.compile(rb"[\x80-\xff]")
+
+
+def _nome_codec(nome):
+    """Nome canônico do codec do Python, ou None se desconhecido."""
+    try: return codecs.lookup(nome.decode("ascii", "ignore")).name
+    except LookupError: return None
+
+
+def detectar_codificacao(dados):
+    """
+    Devolve (codificação sugerida, tamanho do BOM) olhando só os primeiros KB.
+    A codificação sugerida é None quando nada foi declarado.
+    """
+    visao = memoryview(dados)
+    for bom, nome in _BOMS:
+        if visao[:len(bom)] == bom: return nome, len(bom)
+
+    amostra = visao[:TAMANHO_AMOSTRA].tobytes()
+    if amostra.count(0) > len(amostra) // 4:
+        # UTF-16 sem BOM: texto ASCII vira pares com um byte nulo (antes no BE, depois no LE).
+        pares_be = amostra[0::2].count(0)
+        return ("utf-16-be" if pares_be > amostra[1::2].count(0) else "utf-16-le"), 0
+
+    declarado = _CHARSET.search(amostra)
+    nome = _nome_codec(declarado.group(1)) if declarado else None
+    if nome and nome.startswith(("utf-16", "utf-32")): nome = "utf-8"
+    return nome, 0
+
+
+def decodificar(dados):
+    """Decodifica uma vez e devolve (texto, codificação usada)."""
+    sugerida, bom = detectar_codificacao(dados)
+    visao = memoryview(dados)[bom:]
+
+    if sugerida and (sugerida.startswith("utf-16") or sugerida.startswith("utf-32")):
+        return str(visao, sugerida, "replace"), sugerida
+    if bom: return str(visao, "utf-8", "replace"), "utf-8-sig"
+
+    if _NAO_ASCII.search(visao) is None: return str(visao, "ascii"), "ascii"
+    try: return str(visao, "utf-8"), "utf-8"
+    except UnicodeDecodeError: pass
+
+    for nome in (sugerida, CODIFICACAO_PADRAO):
+        if nome in (None, "utf-8"): continue
+        try: return str(visao, nome), nome
+        except UnicodeDecodeError: continue
+    return str(visao, CODIFICACAO_PADRAO), CODIFICACAO_PADRAO
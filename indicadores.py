@@ -0,0 +1,104 @@
+"""
+Indicadores por técnico (somas e razões) em períodos de dia, semana e mês.
+
+Ficam materializados no armazém local (tabelas Indicadores_Dia,
+Indicadores_Semana e Indicadores_Mes, particionadas pelo mês do início do
+período), recalculados pela unificação só nos períodos que contêm as datas
+tocadas. O painel lê essas tabelas prontas: o ranking de um trimestre soma
+três linhas mensais por técnico em vez de reagregar o Consolidado.
+
+Uma semana fica na partição do mês da sua segunda-feira, mas aparece em
+todos os meses que toca: ao mostrar meses escolhidos, o painel lê também a
+partição do mês anterior e fica com as semanas que terminam dentro deles
+(particoes_periodo / recortar_periodo).
+
+  * Eficiência = TP / TG
+  * Produtividade = TP / Disp
+As razões são sempre calculadas sobre as somas do período (nunca média de
+razões); sem denominador, ficam vazias.
+"""
+import numpy as np
+import pandas as pd
+
+from medicao import cronometrado
+from registros import converter_datas_serie
+
+METRICAS = ['Horas Vendidas', 'Disp', 'TP', 'TG']
+# Granularidade -> tabela no armazém
+TABELAS_INDICADORES = {"dia": "Indicadores_Dia", "semana": "Indicadores_Semana", "mes": "Indicadores_Mes"}
+NOMES_GRANULARIDADE = {"dia": "Dia", "semana": "Semana", "mes": "Mês"}
+CHAVES_INDICADORES = ["Período", "Técnico"]
+COLUNAS_INDICADORES = CHAVES_INDICADORES + ["Lançamentos"] + METRICAS + ["Eficiência", "Produtividade"]
+
+
+def inicio_periodo(datas, granularidade):
+    """Data (datetime64) -> início do período: o próprio dia, a segunda-feira da semana ou o dia 1 do mês."""
+    datas = datas.dt.normalize()
+    if granularidade == "semana": return datas - pd.to_timedelta(datas.dt.weekday, unit="D")
+    if granularidade == "mes": return datas - pd.to_timedelta(datas.dt.day - 1, unit="D")
+    return datas
+
+
+def meses_cobertos(datas):
+    """Partições (AAAA-MM) do Consolidado com todos os dias das semanas e meses dessas datas."""
+    semanas = inicio_periodo(datas, "semana")
+    extremos = pd.concat([datas, semanas, semanas + pd.Timedelta(days=6)])
+    return sorted(set(extremos.dt.strftime("%Y-%m")))
+
+
+def particoes_periodo(granularidade, meses):
+    """Partições (AAAA-MM) a ler para mostrar esses meses: na semana, também a do mês anterior ao primeiro."""
+    meses = list(meses)
+    if granularidade != "semana" or not meses: return meses
+    anterior = (pd.Period(meses[0], freq="M") - 1).strftime("%Y-%m")
+    return [anterior] + meses
+
+
+def recortar_periodo(df, granularidade, meses):
+    """Linhas de particoes_periodo cujo período toca esses meses (semanas que terminam a partir do dia 1 do primeiro)."""
+    meses = list(meses)
+    if granularidade != "semana" or df.empty or not meses: return df
+    primeiro_dia = pd.Period(meses[0], freq="M").start_time
+    fim_semana = converter_datas_serie(df["Período"]) + pd.Timedelta(days=6)
+    return df[(fim_semana >= primeiro_dia).to_numpy()].reset_index(drop=True)
+
+
+def com_razoes(df):
+    """Acrescenta Eficiência e Produtividade calculadas sobre as somas."""
+    df = df.copy()
+    tp = df["TP"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["Eficiência"] = np.where(df["TG"].to_numpy(dtype=float) != 0, tp / df["TG"].to_numpy(dtype=float), np.nan)
+        df["Produtividade"] = np.where(df["Disp"].to_numpy(dtype=float) != 0, tp / df["Disp"].to_numpy(dtype=float), np.nan)
+    return df
+
+
+@cronometrado("agregação dos indicadores")
+def agregar(df_cons, granularidade, periodos=None):
+    """
+    Consolidado -> uma linha por (Período, Técnico) com a contagem de
+    lançamentos, as somas e as razões. Linhas sem data válida ficam de fora;
+    com periodos, só esses inícios de período são calculados.
+    """
+    if df_cons.empty or "Data" not in df_cons.columns: return pd.DataFrame(columns=COLUNAS_INDICADORES)
+    datas = converter_datas_serie(df_cons["Data"].astype(str))
+    df = pd.DataFrame({"Período": inicio_periodo(datas, granularidade), "Técnico": df_cons["Técnico"].astype(str)})
+    for metrica in METRICAS:
+        df[metrica] = pd.to_numeric(df_cons[metrica], errors="coerce").fillna(0.0) if metrica in df_cons.columns else 0.0
+    manter = df["Período"].notna()
+    if periodos is not None: manter &= df["Período"].isin(periodos)
+    df = df[manter]
+    if df.empty: return pd.DataFrame(columns=COLUNAS_INDICADORES)
+
+    agrupado = df.groupby(CHAVES_INDICADORES, sort=True)
+    somas = agrupado[METRICAS].sum()
+    somas.insert(0, "Lançamentos", agrupado.size())
+    return com_razoes(somas.reset_index())[COLUNAS_INDICADORES]
+
+
+def ranking(df_ind, tecnicos=None):
+    """Soma as linhas de indicadores de cada técnico (ex.: três meses) e ordena pela Eficiência."""
+    if df_ind.empty: return pd.DataFrame(columns=COLUNAS_INDICADORES[1:]).set_index("Técnico")
+    if tecnicos: df_ind = df_ind[df_ind["Técnico"].isin(tecnicos)]
+    somas = df_ind.groupby("Técnico")[["Lançamentos"] + METRICAS].sum()
+    return com_razoes(somas).sort_values(["Eficiência", "TP"], ascending=False, na_position="last")
@@ -0,0 +1,196 @@
+"""
+Leitura em lote dos uploads, distribuída entre processos (forkserver, com
+o pool mantido entre um lote e outro).
+
+Os workers recebem só (nome, bytes) e devolvem cada arquivo já como
+tabela tipada (registros.py: datas, categorias e números), sem nenhum
+objeto do Streamlit: volta para o processo principal bem menor que as
+listas de texto. Erros de cada arquivo são coletados e devolvidos junto
+com o resultado, na mesma ordem dos arquivos enviados.
+Arquivos já vistos (mesmo SHA-256) vêm do cache e não vão para os workers.
+Com o índice de arquivos do armazém (conhecidos), os relatórios já gravados
+e os repetidos dentro do mesmo envio nem são lidos: ficam listados no
+resultado e fora da tabela, e os novos saem com o registro para o índice.
+A codificação de cada arquivo é detectada uma vez (decodificacao.py) e
+fica registrada no resultado.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from armazem import COLUNAS_ARQUIVOS
+from cache import CacheLeitura, hash_conteudo
+from decodificacao import decodificar
+from medicao import etapa, registrar_etapa
+from parsers import EXTRATORES, MOTOR_PADRAO, data_do_relatorio
+from registros import ESQUEMAS, juntar, montar
+
+WORKERS_PADRAO = os.cpu_count() or 1
+# (workers, ProcessPoolExecutor) em uso; ver _pool().
+_POOL = None
+_TRAVA_POOL = threading.Lock()
+
+
+class ResultadoLote:
+    """
+    Tabela tipada com as linhas de todos os arquivos, os erros por arquivo (nome,
+    mensagem), o uso do cache, a codificação detectada por arquivo (nome,
+    codificação; None quando veio do cache) e o tempo somado de
+    decodificação/parser nos processos. Com o índice de arquivos: os registros
+    dos arquivos novos (arquivos, sem Importado em), os já gravados (nome,
+    registro do índice) e os repetidos no envio (nome, nome do primeiro).
+    """
+    __slots__ = (
+        "tabela", "erros", "codificacoes", "arquivos", "conhecidos", "repetidos",
+        "acertos_cache", "falhas_cache", "segundos_decodificacao", "segundos_parser",
+    )
+
+    def __init__(self, tabela=None, erros=None):
+        self.tabela = tabela
+        self.erros = erros if erros is not None else []
+        self.codificacoes = []
+        self.arquivos = pd.DataFrame(columns=COLUNAS_ARQUIVOS[:-1])
+        self.conhecidos = []
+        self.repetidos = []
+        self.acertos_cache = 0
+        self.falhas_cache = 0
+        self.segundos_decodificacao = 0.0
+        self.segundos_parser = 0.0
+
+
+def _ler_arquivo_medido(tipo, nome_arquivo, dados, motor=MOTOR_PADRAO):
+    """
+    (tabela, erro, codificação, data do relatório, segundos de decodificação,
+    segundos de parser). Roda dentro do worker.
+    """
+    linhas, codificacao, data_relatorio = [], None, None
+    inicio = time.perf_counter()
+    decodificado = inicio
+    try:
+        conteudo, codificacao = decodificar(dados)
+        decodificado = time.perf_counter()
+        for linha in EXTRATORES[tipo](nome_arquivo, conteudo, motor): linhas.append(linha)
+        data_relatorio = data_do_relatorio(conteudo)
+        erro = None
+    except Exception as e:
+        erro = str(e)
+    # A tipagem conta como parser: as linhas lidas antes de um erro também vão.
+    tabela = montar(tipo, linhas)
+    fim = time.perf_counter()
+    return tabela, erro, codificacao, data_relatorio, decodificado - inicio, fim - decodificado
+
+
+def _ler_arquivo_tupla(args):
+    return _ler_arquivo_medido(*args)
+
+
+def _contexto_processos():
+    # fork dentro do servidor do Streamlit (várias threads) pode copiar travas
+    # presas por outras threads e travar o worker. Com forkserver os workers
+    # saem de um processo limpo, que já carrega este módulo (e os parsers) uma
+    # vez; o __main__ do pai só é importado como __mp_main__, e nada aqui
+    # importa o Streamlit. Sem forkserver (Windows), spawn.
+    if "forkserver" not in multiprocessing.get_all_start_methods(): return multiprocessing.get_context("spawn")
+    contexto = multiprocessing.get_context("forkserver")
+    contexto.set_forkserver_preload([__name__])
+    return contexto
+
+
+def _pool(workers):
+    """
+    Pool de processos reaproveitado entre lotes (subir workers sem fork custa
+    segundos): só é recriado se o número de workers mudar ou se quebrar.
+    """
+    global _POOL
+    with _TRAVA_POOL:
+        if _POOL is not None and (_POOL[0] != workers or _POOL[1]._broken):
+            _POOL[1].shutdown(wait=False)
+            _POOL = None
+        if _POOL is None: _POOL = (workers, ProcessPoolExecutor(max_workers=workers, mp_context=_contexto_processos()))
+        return _POOL[1]
+
+
+def _renomear(tipo, tabela, nome_arquivo):
+    # O cache é por conteúdo: o mesmo arquivo pode voltar com outro nome.
+    tabela[ESQUEMAS[tipo].arquivo] = pd.Categorical([nome_arquivo] * len(tabela))
+    return tabela
+
+
+def resumo_codificacoes(codificacoes):
+    """'utf-8 (3), latin-1 (2)' — arquivos vindos do cache não entram."""
+    contagem = Counter(codificacao for _, codificacao in codificacoes if codificacao)
+    return ", ".join(f"{codificacao} ({n})" for codificacao, n in contagem.most_common())
+
+
+def processar_lote(tipo, arquivos, motor=MOTOR_PADRAO, workers=WORKERS_PADRAO, cache=None, conhecidos=None):
+    """
+    Lê uma lista de (nome, bytes) do tipo "comissoes" ou "aproveitamento".
+    Com workers=1 (ou um único arquivo) tudo roda no próprio processo.
+    Se um CacheLeitura for informado, só os arquivos inéditos são lidos.
+    Com conhecidos ({SHA-256: registro}, ArmazemLocal.arquivos_conhecidos),
+    os arquivos já gravados e os repetidos no envio são pulados.
+    """
+    with etapa(f"leitura {tipo}", arquivos=len(arquivos), motor=motor) as extras:
+        lote = _processar_lote(tipo, arquivos, motor, workers, cache, conhecidos)
+        extras.update(linhas=len(lote.tabela), cache=lote.acertos_cache, conhecidos=len(lote.conhecidos) + len(lote.repetidos))
+    if lote.falhas_cache:
+        registrar_etapa(f"decodificação {tipo} (soma nos processos)", lote.segundos_decodificacao, arquivos=lote.falhas_cache)
+        registrar_etapa(f"parser {tipo} (soma nos processos)", lote.segundos_parser, arquivos=lote.falhas_cache)
+    return lote
+
+
+def _processar_lote(tipo, arquivos, motor, workers, cache, conhecidos):
+    lote = ResultadoLote()
+    por_arquivo = [None] * len(arquivos)
+    hashes = [None] * len(arquivos)
+    chaves = [None] * len(arquivos)
+    primeiros = {}
+    tarefas, posicoes = [], []
+    for i, (nome, dados) in enumerate(arquivos):
+        if cache is not None or conhecidos is not None: hashes[i] = hash_conteudo(dados)
+        if conhecidos is not None:
+            if hashes[i] in conhecidos:
+                lote.conhecidos.append((nome, conhecidos[hashes[i]]))
+                continue
+            if hashes[i] in primeiros:
+                lote.repetidos.append((nome, primeiros[hashes[i]]))
+                continue
+            primeiros[hashes[i]] = nome
+        if cache is not None:
+            chaves[i] = CacheLeitura.chave(tipo, hashes[i], motor)
+            guardado = cache.buscar(chaves[i])
+            if guardado is not None:
+                tabela, data_relatorio = guardado
+                lote.acertos_cache += 1
+                por_arquivo[i] = (_renomear(tipo, tabela, nome), None, None, data_relatorio)
+                continue
+            lote.falhas_cache += 1
+        tarefas.append((tipo, nome, dados, motor))
+        posicoes.append(i)
+
+    workers = max(1, min(int(workers or 1), len(tarefas)))
+    if workers == 1: resultados = map(_ler_arquivo_tupla, tarefas)
+    else: resultados = _pool(workers).map(_ler_arquivo_tupla, tarefas, chunksize=max(1, len(tarefas) // (workers * 4)))
+
+    for i, (tabela, erro, codificacao, data_relatorio, segundos_decodificacao, segundos_parser) in zip(posicoes, resultados):
+        por_arquivo[i] = (tabela, erro, codificacao, data_relatorio)
+        lote.segundos_decodificacao += segundos_decodificacao
+        lote.segundos_parser += segundos_parser
+        if cache is not None and erro is None: cache.guardar(chaves[i], tabela, data_relatorio)
+
+    registros = []
+    for (nome, _), hash_arquivo, lido in zip(arquivos, hashes, por_arquivo):
+        if lido is None: continue
+        tabela, erro, codificacao, data_relatorio = lido
+        lote.codificacoes.append((nome, codificacao))
+        if erro is not None: lote.erros.append((nome, erro))
+        # Arquivo com erro não entra no índice: reenviado, é lido de novo.
+        elif conhecidos is not None: registros.append([tipo, hash_arquivo, nome, data_relatorio or "", len(tabela)])
+    if registros: lote.arquivos = pd.DataFrame(registros, columns=COLUNAS_ARQUIVOS[:-1])
+    lote.tabela = juntar(tipo, [lido[0] for lido in por_arquivo if lido is not None])
+    return lote
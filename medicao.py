@@ -0,0 +1,137 @@
+"""
+Medição leve de desempenho por execução (upload, gravação, reconstrução).
+
+    with medir("Gravar tudo") as medicao:      # abre a medição da thread atual
+        with etapa("merge", linhas=len(df)):   # cronometra um trecho
+            ...
+    medicao.como_dict()                        # etapas + chamadas à API
+
+Fora de um medir(), etapa() e registrar_api() não fazem nada, então as
+funções instrumentadas (parsers, gravação, merge, pivot) custam o mesmo
+de antes quando ninguém está medindo.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+CAMINHO_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "desempenho.jsonl")
+
+_local = threading.local()
+
+
+class Medicao:
+    """Etapas cronometradas e chamadas à API (com tamanho do payload) de uma execução."""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.inicio = datetime.now()
+        self.segundos = 0.0
+        self.etapas = []
+        self.api = {}
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Refaz uma medição a partir de como_dict() (ex.: a de uma tarefa que rodou em outra thread)."""
+        medicao = cls(dados["nome"])
+        medicao.inicio = datetime.fromisoformat(dados["inicio"])
+        medicao.segundos = dados["segundos"]
+        medicao.etapas = list(dados["etapas"])
+        medicao.api = {
+            total["metodo"]: {campo: total[campo] for campo in ("chamadas", "segundos", "linhas", "celulas")}
+            for total in dados["api"]
+        }
+        return medicao
+
+    def adicionar_etapa(self, nome, segundos, **extras):
+        self.etapas.append({"etapa": nome, "segundos": round(segundos, 4), **extras})
+
+    def adicionar_api(self, metodo, segundos, linhas=0, celulas=0):
+        total = self.api.setdefault(metodo, {"chamadas": 0, "segundos": 0.0, "linhas": 0, "celulas": 0})
+        total["chamadas"] += 1
+        total["segundos"] += segundos
+        total["linhas"] += linhas
+        total["celulas"] += celulas
+
+    @property
+    def chamadas_api(self):
+        return sum(total["chamadas"] for total in self.api.values())
+
+    def __str__(self):
+        detalhe = ", ".join(
+            f"{metodo} {total['chamadas']}" for metodo, total in sorted(self.api.items(), key=lambda item: -item[1]["chamadas"])
+        )
+        return f"{self.nome}: {self.chamadas_api} chamada(s) à API em {self.segundos:.1f}s" + (f" ({detalhe})" if detalhe else "")
+
+    def como_dict(self):
+        return {
+            "nome": self.nome,
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "segundos": round(self.segundos, 4),
+            "etapas": self.etapas,
+            "api": [
+                {"metodo": metodo, **total, "segundos": round(total["segundos"], 4)}
+                for metodo, total in sorted(self.api.items(), key=lambda item: -item[1]["segundos"])
+            ],
+        }
+
+
+def _ativas():
+    if not hasattr(_local, "medicoes"): _local.medicoes = []
+    return _local.medicoes
+
+
+@contextmanager
+def medir(nome):
+    """Abre uma medição na thread atual; medições aninhadas também recebem tudo o que acontece dentro."""
+    medicao = Medicao(nome)
+    ativas = _ativas()
+    ativas.append(medicao)
+    inicio = time.perf_counter()
+    try: yield medicao
+    finally:
+        medicao.segundos = time.perf_counter() - inicio
+        ativas.remove(medicao)
+
+
+@contextmanager
+def etapa(nome, **extras):
+    """Cronometra o bloco em todas as medições abertas; extras (linhas, arquivos...) vão junto."""
+    ativas = _ativas()
+    if not ativas:
+        yield extras
+        return
+    inicio = time.perf_counter()
+    try: yield extras
+    finally:
+        segundos = time.perf_counter() - inicio
+        for medicao in ativas: medicao.adicionar_etapa(nome, segundos, **extras)
+
+
+def cronometrado(nome):
+    """Decorator: cada chamada da função vira uma etapa."""
+    def decorar(funcao):
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            with etapa(nome): return funcao(*args, **kwargs)
+        return medida
+    return decorar
+
+
+def registrar_etapa(nome, segundos, **extras):
+    """Etapa já cronometrada em outro lugar (ex.: tempo somado dos processos de leitura)."""
+    for medicao in _ativas(): medicao.adicionar_etapa(nome, segundos, **extras)
+
+
+def registrar_api(metodo, segundos, linhas=0, celulas=0):
+    for medicao in _ativas(): medicao.adicionar_api(metodo, segundos, linhas, celulas)
+
+
+def gravar_log(medicao, caminho=CAMINHO_LOG):
+    """Acrescenta a medição (uma linha JSON) ao log local, para análise de tendência."""
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write(json.dumps(medicao.como_dict(), ensure_ascii=False) + "\n")
@@ -0,0 +1,213 @@
+"""
+Normalização de números e datas vindos das abas.
+
+As funções escalares são as regras de referência. As versões *_serie fazem
+o mesmo sobre uma coluna inteira: codificam a coluna por valor distinto,
+tratam os distintos com os kernels de texto do pyarrow e espalham o
+resultado com numpy, devolvendo exatamente os mesmos valores (inclusive os
+0.0 de fallback e a expansão de ano com dois dígitos).
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from gspread.utils import numericise
+
+# Literais que float() e o cast do Arrow leem igual; o resto (raro) passa pela regra escalar.
+_NUMERO_SIMPLES = r"^[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?$"
+_NUMERO_BR_LIMPO = r"^[0-9]+(?:,[0-9]+)?$"
+
+
+# --- REGRAS ESCALARES (REFERÊNCIA) ---
+def converter_br_para_float(valor):
+    """
+    Limpa o valor para garantir que seja processável como número.
+    Nota: A divisão por 100 ocorrerá APENAS na exportação final.
+    """
+    if pd.isna(valor) or valor == "":
+        return 0.0
+
+    if isinstance(valor, (int, float)):
+        return float(valor)
+
+    valor_str = str(valor).strip()
+    valor_str = valor_str.replace('\xa0', '').replace('R$', '').strip()
+
+    if not valor_str:
+        return 0.0
+
+    # Remove ponto de milhar se existir
+    if '.' in valor_str and ',' in valor_str:
+        valor_str = valor_str.replace('.', '')
+
+    # Troca vírgula por ponto para o Python entender
+    valor_str = valor_str.replace(',', '.')
+
+    try:
+        return float(valor_str)
+    except:
+        return 0.0
+
+def converter_como_planilha(valor):
+    """
+    O número que a unificação obtém de um texto da aba: o numericise do
+    get_all_records (que descarta as vírgulas: '12,50' -> 1250) seguido de
+    converter_br_para_float. Daí a divisão por 100 na exportação final.
+    """
+    return converter_br_para_float(numericise(valor) if isinstance(valor, str) else valor)
+
+
+def padronizar_data_quatro_digitos(data_str):
+    """
+    NOVA FUNÇÃO CRÍTICA:
+    Transforma '08/12/25' em '08/12/2025'.
+    Garante que as chaves de data sejam idênticas para o merge.
+    """
+    if pd.isna(data_str) or data_str == "":
+        return ""
+
+    data_str = str(data_str).strip()
+
+    # Verifica se tem barras
+    if '/' in data_str:
+        partes = data_str.split('/')
+        # Se tiver 3 partes (dia, mes, ano)
+        if len(partes) == 3:
+            dia, mes, ano = partes
+            # Se o ano tiver apenas 2 dígitos, adiciona '20' na frente
+            if len(ano) == 2:
+                ano = '20' + ano
+
+            # Reconstrói a data padronizada com zeros à esquerda se precisar (ex: 8 vira 08)
+            return f"{dia.zfill(2)}/{mes.zfill(2)}/{ano}"
+
+    return data_str
+
+
+# --- VERSÕES VETORIZADAS ---
+def _vazios(serie):
+    """Máscara de NaN/None e de string vazia (os dois viram 0.0 / "")."""
+    vazios = serie.isna().to_numpy(copy=True)
+    if serie.dtype == object or pd.api.types.is_string_dtype(serie.dtype):
+        vazios |= (serie.to_numpy(dtype=object) == "")
+    return vazios
+
+
+def _texto_arrow(valores):
+    """str() de cada valor como array Arrow, para usar os kernels de texto do pyarrow."""
+    try: return pa.array(valores, type=pa.string(), from_pandas=True)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        return pa.array(valores.astype(str), type=pa.string())
+
+
+def _distintos(valores):
+    """
+    Codifica a coluna por valor distinto (datas e horas se repetem muito):
+    devolve os textos distintos e, para cada linha, o índice do seu valor.
+    """
+    codificado = pc.dictionary_encode(_texto_arrow(valores))
+    indices = codificado.indices.fill_null(0).to_numpy(zero_copy_only=False)
+    return codificado.dictionary, indices
+
+
+def _limpar_e_converter(texto):
+    """Aplica a limpeza de converter_br_para_float a um array Arrow; devolve (números, é_literal_simples)."""
+    texto = pc.utf8_trim_whitespace(texto)
+    texto = pc.replace_substring(pc.replace_substring(texto, '\xa0', ''), 'R$', '')
+    texto = pc.utf8_trim_whitespace(texto)
+    milhar = pc.and_(pc.match_substring(texto, '.'), pc.match_substring(texto, ','))
+    texto = pc.if_else(milhar, pc.replace_substring(texto, '.', ''), texto)
+    texto = pc.replace_substring(texto, ',', '.')
+
+    simples = pc.match_substring_regex(texto, _NUMERO_SIMPLES).to_numpy(zero_copy_only=False)
+    numeros = np.zeros(len(texto), dtype=np.float64)
+    numeros[simples] = pc.cast(pc.filter(texto, pa.array(simples)), pa.float64()).to_numpy(zero_copy_only=False)
+    return numeros, simples
+
+
+def converter_br_para_float_serie(serie):
+    """Versão vetorizada de converter_br_para_float para uma coluna inteira."""
+    if pd.api.types.is_bool_dtype(serie.dtype) or pd.api.types.is_numeric_dtype(serie.dtype):
+        return pd.Series(serie.astype(np.float64).fillna(0.0).to_numpy(), index=serie.index)
+
+    valores = serie.to_numpy(dtype=object)
+    vazios = _vazios(serie)
+    distintos, indices = _distintos(valores)
+
+    # Caminho curto para o formato mais comum ("123" / "123,45"); o resto passa pela limpeza completa.
+    numeros = np.zeros(len(distintos), dtype=np.float64)
+    simples = pc.match_substring_regex(distintos, _NUMERO_BR_LIMPO).to_numpy(zero_copy_only=False)
+    if simples.any():
+        limpos = pc.replace_substring(pc.filter(distintos, pa.array(simples)), ',', '.')
+        numeros[simples] = pc.cast(limpos, pa.float64()).to_numpy(zero_copy_only=False)
+    if not simples.all():
+        outros = ~simples
+        numeros[outros], simples[outros] = _limpar_e_converter(pc.filter(distintos, pa.array(outros)))
+
+    if len(distintos):
+        resultado = numeros[indices]
+        complexos = ~simples[indices] & ~vazios
+    else:
+        resultado = np.zeros(len(valores), dtype=np.float64)
+        complexos = np.zeros(len(valores), dtype=bool)
+    resultado[vazios] = 0.0
+    # Sobra o que não é literal simples (lixo, "nan", True, espaços exóticos...): regra escalar.
+    for i in np.flatnonzero(complexos): resultado[i] = converter_br_para_float(valores[i])
+    return pd.Series(resultado, index=serie.index)
+
+
+def converter_como_planilha_serie(serie):
+    """Versão vetorizada de converter_como_planilha para uma coluna inteira."""
+    if pd.api.types.is_bool_dtype(serie.dtype) or pd.api.types.is_numeric_dtype(serie.dtype):
+        return converter_br_para_float_serie(serie)
+
+    valores = serie.to_numpy(dtype=object)
+    vazios = _vazios(serie)
+    distintos, indices = _distintos(valores)
+
+    # Sem "_" e, tirando as vírgulas, um literal simples: é o int()/float() do numericise.
+    sem_virgula = pc.replace_substring(distintos, ',', '')
+    simples = pc.and_(
+        pc.invert(pc.match_substring(distintos, '_')), pc.match_substring_regex(sem_virgula, _NUMERO_SIMPLES),
+    ).to_numpy(zero_copy_only=False)
+    numeros = np.zeros(len(distintos), dtype=np.float64)
+    if simples.any():
+        numeros[simples] = pc.cast(pc.filter(sem_virgula, pa.array(simples)), pa.float64()).to_numpy(zero_copy_only=False)
+    # O resto (raro: espaços, "R$", lixo) passa pela regra escalar, uma vez por valor distinto.
+    textos = distintos.to_pylist()
+    for i in np.flatnonzero(~simples): numeros[i] = converter_como_planilha(textos[i])
+
+    resultado = numeros[indices] if len(distintos) else np.zeros(len(valores), dtype=np.float64)
+    # Valores que não são texto (NaN, None, números) seguem a regra escalar direto.
+    for i in np.flatnonzero(~vazios & np.array([not isinstance(v, str) for v in valores], dtype=bool)):
+        resultado[i] = converter_como_planilha(valores[i])
+    resultado[vazios] = 0.0
+    return pd.Series(resultado, index=serie.index)
+
+
+def padronizar_datas_serie(serie):
+    """Versão vetorizada de padronizar_data_quatro_digitos para uma coluna inteira."""
+    valores = serie.to_numpy(dtype=object)
+    vazios = _vazios(serie)
+    distintos, indices = _distintos(valores)
+
+    # Fora os vazios, a regra só depende de str(valor): basta aplicá-la uma vez por valor distinto.
+    padronizados = np.empty(len(distintos), dtype=object)
+    padronizados[:] = [padronizar_data_quatro_digitos(d) for d in distintos.to_pylist()]
+
+    resultado = padronizados[indices] if len(padronizados) else np.full(len(valores), "", dtype=object)
+    resultado[vazios] = ""
+    return pd.Series(resultado, index=serie.index, dtype=object)
+
+
+def escolher_chave(coluna_c, coluna_a):
+    """
+    Após o merge (com fillna(0.0)), fica com o valor do lado Comissões e usa
+    o do Aproveitamento quando o primeiro for 0 / "0".
+    """
+    valores_c = coluna_c.to_numpy(dtype=object)
+    preenchido = (valores_c != 0) & (coluna_c.astype(str).to_numpy(dtype=object) != "0")
+    return pd.Series(
+        np.where(preenchido, valores_c, coluna_a.to_numpy(dtype=object)),
+        index=coluna_c.index, dtype=object,
+    )
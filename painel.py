@@ -0,0 +1,66 @@
+"""
+Dados do Painel de Resultados, preparados uma vez por versão do Consolidado.
+
+preparar_painel() converte as datas e monta a tabela dinâmica (Técnico x
+Data) de cada métrica de uma vez só; filtrar() recorta período e técnicos
+direto nessas tabelas prontas, sem reler nem repivotar nada.
+"""
+import pandas as pd
+
+from medicao import cronometrado
+
+METRICAS = ['Horas Vendidas', 'Disp', 'TP', 'TG']
+METRICA_PADRAO = 'TP'
+
+
+class DadosPainel:
+    """Pivots por métrica, a contagem de lançamentos por célula e o domínio dos filtros."""
+    __slots__ = ("pivots", "contagem", "tecnicos", "data_min", "data_max")
+
+    def __init__(self, pivots, contagem):
+        self.pivots = pivots
+        self.contagem = contagem
+        self.tecnicos = list(contagem.index)
+        datas = contagem.columns
+        self.data_min = datas.min().date() if len(datas) else None
+        self.data_max = datas.max().date() if len(datas) else None
+
+
+@cronometrado("pivot do painel")
+def preparar_painel(df_cons):
+    """Devolve None se o Consolidado não tiver as colunas Data e Técnico."""
+    if df_cons.empty: return DadosPainel({}, pd.DataFrame())
+    if 'Data' not in df_cons.columns or 'Técnico' not in df_cons.columns: return None
+
+    df = df_cons.copy()
+    # dayfirst=True é vital para ler 10/12 como 10 de Dezembro
+    df['Data'] = pd.to_datetime(df['Data'], dayfirst=True, errors='coerce')
+    df['Técnico'] = df['Técnico'].astype(str)
+
+    metricas = [m for m in METRICAS if m in df.columns]
+    pivots = {
+        metrica: df.pivot_table(index='Técnico', columns='Data', values=metrica, aggfunc='sum', fill_value=0).sort_index(axis=1)
+        for metrica in metricas
+    }
+    contagem = df.pivot_table(index='Técnico', columns='Data', aggfunc='size', fill_value=0).sort_index(axis=1)
+    return DadosPainel(pivots, contagem)
+
+
+def filtrar(dados, metrica, inicio=None, fim=None, tecnicos=None):
+    """Recorta a pivot da métrica; técnicos sem lançamento no período saem, como num pivot refeito."""
+    pivot = dados.pivots[metrica]
+    contagem = dados.contagem
+    if inicio is not None or fim is not None:
+        colunas = pivot.columns
+        manter = pd.Series(True, index=colunas)
+        if inicio is not None: manter &= colunas >= pd.Timestamp(inicio)
+        if fim is not None: manter &= colunas <= pd.Timestamp(fim)
+        pivot, contagem = pivot.loc[:, manter.to_numpy()], contagem.loc[:, manter.to_numpy()]
+    if tecnicos:
+        pivot, contagem = pivot.loc[pivot.index.isin(tecnicos)], contagem.loc[contagem.index.isin(tecnicos)]
+    pivot = pivot.loc[contagem.sum(axis=1).to_numpy() > 0, contagem.sum(axis=0).to_numpy() > 0]
+
+    # Cabeçalho "dd/mm" (resolve colunas largas)
+    pivot = pivot.copy()
+    pivot.columns = pivot.columns.strftime('%d/%m')
+    return pivot
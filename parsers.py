@@ -0,0 +1,369 @@
+"""
+Leitura dos relatórios HTML (Comissões e Aproveitamento).
+
+Dois motores produzem exatamente as mesmas linhas:
+  * "stream": percorre o arquivo uma única vez com html.parser, monta só o
+    texto das <tr>/<td> e para de ler no marcador de total da filial;
+  * "bs4": caminho original com BeautifulSoup, mantido para comparação (A/B).
+
+Este módulo não depende do Streamlit, para poder ser usado fora da interface.
+"""
+import html
+import re
+import unicodedata
+from collections import deque
+from datetime import datetime
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from bs4.builder import HTMLTreeBuilder
+from bs4.dammit import EntitySubstitution, UnicodeDammit
+
+MOTOR_STREAM = "stream"
+MOTOR_BS4 = "bs4"
+MOTORES = (MOTOR_STREAM, MOTOR_BS4)
+MOTOR_PADRAO = MOTOR_STREAM
+
+# Aumentar sempre que as regras de extração (ou o formato guardado) mudarem: invalida o cache de leituras.
+VERSAO_PARSER = 3
+
+PADRAO_DATA_RELATORIO = re.compile(r"até\s+(\d{2}/\d{2}/\d{4})", re.IGNORECASE)
+_TAGS = re.compile(r"<[^>]*>")
+
+# Mesmas regras de árvore do BeautifulSoup("html.parser"): tags vazias não
+# ficam abertas e o texto dentro de script/style/etc. não entra no get_text().
+_TAGS_VAZIAS = frozenset(HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS)
+_TAGS_SEM_TEXTO = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+_TAMANHO_BLOCO = 64 * 1024
+
+
+# Pré-filtros das regras: quase toda <tr> é linha de OS/dia sem marcador de
+# seção. Os marcadores são literais curtos, e o "in" do str acha (ou descarta)
+# cada um mais rápido que uma regex com alternativas.
+_DATA_CELULA = re.compile(r"\d{2}/\d{2}/\d{2}")
+_DIGITO = re.compile(r"\d")
+
+
+# --- AUXILIARES ---
+class _TabelaSemAcentos(dict):
+    """Tabela do str.translate montada sob demanda: cada caractere é decomposto uma vez só."""
+
+    def __missing__(self, codigo):
+        caractere = chr(codigo)
+        sem_acento = ''.join(c for c in unicodedata.normalize('NFD', caractere) if unicodedata.category(c) != 'Mn')
+        self[codigo] = sem_acento
+        return sem_acento
+
+
+_SEM_ACENTOS = _TabelaSemAcentos()
+
+
+def remover_acentos(texto):
+    if texto.isascii(): return texto
+    return texto.translate(_SEM_ACENTOS)
+
+
+class Linha:
+    """Texto de uma <tr> já extraído: equivalente a get_text() da linha e de cada <td>."""
+    __slots__ = ("pedacos", "celulas_pedacos")
+
+    def __init__(self):
+        self.pedacos = []
+        self.celulas_pedacos = []
+
+    @property
+    def texto(self):
+        return " ".join(self.pedacos)
+
+    @property
+    def celulas(self):
+        return ["".join(p) for p in self.celulas_pedacos]
+
+
+class _LinhaBS4:
+    """Adapta uma <tr> do BeautifulSoup para a mesma interface de Linha."""
+    __slots__ = ("tag",)
+
+    def __init__(self, tag):
+        self.tag = tag
+
+    @property
+    def texto(self):
+        return self.tag.get_text(separator=" ", strip=True)
+
+    @property
+    def celulas(self):
+        return [c.get_text(strip=True) for c in self.tag.find_all("td")]
+
+
+# --- MOTOR STREAM ---
+class _ExtratorLinhas(HTMLParser):
+    """
+    Percorre o HTML por eventos e entrega as <tr> na ordem do documento.
+    Uma linha aninhada em outra só é entregue quando a externa fecha,
+    para manter a mesma ordem do soup.find_all("tr").
+    """
+
+    def __init__(self, padrao_documento=None):
+        super().__init__(convert_charrefs=False)
+        self.padrao_documento = padrao_documento
+        self.busca = None
+        self.somente_documento = False
+        self._pilha = []
+        self._abertas = {}
+        self._sem_texto = 0
+        self._dados = []
+        self._linhas_abertas = []
+        self._celulas_abertas = []
+        self._pendentes = []
+        self._prontas = deque()
+        self._ultimo_pedaco = ""
+        self._conteudo = ""
+        self._posicao = 0
+        self._finalizado = False
+
+    # Texto
+    def handle_data(self, data):
+        self._dados.append(data)
+
+    def handle_charref(self, name):
+        try:
+            if name[:1] in ("x", "X"): codigo = int(name[1:], 16)
+            else: codigo = int(name)
+        except ValueError:
+            self._dados.append(f"&#{name}")
+            return
+        caractere, _ = UnicodeDammit.numeric_character_reference(codigo)
+        self._dados.append(caractere)
+
+    def handle_entityref(self, name):
+        self._dados.append(EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name, f"&{name}"))
+
+    def _fechar_texto(self):
+        if not self._dados: return
+        pedaco = "".join(self._dados).strip()
+        self._dados = []
+        if not pedaco or self._sem_texto: return
+        if self.padrao_documento is not None and self.busca is None:
+            self.busca = self.padrao_documento.search(f"{self._ultimo_pedaco} {pedaco}")
+            self._ultimo_pedaco = pedaco
+        if self.somente_documento: return
+        for linha in self._linhas_abertas: linha.pedacos.append(pedaco)
+        for celula in self._celulas_abertas: celula.append(pedaco)
+
+    # Tags
+    def handle_starttag(self, tag, attrs):
+        self._fechar_texto()
+        if tag in _TAGS_VAZIAS: return
+        self._pilha.append(tag)
+        self._abertas[tag] = self._abertas.get(tag, 0) + 1
+        if tag in _TAGS_SEM_TEXTO: self._sem_texto += 1
+        if self.somente_documento: return
+        if tag == "tr":
+            linha = Linha()
+            self._linhas_abertas.append(linha)
+            self._pendentes.append(linha)
+        elif tag == "td":
+            celula = []
+            for linha in self._linhas_abertas: linha.celulas_pedacos.append(celula)
+            self._celulas_abertas.append(celula)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _TAGS_VAZIAS: self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._fechar_texto()
+        if not self._abertas.get(tag): return
+        while self._pilha:
+            fechada = self._pilha.pop()
+            self._fechar_tag(fechada)
+            if fechada == tag: break
+
+    def _fechar_tag(self, tag):
+        self._abertas[tag] -= 1
+        if tag in _TAGS_SEM_TEXTO: self._sem_texto -= 1
+        if self.somente_documento: return
+        if tag == "tr":
+            self._linhas_abertas.pop()
+            if not self._linhas_abertas:
+                self._prontas.extend(self._pendentes)
+                self._pendentes = []
+        elif tag == "td":
+            self._celulas_abertas.pop()
+
+    # Comentários, doctype e instruções não entram no texto.
+    def handle_comment(self, data):
+        self._fechar_texto()
+
+    def handle_decl(self, decl):
+        self._fechar_texto()
+
+    def handle_pi(self, data):
+        self._fechar_texto()
+
+    def unknown_decl(self, data):
+        self._fechar_texto()
+        if data.upper().startswith("CDATA["):
+            self._dados.append(data[len("CDATA["):])
+            self._fechar_texto()
+
+    def _finalizar(self):
+        if self._finalizado: return
+        self._finalizado = True
+        self.close()
+        self._fechar_texto()
+        while self._pilha: self._fechar_tag(self._pilha.pop())
+
+    def linhas(self, conteudo):
+        """Gera as linhas conforme o texto é lido; parar a iteração para a leitura."""
+        self._conteudo = conteudo
+        for inicio in range(0, len(conteudo), _TAMANHO_BLOCO):
+            self._posicao = inicio + _TAMANHO_BLOCO
+            self.feed(conteudo[inicio:self._posicao])
+            while self._prontas: yield self._prontas.popleft()
+        self._posicao = len(conteudo)
+        self._finalizar()
+        while self._prontas: yield self._prontas.popleft()
+
+    def concluir_busca(self):
+        """Continua lendo apenas o texto do documento até achar o padrão procurado."""
+        self.somente_documento = True
+        self._linhas_abertas, self._celulas_abertas, self._pendentes = [], [], []
+        self._prontas.clear()
+        while self.busca is None and self._posicao < len(self._conteudo):
+            inicio = self._posicao
+            self._posicao = inicio + _TAMANHO_BLOCO
+            self.feed(self._conteudo[inicio:self._posicao])
+        if self.busca is None: self._finalizar()
+        return self.busca
+
+
+class _FonteStream:
+    def __init__(self, conteudo, padrao_documento=None):
+        self.conteudo = conteudo
+        self.extrator = _ExtratorLinhas(padrao_documento)
+
+    @property
+    def busca(self):
+        return self.extrator.busca
+
+    def linhas(self):
+        return self.extrator.linhas(self.conteudo)
+
+    def concluir_busca(self):
+        return self.extrator.concluir_busca()
+
+
+# --- MOTOR BS4 (REFERÊNCIA) ---
+class _FonteBS4:
+    def __init__(self, conteudo, padrao_documento=None):
+        self.soup = BeautifulSoup(conteudo, "html.parser")
+        self.busca = None
+        if padrao_documento is not None:
+            self.busca = padrao_documento.search(self.soup.get_text(separator=" ", strip=True))
+
+    def linhas(self):
+        return (_LinhaBS4(tr) for tr in self.soup.find_all("tr"))
+
+    def concluir_busca(self):
+        return self.busca
+
+
+_FONTES = {MOTOR_STREAM: _FonteStream, MOTOR_BS4: _FonteBS4}
+
+
+def _abrir_fonte(conteudo, motor, padrao_documento=None):
+    if motor not in _FONTES:
+        raise ValueError(f"Motor de leitura desconhecido: {motor}")
+    return _FONTES[motor](conteudo, padrao_documento)
+
+
+# --- REGRAS DE CADA RELATÓRIO ---
+def _registros_comissoes(linhas):
+    """Gera (técnico, horas) a partir das linhas, parando no total da filial/empresa."""
+    tecnico_atual = None
+    for linha in linhas:
+        texto_linha = linha.texto.upper()
+        if "TOTAL D" not in texto_linha and "HORAS VENDIDAS:" not in texto_linha: continue
+        if "TOTAL DA FILIAL" in texto_linha or "TOTAL DA EMPRESA" in texto_linha: break
+
+        if "TOTAL DO FUNCIONARIO" in texto_linha:
+            try: tecnico_atual = texto_linha.split("TOTAL DO FUNCIONARIO")[1].replace(":", "").strip().split()[0]
+            except: continue
+
+        if tecnico_atual and "HORAS VENDIDAS:" in texto_linha:
+            for celula in linha.celulas:
+                txt = celula.upper()
+                if "HORAS" in txt and any(c.isdigit() for c in txt) and "VENDIDAS" not in txt:
+                    yield tecnico_atual, txt.replace("HORAS", "").strip()
+                    break
+
+
+def _registros_aproveitamento(linhas):
+    """Gera (técnico, data, disp, tp, tg) a partir das linhas, parando no TOTAL FILIAL."""
+    tecnico_atual_aprov = None
+    for linha in linhas:
+        texto_original = linha.texto.upper()
+        texto_limpo = remover_acentos(texto_original)
+
+        # Os marcadores são ASCII: se estão no texto original, estão também no texto sem acentos.
+        if "MECANICO" in texto_limpo or "TOT.MEC" in texto_limpo or "TOTAL FILIAL:" in texto_limpo:
+            if "TOTAL FILIAL:" in texto_original: break
+            if "MECANICO" in texto_limpo and "TOT.MEC" not in texto_limpo:
+                try:
+                    parte_direita = texto_limpo.split("MECANICO")[1].replace(":", "").strip()
+                    if "-" in parte_direita: tecnico_atual_aprov = parte_direita.split("-")[0].strip()
+                    else: tecnico_atual_aprov = parte_direita.split()[0]
+                except: continue
+
+            if "TOT.MEC.:" in texto_original: tecnico_atual_aprov = None; continue
+
+        if tecnico_atual_aprov and _DIGITO.search(texto_original) is not None:
+            celulas = linha.celulas
+            if not celulas: continue
+            txt_cel0 = celulas[0]
+            if _DATA_CELULA.match(txt_cel0):
+                try:
+                    if len(celulas) >= 4:
+                        yield tecnico_atual_aprov, txt_cel0.split()[0], celulas[1], celulas[2], celulas[3]
+                except: continue
+
+
+# --- EXTRAÇÃO POR ARQUIVO ---
+def extrair_comissoes(nome_arquivo, conteudo, motor=MOTOR_PADRAO):
+    """Gera as linhas [Data, Arquivo, Técnico, Horas] de um relatório de Comissões já decodificado."""
+    fonte = _abrir_fonte(conteudo, motor, PADRAO_DATA_RELATORIO)
+    pendentes = []
+    data_relatorio = None
+    for tecnico, valor in _registros_comissoes(fonte.linhas()):
+        if data_relatorio is None and fonte.busca is not None:
+            data_relatorio = fonte.busca.group(1)
+            for t, v in pendentes: yield [data_relatorio, nome_arquivo, t, v]
+            pendentes = []
+        if data_relatorio is None: pendentes.append((tecnico, valor))
+        else: yield [data_relatorio, nome_arquivo, tecnico, valor]
+
+    if data_relatorio is None:
+        # A data pode estar depois do último registro: lê só o texto restante.
+        match_data = fonte.concluir_busca()
+        data_relatorio = match_data.group(1) if match_data else datetime.now().strftime("%d/%m/%Y")
+        for t, v in pendentes: yield [data_relatorio, nome_arquivo, t, v]
+
+
+def extrair_aproveitamento(nome_arquivo, conteudo, motor=MOTOR_PADRAO):
+    """Gera as linhas [Data, Arquivo, Técnico, Disp, TP, TG] de um relatório de Aproveitamento já decodificado."""
+    fonte = _abrir_fonte(conteudo, motor)
+    for tecnico, data, disp, tp, tg in _registros_aproveitamento(fonte.linhas()):
+        yield [data, nome_arquivo, tecnico, disp, tp, tg]
+
+
+EXTRATORES = {"comissoes": extrair_comissoes, "aproveitamento": extrair_aproveitamento}
+
+
+def data_do_relatorio(conteudo):
+    """'dd/mm/aaaa' do trecho "até dd/mm/aaaa" do relatório (índice de arquivos), ou None."""
+    encontrado = PADRAO_DATA_RELATORIO.search(conteudo)
+    # Com tags ou entidades no meio ("at&eacute; <b>08/12/2025</b>"), procura só no texto.
+    if encontrado is None: encontrado = PADRAO_DATA_RELATORIO.search(html.unescape(_TAGS.sub(" ", conteudo)))
+    return encontrado.group(1) if encontrado else None
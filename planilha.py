@@ -0,0 +1,282 @@
+"""
+Gravação incremental nas abas da Planilha Mestra.
+
+Em vez de baixar a aba inteira e reescrever tudo, lê apenas o cabeçalho e
+as colunas-chave, monta o índice chave -> número da linha e envia só o que
+mudou: as linhas com chave existente são sobrescritas no lugar e as chaves
+novas vão para depois da última linha da aba.
+
+As escritas passam por um EscritorPlanilha, que junta as de todas as abas
+de uma execução e as envia em poucas requisições (values.batchUpdate em
+blocos de até CELULAS_POR_REQUISICAO células, um values.batchClear só).
+O escritor também lê de uma vez o cabeçalho de todas as abas da execução
+(um values.batchGet) e junta a formatação dos cabeçalhos novos e a
+ampliação das grades num único batchUpdate.
+A cota e as repetições em 429/5xx ficam na conexão (conexao.py).
+"""
+import pandas as pd
+from gspread.utils import absolute_range_name, rowcol_to_a1
+
+# Mantém cada requisição bem abaixo do limite de payload da API (~2 MB recomendados).
+CELULAS_POR_REQUISICAO = 40_000
+
+
+class ResultadoUpsert:
+    """Resumo de uma gravação: total de linhas na aba e as chaves tocadas."""
+    __slots__ = ("total", "inseridas", "atualizadas", "chaves")
+
+    def __init__(self, total=0, inseridas=0, atualizadas=0, chaves=None):
+        self.total = total
+        self.inseridas = inseridas
+        self.atualizadas = atualizadas
+        self.chaves = chaves if chaves is not None else []
+
+
+def _coluna(numero):
+    return rowcol_to_a1(1, numero)[:-1]
+
+
+class EscritorPlanilha:
+    """
+    Acumula escritas e limpezas (de qualquer aba da planilha) e envia tudo em
+    enviar(): uma ampliação de grade se alguma aba for pequena, as escritas em
+    blocos de até celulas_por_requisicao células e uma limpeza para todas as
+    faixas. As escritas vão antes das limpezas (que não devem se sobrepor a
+    elas): se o envio parar no meio, a aba fica com dados velhos, não vazia.
+    """
+
+    def __init__(self, sh, celulas_por_requisicao=CELULAS_POR_REQUISICAO):
+        self.sh = sh
+        self.celulas_por_requisicao = celulas_por_requisicao
+        self.requisicoes = 0
+        self._escritas = []
+        self._limpezas = []
+        self._pedidos = []
+        self._fim_reservado = {}
+        self._cabecalhos = {}
+
+    @property
+    def pendente(self):
+        return bool(self._escritas or self._limpezas or self._pedidos)
+
+    def ler_cabecalhos(self, titulos):
+        """
+        Lê numa requisição (values.batchGet da linha 1) o cabeçalho das abas
+        que já existem; as que não existem ficam com cabeçalho vazio. Devolve
+        {título: aba} das abas existentes (uma chamada worksheets()).
+        """
+        existentes = {ws.title: ws for ws in self.sh.worksheets()}
+        lidas = [titulo for titulo in dict.fromkeys(titulos) if titulo in existentes]
+        if lidas:
+            resposta = self.sh.values_batch_get([absolute_range_name(titulo, "1:1") for titulo in lidas])
+            for titulo, faixa in zip(lidas, resposta.get("valueRanges", [])):
+                valores = faixa.get("values", [])
+                self._cabecalhos[titulo] = [str(v) for v in valores[0]] if valores else []
+        for titulo in titulos:
+            if titulo not in existentes: self._cabecalhos[titulo] = []
+        return existentes
+
+    def cabecalho(self, ws):
+        """Cabeçalho já conhecido da aba (lido em ler_cabecalhos ou gravado aqui), ou None."""
+        return self._cabecalhos.get(ws.title)
+
+    def gravar_cabecalho(self, ws, colunas):
+        """Escreve o cabeçalho na linha 1 e o deixa em negrito (no batchUpdate do envio)."""
+        self.atualizar(ws, [list(colunas)], 1)
+        self._cabecalhos[ws.title] = list(colunas)
+        self._pedidos.append({"repeatCell": {
+            "range": {"sheetId": ws.id, "startRowIndex": 0, "endRowIndex": 1, "startColumnIndex": 0, "endColumnIndex": 26},
+            "cell": {"userEnteredFormat": {"textFormat": {"bold": True}}},
+            "fields": "userEnteredFormat.textFormat.bold",
+        }})
+
+    def atualizar(self, ws, valores, linha, coluna=1):
+        """Escreve valores (lista de linhas) a partir da célula (linha, coluna)."""
+        if valores: self._escritas.append((ws, linha, coluna, [list(v) for v in valores]))
+
+    def limpar(self, ws, faixa):
+        self._limpezas.append((ws, faixa))
+
+    def anexar(self, ws, valores, ultima_linha):
+        """Escreve depois de ultima_linha (ou do que já foi anexado nesta aba antes do envio)."""
+        inicio = max(ultima_linha, self._fim_reservado.get(ws.title, 0)) + 1
+        self._fim_reservado[ws.title] = inicio + len(valores) - 1
+        self.atualizar(ws, valores, inicio)
+
+    def _requisicoes_de_valores(self):
+        """Fatia as escritas em blocos de linhas e agrupa os blocos em requisições de até N células."""
+        dados, celulas = [], 0
+        for ws, linha, coluna, valores in self._escritas:
+            largura = max(len(v) for v in valores) or 1
+            por_bloco = max(1, self.celulas_por_requisicao // largura)
+            for inicio in range(0, len(valores), por_bloco):
+                bloco = valores[inicio:inicio + por_bloco]
+                if dados and celulas + len(bloco) * largura > self.celulas_por_requisicao:
+                    yield dados
+                    dados, celulas = [], 0
+                primeira = linha + inicio
+                faixa = f"{rowcol_to_a1(primeira, coluna)}:{rowcol_to_a1(primeira + len(bloco) - 1, coluna + largura - 1)}"
+                dados.append({"range": absolute_range_name(ws.title, faixa), "values": bloco})
+                celulas += len(bloco) * largura
+        if dados: yield dados
+
+    def _ampliacoes(self):
+        """Escrever além da grade é erro na API (só o append amplia sozinho): pedidos para ampliar antes."""
+        necessarias, abas = {}, {}
+        for ws, linha, _, valores in self._escritas:
+            necessarias[ws.title] = max(necessarias.get(ws.title, 0), linha + len(valores) - 1)
+            abas[ws.title] = ws
+        if all(total <= abas[titulo].row_count for titulo, total in necessarias.items()): return []
+        # O row_count do handle pode estar velho (a aba já foi ampliada antes): confere na API.
+        propriedades = {folha["properties"]["title"]: folha["properties"] for folha in self.sh.fetch_sheet_metadata()["sheets"]}
+        return [
+            {"appendDimension": {
+                "sheetId": propriedades[titulo]["sheetId"], "dimension": "ROWS",
+                "length": total - propriedades[titulo]["gridProperties"]["rowCount"],
+            }}
+            for titulo, total in necessarias.items() if total > propriedades[titulo]["gridProperties"]["rowCount"]
+        ]
+
+    def enviar(self):
+        # Ampliações e formatação numa requisição só, antes das escritas que dependem da grade.
+        pedidos = self._ampliacoes() + self._pedidos
+        if pedidos:
+            self.sh.batch_update({"requests": pedidos})
+            self.requisicoes += 1
+        if self._escritas:
+            for dados in self._requisicoes_de_valores():
+                self.sh.values_batch_update({"valueInputOption": "RAW", "data": dados})
+                self.requisicoes += 1
+        if self._limpezas:
+            self.sh.values_batch_clear(body={"ranges": [absolute_range_name(ws.title, faixa) for ws, faixa in self._limpezas]})
+            self.requisicoes += 1
+        self._escritas, self._limpezas, self._pedidos, self._fim_reservado = [], [], [], {}
+        return self.requisicoes
+
+
+def atualizar_planilha_preservando_formato(sh, nome_aba, df_final, escritor=None):
+    """
+    Reescreve a aba inteira mantendo cabeçalho e formatação (usado na reconstrução completa).
+    Com um escritor, a gravação só sai no escritor.enviar() de quem chamou.
+    """
+    ws = obter_ou_criar_aba(sh, nome_aba)
+    enviar = escritor is None
+    escritor = escritor or EscritorPlanilha(sh)
+    garantir_cabecalho(ws, df_final.columns, escritor)
+
+    # Preenche vazios com 0.0 (colunas de texto viram object para aceitar o 0.0 no pandas 3)
+    df_final = df_final.astype({c: object for c in df_final.columns if pd.api.types.is_string_dtype(df_final[c].dtype)})
+    df_final = df_final.fillna(0.0)
+
+    dados_para_enviar = df_final.values.tolist()
+    escritor.atualizar(ws, dados_para_enviar, 2)
+    # Limpa o que sobrou da versão anterior (até a coluna Z, como antes): abaixo e à direita dos dados.
+    escritor.limpar(ws, f"A{len(dados_para_enviar) + 2}:Z")
+    if dados_para_enviar and len(df_final.columns) < 26:
+        escritor.limpar(ws, f"{_coluna(len(df_final.columns) + 1)}2:Z{len(dados_para_enviar) + 1}")
+
+    if enviar: escritor.enviar()
+    return True
+
+
+def obter_ou_criar_aba(sh, nome_aba, linhas=2000, colunas=20):
+    try: return sh.worksheet(nome_aba)
+    except: return sh.add_worksheet(title=nome_aba, rows=linhas, cols=colunas)
+
+
+def obter_ou_criar_aba_oculta(sh, nome_aba, linhas=2000, colunas=20):
+    """Como obter_ou_criar_aba, mas a aba criada fica oculta (dados de controle, não de consulta)."""
+    try: return sh.worksheet(nome_aba)
+    except: pass
+    ws = sh.add_worksheet(title=nome_aba, rows=linhas, cols=colunas)
+    sh.batch_update({"requests": [
+        {"updateSheetProperties": {"properties": {"sheetId": ws.id, "hidden": True}, "fields": "hidden"}},
+    ]})
+    return ws
+
+
+def garantir_cabecalho(ws, colunas, escritor=None):
+    """
+    Grava o cabeçalho se a aba estiver vazia e devolve o cabeçalho em uso.
+    Com um escritor, usa o cabeçalho que ele já leu (ler_cabecalhos) e a
+    gravação e a formatação saem no envio dele.
+    """
+    cabecalho = escritor.cabecalho(ws) if escritor is not None else None
+    if cabecalho is None: cabecalho = ws.row_values(1)
+    if cabecalho: return cabecalho
+    if escritor is not None:
+        escritor.gravar_cabecalho(ws, colunas)
+        return list(colunas)
+    ws.update([list(colunas)], "A1")
+    try: ws.format('A1:Z1', {'textFormat': {'bold': True}})
+    except: pass
+    return list(colunas)
+
+
+def _ler_indice_e_fim(ws, cabecalho, colunas_chaves):
+    """({tupla de chaves: número da linha}, número da última linha com alguma chave; 1 se só há cabeçalho)."""
+    posicoes = []
+    for col in colunas_chaves:
+        if col not in cabecalho:
+            raise ValueError(f"Coluna-chave '{col}' não encontrada no cabeçalho da aba {ws.title}")
+        posicoes.append(cabecalho.index(col) + 1)
+
+    faixas = [f"{_coluna(p)}2:{_coluna(p)}" for p in posicoes]
+    colunas = [[(celula[0] if celula else "") for celula in faixa] for faixa in ws.batch_get(faixas)]
+    total_linhas = max((len(c) for c in colunas), default=0)
+
+    indice = {}
+    for i in range(total_linhas):
+        chave = tuple(str(c[i]) if i < len(c) else "" for c in colunas)
+        if any(chave): indice[chave] = i + 2
+    return indice, total_linhas + 1
+
+
+def _intervalos(numeros):
+    """Agrupa números de linha em intervalos contíguos (inicio, fim)."""
+    intervalos = []
+    for numero in sorted(numeros):
+        if intervalos and intervalos[-1][1] == numero - 1: intervalos[-1][1] = numero
+        else: intervalos.append([numero, numero])
+    return intervalos
+
+
+def _agrupar_linhas_consecutivas(atualizacoes):
+    """Junta linhas vizinhas num mesmo intervalo: (primeira linha, valores) por intervalo."""
+    return [(inicio, [atualizacoes[n] for n in range(inicio, fim + 1)]) for inicio, fim in _intervalos(atualizacoes)]
+
+
+def upsert_incremental(ws, novos_dados_df, colunas_chaves, como_texto=True, escritor=None):
+    """
+    Grava novos_dados_df na aba, sobrescrevendo pela chave e anexando o que for novo.
+    Com como_texto=False os valores vão com o tipo original (ex.: números do Consolidado).
+    Com um escritor, a gravação só sai no escritor.enviar() de quem chamou.
+    """
+    enviar = escritor is None
+    escritor = escritor or EscritorPlanilha(ws.spreadsheet)
+    df = novos_dados_df.astype(str) if como_texto else novos_dados_df
+    df = df.drop_duplicates(subset=colunas_chaves, keep='last')
+    cabecalho = garantir_cabecalho(ws, df.columns, escritor)
+    # Alinha as colunas ao cabeçalho já existente na aba (colunas ausentes ficam vazias).
+    df = df.reindex(columns=cabecalho, fill_value="")
+    indice, ultima_linha = _ler_indice_e_fim(ws, cabecalho, colunas_chaves)
+
+    atualizacoes, novas_linhas, chaves = {}, [], []
+    for chave, valores in zip(
+        df[colunas_chaves].astype(str).itertuples(index=False, name=None), df.values.tolist()
+    ):
+        chaves.append(chave)
+        if chave in indice: atualizacoes[indice[chave]] = valores
+        else: novas_linhas.append(valores)
+
+    for inicio, valores in _agrupar_linhas_consecutivas(atualizacoes): escritor.atualizar(ws, valores, inicio)
+    # Posição fixa em vez de append_rows: a escrita pode ser repetida (429/5xx) sem duplicar linhas.
+    if novas_linhas: escritor.anexar(ws, novas_linhas, ultima_linha)
+    if enviar: escritor.enviar()
+
+    return ResultadoUpsert(
+        total=len(indice) + len(novas_linhas),
+        inseridas=len(novas_linhas),
+        atualizadas=len(atualizacoes),
+        chaves=chaves,
+    )
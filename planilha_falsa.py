@@ -0,0 +1,281 @@
+"""
+Planilha em memória com a parte da API do gspread usada pelo app.
+
+Serve para exercitar gravação, unificação e sincronização sem rede:
+    ConexaoPlanilha(ClienteFalso)  # em vez do cliente autorizado do Google
+Os valores ficam como foram enviados; as leituras devolvem texto, como a
+API devolve valores formatados, e get_all_records aplica o numericise.
+
+Como na API, escrever além da grade da aba é erro (append_rows amplia a
+grade sozinho). Com uma CotaFalsa, as chamadas também podem ser recusadas
+com 429 (cota por minuto estourada) ou falhar com os códigos programados:
+    cota = CotaFalsa(por_minuto=60, falhas=[429, 503])  # as 2 próximas chamadas falham
+    ClienteFalso(cota)
+"""
+import time
+from collections import deque
+from functools import wraps
+from types import SimpleNamespace
+
+from gspread.utils import a1_range_to_grid_range, a1_to_rowcol, numericise_all
+
+
+class AbaNaoEncontrada(Exception):
+    pass
+
+
+class ErroApiFalso(Exception):
+    """Mesmo formato do gspread.exceptions.APIError: code e response.status_code."""
+
+    def __init__(self, codigo, mensagem, espera=None):
+        super().__init__({"code": codigo, "message": mensagem})
+        self.code = codigo
+        self.response = SimpleNamespace(status_code=codigo, headers={"Retry-After": str(espera)} if espera else {})
+
+
+class CotaFalsa:
+    """Cota de chamadas por minuto (janela deslizante) e falhas programadas para as próximas chamadas."""
+
+    def __init__(self, por_minuto=None, falhas=(), relogio=time.monotonic):
+        self.por_minuto = por_minuto
+        self.falhas = list(falhas)
+        self.recusadas = 0
+        self.chamadas = 0
+        self._relogio = relogio
+        self._janela = deque()
+
+    def consumir(self, metodo):
+        self.chamadas += 1
+        if self.falhas:
+            codigo = self.falhas.pop(0)
+            if codigo:
+                self.recusadas += 1
+                raise ErroApiFalso(codigo, f"Falha programada em {metodo}")
+        if self.por_minuto is None: return
+        agora = self._relogio()
+        while self._janela and self._janela[0] <= agora - 60: self._janela.popleft()
+        if len(self._janela) >= self.por_minuto:
+            self.recusadas += 1
+            raise ErroApiFalso(429, f"Quota exceeded ({self.por_minuto}/min) em {metodo}")
+        self._janela.append(agora)
+
+
+def _api(metodo):
+    """Cada método decorado é uma requisição: passa pela cota antes de executar."""
+    @wraps(metodo)
+    def chamada(self, *args, **kwargs):
+        if self.cota is not None: self.cota.consumir(metodo.__name__)
+        return metodo(self, *args, **kwargs)
+    return chamada
+
+
+class _Celula:
+    __slots__ = ("value",)
+
+    def __init__(self, valor):
+        self.value = valor
+
+
+def _texto(valor):
+    return valor if isinstance(valor, str) else str(valor)
+
+
+class AbaFalsa:
+    def __init__(self, titulo, linhas=1000, colunas=26, planilha=None, id_aba=0):
+        self.title = titulo
+        self.id = id_aba
+        self.row_count = linhas
+        self.col_count = colunas
+        self.spreadsheet = planilha
+        self.oculta = False
+        self.grade = []
+
+    @property
+    def cota(self):
+        return self.spreadsheet.cota if self.spreadsheet is not None else None
+
+    # --- GRADE ---
+    def _faixa(self, faixa):
+        if ":" not in faixa:
+            linha, coluna = a1_to_rowcol(faixa)
+            return linha - 1, linha, coluna - 1, coluna
+        g = a1_range_to_grid_range(faixa)
+        return g.get("startRowIndex", 0), g.get("endRowIndex", 10 ** 7), g.get("startColumnIndex", 0), g.get("endColumnIndex", 10 ** 4)
+
+    def _escrever(self, linha0, coluna0, valores):
+        for i, linha in enumerate(valores):
+            while len(self.grade) <= linha0 + i: self.grade.append([])
+            atual = self.grade[linha0 + i]
+            for j, valor in enumerate(linha):
+                while len(atual) <= coluna0 + j: atual.append("")
+                atual[coluna0 + j] = valor
+
+    def _gravar(self, faixa, valores):
+        linha0, _, coluna0, _ = self._faixa(faixa)
+        if linha0 + len(valores) > self.row_count:
+            raise ErroApiFalso(400, f"Range ('{self.title}'!{faixa}) exceeds grid limits. Max rows: {self.row_count}")
+        self._escrever(linha0, coluna0, valores)
+
+    def _limpar(self, faixa):
+        l0, l1, c0, c1 = self._faixa(faixa)
+        for linha in self.grade[l0:l1]:
+            for j in range(c0, min(c1, len(linha))): linha[j] = ""
+
+    def _ler(self, faixa):
+        l0, l1, c0, c1 = self._faixa(faixa)
+        saida = [[_texto(v) for v in linha[c0:c1]] for linha in self.grade[l0:l1]]
+        saida = [linha[:max((j + 1 for j, v in enumerate(linha) if v != ""), default=0)] for linha in saida]
+        while saida and not saida[-1]: saida.pop()
+        return saida
+
+    def _ultima_linha(self):
+        ultima = len(self.grade)
+        while ultima and not any(_texto(v) for v in self.grade[ultima - 1]): ultima -= 1
+        return ultima
+
+    # --- API (subconjunto do gspread.Worksheet) ---
+    @_api
+    def row_values(self, numero):
+        valores = self._ler(f"A{numero}:ZZ{numero}")
+        return valores[0] if valores else []
+
+    @_api
+    def acell(self, rotulo):
+        valores = self._ler(rotulo)
+        return _Celula(valores[0][0] if valores and valores[0] else None)
+
+    @_api
+    def get_all_values(self):
+        return self._ler(f"A1:ZZ{max(len(self.grade), 1)}")
+
+    @_api
+    def get_all_records(self):
+        valores = self._ler(f"A1:ZZ{max(len(self.grade), 1)}")
+        if len(valores) < 2: return []
+        cabecalho = valores[0]
+        return [
+            dict(zip(cabecalho, numericise_all((linha + [""] * len(cabecalho))[:len(cabecalho)])))
+            for linha in valores[1:]
+        ]
+
+    @_api
+    def batch_get(self, faixas):
+        return [self._ler(faixa) for faixa in faixas]
+
+    @_api
+    def update(self, values, range_name="A1"):
+        self._gravar(range_name, values)
+
+    @_api
+    def batch_update(self, data):
+        for item in data: self._gravar(item["range"], item["values"])
+
+    @_api
+    def append_rows(self, values, table_range=None):
+        inicio = self._ultima_linha()
+        self.row_count = max(self.row_count, inicio + len(values))
+        self._escrever(inicio, 0, values)
+
+    @_api
+    def batch_clear(self, faixas):
+        for faixa in faixas: self._limpar(faixa)
+
+    @_api
+    def format(self, *args, **kwargs):
+        pass
+
+
+class PlanilhaFalsa:
+    def __init__(self, chave="planilha-falsa", cota=None):
+        self.id = chave
+        self.cota = cota
+        self.abas = {}
+        self._proximo_id = 0
+
+    def _aba_e_faixa(self, nome):
+        """Separa "'Minha aba'!A2:F10" em (aba, "A2:F10")."""
+        titulo, faixa = nome.rsplit("!", 1)
+        if titulo.startswith("'"): titulo = titulo[1:-1].replace("''", "'")
+        if titulo not in self.abas: raise AbaNaoEncontrada(titulo)
+        return self.abas[titulo], faixa
+
+    @_api
+    def worksheet(self, titulo):
+        if titulo not in self.abas: raise AbaNaoEncontrada(titulo)
+        return self.abas[titulo]
+
+    @_api
+    def worksheets(self):
+        return list(self.abas.values())
+
+    @_api
+    def add_worksheet(self, title, rows=1000, cols=26):
+        self._proximo_id += 1
+        self.abas[title] = AbaFalsa(title, rows, cols, self, self._proximo_id)
+        return self.abas[title]
+
+    @_api
+    def del_worksheet(self, aba):
+        self.abas.pop(aba.title, None)
+
+    @_api
+    def fetch_sheet_metadata(self, params=None):
+        return {"sheets": [
+            {"properties": {"title": aba.title, "sheetId": aba.id, "gridProperties": {"rowCount": aba.row_count, "columnCount": aba.col_count}}}
+            for aba in self.abas.values()
+        ]}
+
+    @_api
+    def batch_update(self, body):
+        """Só o appendDimension (ampliar a grade) e o hidden/title do updateSheetProperties têm efeito aqui; o resto é ignorado."""
+        por_id = {aba.id: aba for aba in self.abas.values()}
+        for pedido in body.get("requests", []):
+            if "appendDimension" in pedido:
+                dimensao = pedido["appendDimension"]
+                aba = por_id[dimensao["sheetId"]]
+                if dimensao["dimension"] == "ROWS": aba.row_count += dimensao["length"]
+                else: aba.col_count += dimensao["length"]
+            elif "updateSheetProperties" in pedido:
+                propriedades = pedido["updateSheetProperties"]["properties"]
+                aba = por_id[propriedades["sheetId"]]
+                if "hidden" in propriedades: aba.oculta = propriedades["hidden"]
+                if "title" in propriedades:
+                    self.abas[propriedades["title"]] = self.abas.pop(aba.title)
+                    aba.title = propriedades["title"]
+        return {"replies": [{} for _ in body.get("requests", [])]}
+
+    @_api
+    def values_batch_update(self, body=None):
+        # Valida todas as faixas antes de escrever: a API aplica a requisição inteira ou nada.
+        itens = [(*self._aba_e_faixa(item["range"]), item["values"]) for item in body["data"]]
+        for aba, faixa, valores in itens:
+            linha0, _, _, _ = aba._faixa(faixa)
+            if linha0 + len(valores) > aba.row_count:
+                raise ErroApiFalso(400, f"Range ('{aba.title}'!{faixa}) exceeds grid limits. Max rows: {aba.row_count}")
+        for aba, faixa, valores in itens: aba._gravar(faixa, valores)
+        return {"totalUpdatedCells": sum(len(linha) for _, _, valores in itens for linha in valores)}
+
+    @_api
+    def values_batch_get(self, ranges, params=None):
+        faixas = [self._aba_e_faixa(nome) for nome in ranges]
+        return {"valueRanges": [
+            {"range": nome, "values": aba._ler(faixa)} for nome, (aba, faixa) in zip(ranges, faixas)
+        ]}
+
+    @_api
+    def values_batch_clear(self, params=None, body=None):
+        for nome in body["ranges"]:
+            aba, faixa = self._aba_e_faixa(nome)
+            aba._limpar(faixa)
+
+
+class ClienteFalso:
+    """Cliente com planilhas em memória, criadas sob demanda em open_by_key."""
+
+    def __init__(self, cota=None):
+        self.cota = cota
+        self.planilhas = {}
+
+    def open_by_key(self, chave):
+        if self.cota is not None: self.cota.consumir("open_by_key")
+        return self.planilhas.setdefault(chave, PlanilhaFalsa(chave, self.cota))
@@ -0,0 +1,167 @@
+"""
+Registros tipados das leituras de Comissões e Aproveitamento.
+
+Os parsers continuam gerando o texto das células (é o que as regras e a
+comparação entre motores usam); logo em seguida, ainda no processo de
+leitura, montar() converte o arquivo inteiro de uma vez para colunas
+tipadas:
+  * datas como datetime64 (ano de dois dígitos já expandido);
+  * arquivo e técnico como category (poucos valores distintos);
+  * horas como float64 já na unidade do Consolidado: o número que a
+    unificação tirava da aba (converter_como_planilha) dividido por 100.
+Daí em diante (cache de leitura, armazém local, unificação) nada volta a
+ser texto; só o envio para a planilha formata as colunas (para_texto), com
+as horas em centésimos ('12,50'), que a unificação relê como 12.5.
+
+As abas são a cópia auditável dos relatórios, então as horas cujo texto
+original não sai igual dessa formatação ('12,5', '1.234,50', 'abc' -> 0)
+guardam o texto ao lado, numa coluna "<coluna>#texto" (category, vazia nas
+demais linhas; nem é criada quando o arquivo não tem nenhum caso assim).
+para_texto devolve esse texto à aba e descarta a coluna; a unificação
+continua usando só o número.
+
+As horas ficam em float64 e não float32: o Consolidado tem de sair igual
+ao calculado a partir do texto, e float32 não guarda 12345.67 exato.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from normalizacao import converter_como_planilha_serie, padronizar_datas_serie
+
+COLUNAS_COMISSOES = ["Data Processamento", "Nome do Arquivo", "Sigla Técnico", "Horas Vendidas"]
+COLUNAS_APROVEITAMENTO = ["Data", "Arquivo", "Técnico", "Disp", "TP", "TG"]
+FORMATO_DATA = "%d/%m/%Y"
+SUFIXO_TEXTO = "#texto"
+
+
+class Esquema:
+    """Colunas de um relatório e o tipo de cada uma."""
+    __slots__ = ("colunas", "data", "arquivo", "tecnico", "numeros")
+
+    def __init__(self, colunas, data, arquivo, tecnico, numeros):
+        self.colunas = colunas
+        self.data = data
+        self.arquivo = arquivo
+        self.tecnico = tecnico
+        self.numeros = numeros
+
+    @property
+    def chaves(self):
+        return [self.data, self.tecnico]
+
+
+def coluna_texto(coluna):
+    """Coluna com o texto original das horas que a formatação não reproduz."""
+    return coluna + SUFIXO_TEXTO
+
+
+def sem_texto_original(df):
+    """df sem as colunas de texto original (para mostrar na tela)."""
+    return df.drop(columns=[c for c in df.columns if c.endswith(SUFIXO_TEXTO)])
+
+
+# Pelo tipo da leitura ("comissoes") ou pelo nome da tabela em minúsculas ("Comissoes".lower()).
+ESQUEMAS = {
+    "comissoes": Esquema(COLUNAS_COMISSOES, "Data Processamento", "Nome do Arquivo", "Sigla Técnico", ["Horas Vendidas"]),
+    "aproveitamento": Esquema(COLUNAS_APROVEITAMENTO, "Data", "Arquivo", "Técnico", ["Disp", "TP", "TG"]),
+}
+
+
+# --- DATAS ---
+def converter_datas_serie(serie):
+    """'08/12/25' ou '08/12/2025' -> datetime64; o que não for data válida vira NaT."""
+    if pd.api.types.is_datetime64_any_dtype(serie.dtype): return serie
+    return pd.to_datetime(padronizar_datas_serie(serie), format=FORMATO_DATA, errors="coerce")
+
+
+def formatar_datas_serie(serie):
+    """datetime64 -> 'dd/mm/aaaa' (NaT vira ""), formatando cada data distinta uma vez."""
+    codigos, distintas = pd.factorize(serie)
+    # O código -1 (NaT) cai no "" do fim.
+    textos = np.array(list(pd.DatetimeIndex(distintas).strftime(FORMATO_DATA)) + [""], dtype=object)
+    return pd.Series(textos[codigos], index=serie.index, dtype=object)
+
+
+# --- TIPAGEM ---
+def _categoria(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype): return serie
+    return serie.astype(str).astype("category")
+
+
+def tipar(df, esquema):
+    """Converte as colunas do esquema presentes em df; as que já estão tipadas passam direto."""
+    df = df.copy()
+    if esquema.data in df.columns: df[esquema.data] = converter_datas_serie(df[esquema.data])
+    for col in (esquema.arquivo, esquema.tecnico):
+        if col in df.columns: df[col] = _categoria(df[col])
+    for col in esquema.numeros:
+        if col in df.columns and df[col].dtype != np.float64:
+            texto = df[col].fillna("").astype(str)
+            df[col] = converter_como_planilha_serie(df[col]) / 100.0
+            diferente = (texto != _formatar_horas_serie(df[col])).to_numpy()
+            if diferente.any(): df[coluna_texto(col)] = texto.where(diferente)
+        # Depois de um concat a coluna de texto vira object (com NaN onde não havia).
+        if coluna_texto(col) in df.columns: df[coluna_texto(col)] = df[coluna_texto(col)].astype("category")
+    return df
+
+
+def montar(tipo, linhas):
+    """Linhas de texto do parser (ou um DataFrame delas) -> DataFrame tipado com as colunas do relatório."""
+    esquema = ESQUEMAS[tipo]
+    df = linhas if isinstance(linhas, pd.DataFrame) else pd.DataFrame(linhas, columns=esquema.colunas)
+    return tipar(df, esquema)
+
+
+def juntar(tipo, tabelas):
+    """Concatena tabelas tipadas (o concat de categorias diferentes vira object; tipar refaz a category)."""
+    tabelas = [t for t in tabelas if len(t)]
+    if not tabelas: return montar(tipo, [])
+    if len(tabelas) == 1: return tabelas[0]
+    return tipar(pd.concat(tabelas, ignore_index=True), ESQUEMAS[tipo])
+
+
+# --- TEXTO (CHAVES E PLANILHA) ---
+def _texto_horas(horas):
+    """Horas -> texto da aba que a unificação relê como as mesmas horas: 12.5 -> '12,50'."""
+    if not math.isfinite(horas): return repr(horas)
+    centesimos = round(horas * 100)
+    if centesimos / 100 == horas:
+        sinal = "-" if centesimos < 0 else ""
+        return f"{sinal}{abs(centesimos) // 100},{abs(centesimos) % 100:02d}"
+    # Fora do padrão de centésimos (texto estranho no relatório): um literal que o numericise lê direto.
+    return repr(horas * 100)
+
+
+def _formatar_horas_serie(serie):
+    codigos, distintos = pd.factorize(serie, use_na_sentinel=False)
+    return pd.Series(np.array([_texto_horas(v) for v in distintos], dtype=object)[codigos], index=serie.index)
+
+
+def chaves_texto(df, colunas):
+    """Tuplas de texto das colunas-chave (datas como dd/mm/aaaa), como as chaves lidas da planilha."""
+    colunas_texto = [
+        formatar_datas_serie(df[col]) if pd.api.types.is_datetime64_any_dtype(df[col].dtype) else df[col].astype(str)
+        for col in colunas
+    ]
+    return list(zip(*(c.tolist() for c in colunas_texto))) if colunas_texto else []
+
+
+def para_texto(df):
+    """
+    Tudo como texto, do jeito que fica nas abas: datas dd/mm/aaaa e horas em
+    centésimos com vírgula, ou o texto original do relatório quando guardado.
+    """
+    saida = {}
+    for col in df.columns:
+        serie = df[col]
+        if col.endswith(SUFIXO_TEXTO): continue
+        if pd.api.types.is_datetime64_any_dtype(serie.dtype): saida[col] = formatar_datas_serie(serie)
+        elif pd.api.types.is_float_dtype(serie.dtype):
+            saida[col] = _formatar_horas_serie(serie)
+            if coluna_texto(col) in df.columns:
+                original = df[coluna_texto(col)].astype(object)
+                saida[col] = original.where(original.notna(), saida[col])
+        else: saida[col] = serie.astype(str)
+    return pd.DataFrame(saida, index=df.index)
@@ -0,0 +1,173 @@
+"""
+Rotina de gravação (upsert -> unificação -> sincronização) sem Streamlit.
+
+É o mesmo caminho usado pelo botão "GRAVAR TUDO E ATUALIZAR" do app.py e
+pela linha de comando (cli.py). O progresso sai por um callback
+progresso(percentual, mensagem), que cada interface exibe do seu jeito.
+
+Cada etapa concluída entra em ResultadoRotina.concluidas (e é avisada em
+ao_concluir): passando o resultado de uma execução que falhou como
+anterior, a rotina retoma dali (tarefas.py usa isso para repetir tarefas).
+"""
+from armazem import ABA_ARQUIVOS, TABELAS
+from medicao import etapa
+from registros import montar
+from unificacao import (
+    ABA_APROVEITAMENTO,
+    ABA_COMISSOES,
+    ABA_CONSOLIDADO,
+    CHAVES_APROVEITAMENTO,
+    CHAVES_COMISSOES,
+    indicadores_faltando,
+    materializar_indicadores,
+    unificar_completo_local,
+    unificar_incremental_local,
+)
+
+ID_PLANILHA_MESTRA = "1XibBlm2x46Dk5bf4JvfrMepD4gITdaOtTALSgaFcwV0"
+
+ETAPA_COMISSOES = "comissoes"
+ETAPA_APROVEITAMENTO = "aproveitamento"
+ETAPA_UNIFICACAO = "unificacao"
+ETAPA_SINCRONIZACAO = "sincronizacao"
+
+
+class ResultadoRotina:
+    """Como terminou cada etapa; erro_sincronizacao fica com a mensagem se o envio falhar."""
+    __slots__ = ("chaves", "concluidas", "unificado", "sincronizado", "erro_sincronizacao")
+
+    def __init__(self):
+        self.chaves = []
+        self.concluidas = []
+        self.unificado = False
+        self.sincronizado = False
+        self.erro_sincronizacao = None
+
+
+def _sem_progresso(percentual, mensagem):
+    pass
+
+
+def _retomar(anterior, ao_concluir):
+    """Resultado novo com as etapas e chaves de uma execução anterior, e a função que marca etapas."""
+    resultado = ResultadoRotina()
+    if anterior is not None:
+        resultado.chaves, resultado.concluidas = list(anterior.chaves), list(anterior.concluidas)
+
+    def concluir(nome):
+        resultado.concluidas.append(nome)
+        if ao_concluir is not None: ao_concluir(resultado)
+    return resultado, concluir
+
+
+# Aceitam as linhas de texto do parser ou a tabela tipada de um lote (ingestao.py).
+def montar_comissoes(linhas):
+    return montar("comissoes", linhas) if len(linhas) else None
+
+
+def montar_aproveitamento(linhas):
+    return montar("aproveitamento", linhas) if len(linhas) else None
+
+
+def preparar_armazem(armazem, abrir_planilha, ja_importadas=None):
+    """
+    Carrega da Planilha Mestra as tabelas ainda não importadas para este disco
+    (primeira execução do servidor), inclusive o índice de arquivos da aba
+    oculta; sem nada a importar, nem abre a planilha. Se o armazém já tinha
+    linhas gravadas antes da importação e a planilha trouxe chaves que ele
+    não tinha, o Consolidado é refeito inteiro. Com Consolidado e sem
+    indicadores (Consolidado recém-importado ou armazém de uma versão
+    anterior), calcula os indicadores.
+    """
+    ja_importadas = set() if ja_importadas is None else ja_importadas
+    faltando = [tabela for tabela in TABELAS if tabela not in ja_importadas and not armazem.importada(tabela)]
+    sem_indice = ABA_ARQUIVOS not in ja_importadas and not armazem.importada(ABA_ARQUIVOS)
+    if faltando or sem_indice:
+        sh = abrir_planilha()
+        com_dados_locais = any(not armazem.vazio(tabela) for tabela in TABELAS)
+        completadas = 0
+        for tabela in faltando:
+            novas = armazem.importar_da_planilha(sh, tabela)
+            if tabela != ABA_CONSOLIDADO: completadas += novas
+        if sem_indice: armazem.importar_arquivos_da_planilha(sh)
+        # O Consolidado local foi calculado sem as linhas que só estavam na planilha.
+        if com_dados_locais and completadas: processar_unificacao(armazem)
+    if indicadores_faltando(armazem): materializar_indicadores(armazem)
+    ja_importadas.update(TABELAS)
+    ja_importadas.add(ABA_ARQUIVOS)
+    return armazem
+
+
+# Com chaves: recalcula só essas (Data, Técnico). Sem chaves: reconstrução completa (reparo).
+def processar_unificacao(armazem, chaves=None):
+    try:
+        if chaves is None:
+            with etapa("unificação completa"): return unificar_completo_local(armazem)
+        with etapa("unificação incremental", chaves=len(chaves)): return unificar_incremental_local(armazem, chaves)
+    except Exception as e:
+        print(f"Erro unificação: {e}")
+        return False
+
+
+def sincronizar_armazem(armazem, abrir_planilha, resultado, progresso=_sem_progresso, concluir=None):
+    """Envia as pendências do armazém; a falha fica em resultado.erro_sincronizacao."""
+    progresso(70, "☁️ Sincronizando com a Planilha Mestra...")
+    try:
+        armazem.sincronizar(abrir_planilha())
+        resultado.sincronizado = True
+        progresso(100, "☁️ Planilha Mestra sincronizada.")
+        if concluir is not None: concluir(ETAPA_SINCRONIZACAO)
+    except Exception as e:
+        resultado.erro_sincronizacao = str(e)
+    return resultado
+
+
+def executar_rotina(armazem, abrir_planilha, df_com=None, df_aprov=None, progresso=_sem_progresso, sincronizar=True,
+                    anterior=None, ao_concluir=None, arquivos=None):
+    """
+    Grava no armazém, unifica as chaves tocadas e envia as diferenças para a
+    planilha. Erros de gravação sobem; falha no envio fica no resultado (os
+    dados continuam pendentes no armazém para a próxima sincronização).
+    Com sincronizar=False o envio fica para depois. Os registros de arquivos
+    (ResultadoLote.arquivos) entram no índice depois da gravação das linhas.
+    """
+    resultado, concluir = _retomar(anterior, ao_concluir)
+    if df_com is not None and not df_com.empty and ETAPA_COMISSOES not in resultado.concluidas:
+        progresso(10, "💾 Salvando Comissões...")
+        resultado.chaves += armazem.upsert(ABA_COMISSOES, df_com, CHAVES_COMISSOES)
+        concluir(ETAPA_COMISSOES)
+        progresso(30, "💾 Comissões salvas.")
+
+    if df_aprov is not None and not df_aprov.empty and ETAPA_APROVEITAMENTO not in resultado.concluidas:
+        progresso(35, "💾 Salvando Aproveitamento...")
+        resultado.chaves += armazem.upsert(ABA_APROVEITAMENTO, df_aprov, CHAVES_APROVEITAMENTO)
+        concluir(ETAPA_APROVEITAMENTO)
+        progresso(50, "💾 Aproveitamento salvo.")
+
+    # Repetir uma tarefa grava o mesmo registro de novo: o índice é por (tipo, SHA-256).
+    armazem.registrar_arquivos(arquivos)
+
+    resultado.unificado = ETAPA_UNIFICACAO in resultado.concluidas
+    if not resultado.unificado:
+        progresso(55, "🔄 Unificando bases e Padronizando Datas...")
+        resultado.unificado = processar_unificacao(armazem, resultado.chaves)
+        if resultado.unificado: concluir(ETAPA_UNIFICACAO)
+    if not sincronizar:
+        progresso(100, "📦 Gravado no armazém local (sincronização adiada).")
+        return resultado
+    return sincronizar_armazem(armazem, abrir_planilha, resultado, progresso, concluir)
+
+
+def executar_reconstrucao(armazem, abrir_planilha, progresso=_sem_progresso, sincronizar=True, anterior=None, ao_concluir=None):
+    """Recalcula o Consolidado inteiro a partir do armazém e (opcionalmente) envia para a planilha."""
+    resultado, concluir = _retomar(anterior, ao_concluir)
+    resultado.unificado = ETAPA_UNIFICACAO in resultado.concluidas
+    if not resultado.unificado:
+        progresso(20, "🛠️ Reconstruindo Consolidado completo...")
+        resultado.unificado = processar_unificacao(armazem)
+        if not resultado.unificado: return resultado
+        concluir(ETAPA_UNIFICACAO)
+    if not sincronizar:
+        progresso(100, "📦 Consolidado reconstruído no armazém local.")
+        return resultado
+    return sincronizar_armazem(armazem, abrir_planilha, resultado, progresso, concluir)
@@ -0,0 +1,303 @@
+"""
+Fila de tarefas de gravação, executadas fora do script do Streamlit.
+
+O botão "GRAVAR TUDO E ATUALIZAR" (e a reconstrução/sincronização) só
+enfileira a tarefa; uma thread do servidor a executa e grava o andamento
+numa tabela SQLite, que a interface consulta de tempos em tempos. Um
+refresh do navegador não interrompe nada.
+
+    fila = FilaTarefas()
+    fila.iniciar(preparar_armazem, abrir_planilha)    # thread única por servidor
+    tarefa_id = fila.enviar(TIPO_GRAVACAO, df_com, df_aprov, arquivos)
+    fila.buscar(tarefa_id).estado                     # pendente / executando / concluida / falhou
+
+Cada etapa concluída (Comissões, Aproveitamento, unificação, sincronização)
+fica registrada na tarefa: repetir() uma tarefa que falhou retoma da etapa
+que falhou. Enquanto uma tarefa grava, ela segura a trava da planilha
+(tabela travas), que o cli.py também respeita: duas gravações nunca
+reescrevem a mesma planilha ao mesmo tempo, mesmo vindas de processos
+diferentes.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+from medicao import medir
+import rotina
+
+CAMINHO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "tarefas.sqlite")
+
+TIPO_GRAVACAO = "gravacao"
+TIPO_RECONSTRUCAO = "reconstrucao"
+TIPO_SINCRONIZACAO = "sincronizacao"
+NOMES_TIPOS = {
+    TIPO_GRAVACAO: "Gravar tudo e atualizar",
+    TIPO_RECONSTRUCAO: "Reconstruir Consolidado",
+    TIPO_SINCRONIZACAO: "Sincronizar pendências",
+}
+
+PENDENTE, EXECUTANDO, CONCLUIDA, FALHOU = "pendente", "executando", "concluida", "falhou"
+ATIVAS = (PENDENTE, EXECUTANDO)
+
+# A trava vence se não for renovada (processo morto); cada passo de progresso renova.
+VALIDADE_TRAVA = 30 * 60
+INTERVALO_ESPERA = 2.0
+
+_SUFIXOS_ENTRADA = ("comissoes", "aproveitamento", "arquivos")
+_COLUNAS = ("id", "tipo", "estado", "percentual", "mensagem", "concluidas", "chaves", "erro", "medicao", "tentativas", "entrada", "criada", "atualizada")
+
+
+class TravaOcupada(Exception):
+    """A planilha já está sendo gravada por outra tarefa ou processo."""
+
+
+class Tarefa:
+    """Uma linha da tabela tarefas; concluidas e chaves já vêm decodificadas do JSON."""
+    __slots__ = _COLUNAS
+
+    def __init__(self, registro):
+        for coluna, valor in zip(_COLUNAS, registro): setattr(self, coluna, valor)
+        self.concluidas = json.loads(self.concluidas)
+        self.chaves = [tuple(chave) for chave in json.loads(self.chaves)]
+        self.medicao = json.loads(self.medicao) if self.medicao else None
+
+    @property
+    def nome(self):
+        return NOMES_TIPOS.get(self.tipo, self.tipo)
+
+    @property
+    def ativa(self):
+        return self.estado in ATIVAS
+
+
+class FilaTarefas:
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.caminho = caminho
+        self.diretorio_entradas = os.path.join(os.path.dirname(caminho) or ".", "tarefas")
+        self.dono = f"{socket.gethostname()}:{os.getpid()}"
+        self._aviso = threading.Event()
+        self._thread = None
+        os.makedirs(self.diretorio_entradas, exist_ok=True)
+        with self._conectar() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS tarefas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tipo TEXT NOT NULL,
+                    estado TEXT NOT NULL,
+                    percentual INTEGER NOT NULL DEFAULT 0,
+                    mensagem TEXT NOT NULL DEFAULT '',
+                    concluidas TEXT NOT NULL DEFAULT '[]',
+                    chaves TEXT NOT NULL DEFAULT '[]',
+                    erro TEXT,
+                    medicao TEXT,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    entrada TEXT,
+                    criada REAL NOT NULL,
+                    atualizada REAL NOT NULL
+                )""")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_estado ON tarefas (estado, id)")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS travas (
+                    nome TEXT PRIMARY KEY,
+                    dono TEXT NOT NULL,
+                    expira REAL NOT NULL
+                )""")
+        self._recuperar_interrompidas()
+
+    def _conectar(self):
+        return sqlite3.connect(self.caminho, timeout=30)
+
+    # --- TRAVA DA PLANILHA ---
+    def adquirir_trava(self, nome, dono, validade=VALIDADE_TRAVA):
+        """Tenta pegar a trava (ou renová-la, se já for do mesmo dono). Devolve True se conseguiu."""
+        agora = time.time()
+        with self._conectar() as con:
+            con.execute("DELETE FROM travas WHERE nome = ? AND (expira < ? OR dono = ?)", (nome, agora, dono))
+            return con.execute(
+                "INSERT OR IGNORE INTO travas (nome, dono, expira) VALUES (?, ?, ?)", (nome, dono, agora + validade),
+            ).rowcount == 1
+
+    def liberar_trava(self, nome, dono):
+        with self._conectar() as con:
+            con.execute("DELETE FROM travas WHERE nome = ? AND dono = ?", (nome, dono))
+
+    def dono_trava(self, nome):
+        with self._conectar() as con:
+            registro = con.execute("SELECT dono FROM travas WHERE nome = ? AND expira >= ?", (nome, time.time())).fetchone()
+        return registro[0] if registro else None
+
+    @contextmanager
+    def trava(self, nome, dono=None, esperar=False):
+        """Segura a trava durante o bloco; sem esperar, sai com TravaOcupada se ela já tiver dono."""
+        dono = dono or f"{self.dono}:{uuid.uuid4().hex[:8]}"
+        while not self.adquirir_trava(nome, dono):
+            if not esperar: raise TravaOcupada(f"Gravação em andamento por {self.dono_trava(nome) or 'outro processo'}.")
+            time.sleep(INTERVALO_ESPERA)
+        try: yield dono
+        finally: self.liberar_trava(nome, dono)
+
+    # --- FILA ---
+    def enviar(self, tipo, df_com=None, df_aprov=None, arquivos=None):
+        """Enfileira uma tarefa; os DataFrames (e os registros de arquivos) vão para o disco junto com ela. Devolve o id."""
+        entrada = None
+        if df_com is not None or df_aprov is not None:
+            entrada = os.path.join(self.diretorio_entradas, uuid.uuid4().hex)
+            for sufixo, df in zip(_SUFIXOS_ENTRADA, (df_com, df_aprov, arquivos)):
+                if df is not None: df.to_parquet(f"{entrada}_{sufixo}.parquet", index=False)
+        agora = time.time()
+        with self._conectar() as con:
+            tarefa_id = con.execute(
+                "INSERT INTO tarefas (tipo, estado, mensagem, entrada, criada, atualizada) VALUES (?, ?, ?, ?, ?, ?)",
+                (tipo, PENDENTE, "Na fila.", entrada, agora, agora),
+            ).lastrowid
+        self._aviso.set()
+        return tarefa_id
+
+    def buscar(self, tarefa_id):
+        with self._conectar() as con:
+            registro = con.execute(f"SELECT {', '.join(_COLUNAS)} FROM tarefas WHERE id = ?", (tarefa_id,)).fetchone()
+        return Tarefa(registro) if registro else None
+
+    def listar(self, limite=10):
+        """Ativas primeiro (na ordem da fila), depois as mais recentes."""
+        with self._conectar() as con:
+            registros = con.execute(
+                f"SELECT {', '.join(_COLUNAS)} FROM tarefas "
+                f"ORDER BY estado IN ('{PENDENTE}', '{EXECUTANDO}') DESC, "
+                f"CASE WHEN estado IN ('{PENDENTE}', '{EXECUTANDO}') THEN id ELSE -id END LIMIT ?",
+                (limite,),
+            ).fetchall()
+        return [Tarefa(registro) for registro in registros]
+
+    def ativas(self):
+        return [tarefa for tarefa in self.listar() if tarefa.ativa]
+
+    def repetir(self, tarefa_id):
+        """Volta uma tarefa que falhou para a fila; as etapas já concluídas não rodam de novo."""
+        with self._conectar() as con:
+            mudou = con.execute(
+                "UPDATE tarefas SET estado = ?, mensagem = 'Na fila (nova tentativa).', erro = NULL, atualizada = ? "
+                "WHERE id = ? AND estado = ?",
+                (PENDENTE, time.time(), tarefa_id, FALHOU),
+            ).rowcount == 1
+        if mudou: self._aviso.set()
+        return mudou
+
+    def _atualizar(self, tarefa_id, **campos):
+        campos["atualizada"] = time.time()
+        with self._conectar() as con:
+            con.execute(
+                f"UPDATE tarefas SET {', '.join(f'{coluna} = ?' for coluna in campos)} WHERE id = ?",
+                (*campos.values(), tarefa_id),
+            )
+
+    def _pegar_proxima(self):
+        """Marca a primeira tarefa pendente como executando (de forma atômica entre processos)."""
+        with self._conectar() as con:
+            registro = con.execute("SELECT id FROM tarefas WHERE estado = ? ORDER BY id LIMIT 1", (PENDENTE,)).fetchone()
+            if registro is None: return None
+            pegou = con.execute(
+                "UPDATE tarefas SET estado = ?, tentativas = tentativas + 1, atualizada = ? WHERE id = ? AND estado = ?",
+                (EXECUTANDO, time.time(), registro[0], PENDENTE),
+            ).rowcount == 1
+        return self.buscar(registro[0]) if pegou else None
+
+    def _recuperar_interrompidas(self):
+        """Tarefas "executando" sem trava viva morreram com o processo: viram falha, prontas para repetir."""
+        agora = time.time()
+        with self._conectar() as con:
+            vivas = {dono for (dono,) in con.execute("SELECT dono FROM travas WHERE expira >= ?", (agora,))}
+            for (tarefa_id,) in con.execute("SELECT id FROM tarefas WHERE estado = ?", (EXECUTANDO,)).fetchall():
+                if _dono_tarefa(tarefa_id) in vivas: continue
+                con.execute(
+                    "UPDATE tarefas SET estado = ?, erro = ?, mensagem = ?, atualizada = ? WHERE id = ?",
+                    (FALHOU, "Interrompida (servidor reiniciado).", "Interrompida.", agora, tarefa_id),
+                )
+
+    # --- EXECUÇÃO ---
+    def iniciar(self, preparar_armazem, abrir_planilha, nome_trava=rotina.ID_PLANILHA_MESTRA):
+        """Sobe a thread que executa a fila (uma vez por processo)."""
+        if self._thread is not None and self._thread.is_alive(): return
+        self._thread = threading.Thread(
+            target=self._laco, args=(preparar_armazem, abrir_planilha, nome_trava), name="fila-tarefas", daemon=True,
+        )
+        self._thread.start()
+
+    def _laco(self, preparar_armazem, abrir_planilha, nome_trava):
+        while True:
+            tarefa = self._pegar_proxima()
+            if tarefa is None:
+                self._aviso.wait(INTERVALO_ESPERA)
+                self._aviso.clear()
+                continue
+            self.executar(tarefa, preparar_armazem, abrir_planilha, nome_trava)
+
+    def executar(self, tarefa, preparar_armazem, abrir_planilha, nome_trava=rotina.ID_PLANILHA_MESTRA):
+        """Executa uma tarefa já marcada como executando; o resultado fica gravado na tabela."""
+        dono = _dono_tarefa(tarefa.id)
+        while not self.adquirir_trava(nome_trava, dono):
+            self._atualizar(tarefa.id, mensagem=f"⏳ Aguardando outra gravação ({self.dono_trava(nome_trava) or '...'}).")
+            time.sleep(INTERVALO_ESPERA)
+
+        def progresso(percentual, mensagem):
+            self.adquirir_trava(nome_trava, dono)
+            self._atualizar(tarefa.id, percentual=percentual, mensagem=mensagem)
+
+        def ao_concluir(resultado):
+            self._atualizar(tarefa.id, concluidas=json.dumps(resultado.concluidas), chaves=json.dumps(resultado.chaves))
+
+        anterior = rotina.ResultadoRotina()
+        anterior.concluidas, anterior.chaves = list(tarefa.concluidas), list(tarefa.chaves)
+        with medir(tarefa.nome) as medicao:
+            try:
+                resultado = self._rodar(tarefa, preparar_armazem(), abrir_planilha, progresso, anterior, ao_concluir)
+                erro = resultado.erro_sincronizacao
+                if not resultado.unificado: erro = "Erro na unificação." + (f" Sincronização: {erro}" if erro else "")
+            except Exception as e:
+                erro = str(e)
+            finally:
+                self.liberar_trava(nome_trava, dono)
+
+        self._atualizar(
+            tarefa.id, estado=FALHOU if erro else CONCLUIDA, erro=erro,
+            medicao=json.dumps(medicao.como_dict(), ensure_ascii=False),
+            **({} if erro else {"percentual": 100}),
+        )
+        if not erro: self._apagar_entrada(tarefa)
+
+    def _rodar(self, tarefa, armazem, abrir_planilha, progresso, anterior, ao_concluir):
+        if tarefa.tipo == TIPO_GRAVACAO:
+            df_com, df_aprov, arquivos = self._ler_entrada(tarefa)
+            return rotina.executar_rotina(
+                armazem, abrir_planilha, df_com, df_aprov, progresso, anterior=anterior, ao_concluir=ao_concluir, arquivos=arquivos,
+            )
+        if tarefa.tipo == TIPO_RECONSTRUCAO:
+            return rotina.executar_reconstrucao(armazem, abrir_planilha, progresso, anterior=anterior, ao_concluir=ao_concluir)
+        if tarefa.tipo == TIPO_SINCRONIZACAO:
+            anterior.unificado = True
+            return rotina.sincronizar_armazem(armazem, abrir_planilha, anterior, progresso)
+        raise ValueError(f"Tipo de tarefa desconhecido: {tarefa.tipo}")
+
+    def _ler_entrada(self, tarefa):
+        if not tarefa.entrada: return None, None, None
+        return tuple(
+            pd.read_parquet(caminho) if os.path.exists(caminho) else None
+            for caminho in (f"{tarefa.entrada}_{sufixo}.parquet" for sufixo in _SUFIXOS_ENTRADA)
+        )
+
+    def _apagar_entrada(self, tarefa):
+        if not tarefa.entrada: return
+        for sufixo in _SUFIXOS_ENTRADA:
+            try: os.remove(f"{tarefa.entrada}_{sufixo}.parquet")
+            except FileNotFoundError: pass
+
+
+def _dono_tarefa(tarefa_id):
+    return f"tarefa {tarefa_id}"
@@ -0,0 +1,75 @@
+"""
+Ordem de detecção de decodificacao.py: BOM -> UTF-16/32 por bytes nulos ->
+<meta> utf-16/32 em bytes ASCII ignorado -> ascii -> utf-8 -> charset
+declarado -> latin-1.
+"""
+import codecs
+
+import pytest
+
+from decodificacao import decodificar, detectar_codificacao
+
+HTML = "<html><head>{meta}</head><body><td>Técnico – João</td></body></html>"
+META_1252 = '<meta charset="windows-1252">'
+
+
+@pytest.mark.parametrize("bom, codec, esperada", [
+    (codecs.BOM_UTF8, "utf-8", "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16-le", "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be", "utf-16-be"),
+    # O BOM do UTF-32 LE começa com o do UTF-16 LE: tem de ser testado antes.
+    (codecs.BOM_UTF32_LE, "utf-32-le", "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be", "utf-32-be"),
+])
+def test_bom(bom, codec, esperada):
+    texto = HTML.format(meta="")
+    assert decodificar(bom + texto.encode(codec)) == (texto, esperada)
+    assert detectar_codificacao(bom + texto.encode(codec))[1] == len(bom)
+
+
+@pytest.mark.parametrize("codec", ["utf-16-le", "utf-16-be"])
+def test_utf16_sem_bom_pelos_bytes_nulos(codec):
+    texto = HTML.format(meta="")
+    assert decodificar(texto.encode(codec)) == (texto, codec)
+
+
+@pytest.mark.parametrize("declarado", ["utf-16", "UTF-16LE", "utf-32"])
+def test_meta_utf16_ou_utf32_em_bytes_ascii_vale_utf8(declarado):
+    meta = f'<meta http-equiv="Content-Type" content="text/html; charset={declarado}">'
+    assert detectar_codificacao(HTML.format(meta=meta).encode("utf-8")) == ("utf-8", 0)
+    texto = HTML.format(meta=meta)
+    assert decodificar(texto.encode("utf-8")) == (texto, "utf-8")
+    # Nem utf-8 válido: cai no latin-1, não num decode utf-16 que embaralharia tudo.
+    assert decodificar(texto.encode("latin-1", "replace"))[1] == "latin-1"
+
+
+def test_so_ascii():
+    dados = b"<html><td>ABC 12,50</td></html>"
+    assert decodificar(dados) == (dados.decode("ascii"), "ascii")
+
+
+def test_utf8_valido_vence_o_charset_declarado():
+    texto = HTML.format(meta=META_1252)
+    assert decodificar(texto.encode("utf-8")) == (texto, "utf-8")
+
+
+def test_charset_declarado_windows_1252():
+    # Mudança em relação ao fallback antigo (latin-1): 0x96 vira "–" e não U+0096.
+    texto, codificacao = decodificar(HTML.format(meta=META_1252).encode("cp1252"))
+    assert codificacao == "cp1252"
+    assert "Técnico – João" in texto and "\x96" not in texto
+
+
+def test_sem_charset_cai_no_latin1():
+    texto, codificacao = decodificar(HTML.format(meta="").encode("cp1252"))
+    assert codificacao == "latin-1"
+    assert "Técnico \x96 João" in texto
+
+
+@pytest.mark.parametrize("meta", ['<meta charset="nao-existe">', META_1252])
+def test_charset_desconhecido_ou_que_nao_decodifica_cai_no_latin1(meta):
+    # 0x81 não existe no windows-1252.
+    dados = HTML.format(meta=meta).encode("latin-1", "replace") + b"\x81"
+    texto, codificacao = decodificar(dados)
+    assert codificacao == "latin-1"
+    assert texto.endswith("\x81")
@@ -0,0 +1,71 @@
+"""
+Paridade entre os motores de leitura: o stream (padrão) e o bs4 (referência,
+escolhido na barra lateral quando o stream falha) têm de gerar as mesmas
+linhas e, depois da tipagem, as mesmas tabelas.
+"""
+import pandas as pd
+import pytest
+
+from benchmarks.gerador_relatorios import gerar_lote
+from decodificacao import decodificar
+from ingestao import processar_lote
+from parsers import EXTRATORES, MOTOR_BS4, MOTOR_STREAM
+
+# Marcação fora do padrão do gerador: tags em maiúsculas, entidades, tags dentro
+# das células, comentários, <td> sem fechar e a data depois dos registros.
+COMISSOES_IRREGULAR = """<HTML><BODY><TABLE>
+<TR><TD>OS 123</TD><TD>JOS&Eacute; DA SILVA</TD><TD>1,00</TD></TR>
+<!-- <tr><td>TOTAL DO FUNCIONARIO: XXX</td></tr> -->
+<tr><td colspan=4>TOTAL DO FUNCIONARIO: <b>ABC</b> JOS&Eacute;</td></tr>
+<tr><td>HORAS VENDIDAS:<td>12,50 HORAS<td>VALOR:<td>R$ 1,00</tr>
+<tr><td>Total do Funcionario: abd João</td></tr>
+<tr><td>Horas Vendidas:</td><td><span>1.234,50</span> horas</td></tr>
+<tr><td>TOTAL DA FILIAL</td></tr>
+<tr><td>TOTAL DO FUNCIONARIO: ZZZ</td></tr><tr><td>HORAS VENDIDAS:</td><td>9,99 HORAS</td></tr>
+</TABLE><p>Per&iacute;odo de 01/12/2025 at&eacute; <b>08/12/2025</b></p></BODY></HTML>
+""".encode("utf-8")
+
+APROVEITAMENTO_IRREGULAR = """<html><body><table>
+<tr><td>MEC&Acirc;NICO: AAA - JOS&Eacute;</td></tr>
+<tr><td>01/12/25 SEG<td>1,00<td>2,00<td>3,00</tr>
+<TR><TD><i>02/12/2025</i> TER</TD><TD>&nbsp;4,00</TD><TD>5,00</TD><TD>6,00</TD></TR>
+<tr><td>03/12/25</td><td>7,00</td><td>8,00</td></tr>
+<tr><td>TOT.MEC.:</td><td>5,00</td></tr>
+<tr><td>04/12/25</td><td>1,00</td><td>1,00</td><td>1,00</td></tr>
+<tr><td>MECANICO: BBB</td></tr>
+<tr><td>05/12/25 SEX</td><td>0,50</td><td>abc</td><td></td></tr>
+<tr><td>TOTAL FILIAL:</td></tr>
+<tr><td>06/12/25</td><td>9,00</td><td>9,00</td><td>9,00</td></tr>
+</table></body></html>
+""".encode("latin-1", "xmlcharrefreplace")
+
+
+def _relatorios():
+    comissoes, aproveitamento = gerar_lote(tecnicos=6, dias=5, arquivos=2, semente=3)
+    return {
+        "comissoes": comissoes + [("irregular_comissoes.html", COMISSOES_IRREGULAR)],
+        "aproveitamento": aproveitamento + [("irregular_aproveitamento.html", APROVEITAMENTO_IRREGULAR)],
+    }
+
+
+RELATORIOS = _relatorios()
+
+
+@pytest.mark.parametrize("tipo", sorted(EXTRATORES))
+def test_motores_geram_as_mesmas_linhas(tipo):
+    for nome, dados in RELATORIOS[tipo]:
+        texto, _ = decodificar(dados)
+        stream = list(EXTRATORES[tipo](nome, texto, MOTOR_STREAM))
+        bs4 = list(EXTRATORES[tipo](nome, texto, MOTOR_BS4))
+        assert stream, nome
+        assert stream == bs4, nome
+
+
+@pytest.mark.parametrize("tipo", sorted(EXTRATORES))
+def test_motores_geram_as_mesmas_tabelas(tipo):
+    stream = processar_lote(tipo, RELATORIOS[tipo], MOTOR_STREAM, workers=1)
+    bs4 = processar_lote(tipo, RELATORIOS[tipo], MOTOR_BS4, workers=1)
+    assert not stream.erros and not bs4.erros
+    assert len(stream.tabela)
+    pd.testing.assert_frame_equal(stream.tabela, bs4.tabela)
+    pd.testing.assert_frame_equal(stream.arquivos, bs4.arquivos)
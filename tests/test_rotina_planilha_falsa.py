@@ -0,0 +1,219 @@
+"""
+Fluxo completo do cli/rotina contra a planilha falsa (planilha_falsa.py):
+relatórios gerados, armazém e caches em tmp_path, nenhuma chamada de rede.
+"""
+from datetime import date
+
+import pytest
+
+import armazem
+import cli
+import conexao
+import ingestao
+import rotina
+from benchmarks.gerador_relatorios import gerar_lote
+from cache import CacheLeitura
+from indicadores import CHAVES_INDICADORES, TABELAS_INDICADORES, particoes_periodo, recortar_periodo
+from planilha_falsa import ClienteFalso, CotaFalsa, ErroApiFalso
+from tarefas import FilaTarefas
+
+
+class Ambiente:
+    """cli.main com a planilha falsa e esperas instantâneas; guarda as conexões abertas."""
+
+    def __init__(self, tmp_path, monkeypatch, cota=None):
+        self.tmp_path = tmp_path
+        self.cliente = ClienteFalso(cota)
+        self.conexoes = []
+        self.esperas = []
+        cache = CacheLeitura(str(tmp_path / "leituras.sqlite"))
+
+        def nova_conexao(fabrica):
+            conexao_falsa = conexao.ConexaoPlanilha(fabrica, dormir=self.esperas.append)
+            self.conexoes.append(conexao_falsa)
+            return conexao_falsa
+
+        monkeypatch.setattr(cli, "criar_cliente", lambda info: self.cliente)
+        monkeypatch.setattr(cli, "carregar_credenciais", lambda caminho: {})
+        monkeypatch.setattr(cli, "CacheLeitura", lambda: cache)
+        monkeypatch.setattr(cli, "FilaTarefas", lambda: FilaTarefas(str(tmp_path / "tarefas.sqlite")))
+        monkeypatch.setattr(cli, "ConexaoPlanilha", nova_conexao)
+
+    def pasta(self, nome, arquivos):
+        pasta = self.tmp_path / nome
+        pasta.mkdir()
+        for arquivo, conteudo in arquivos: (pasta / arquivo).write_bytes(conteudo)
+        return str(pasta)
+
+    def rodar(self, *argumentos, armazem_local="armazem"):
+        return cli.main([*argumentos, "--armazem", str(self.tmp_path / armazem_local), "--workers", "1"])
+
+    @property
+    def planilha(self):
+        return self.cliente.open_by_key(rotina.ID_PLANILHA_MESTRA)
+
+    def abas(self, prefixo):
+        return {titulo: aba.get_all_values() for titulo, aba in sorted(self.planilha.abas.items()) if titulo.startswith(prefixo)}
+
+    def linhas(self, prefixo):
+        """Cabeçalho e linhas ordenadas de cada aba: a reconstrução reescreve em outra ordem."""
+        return {titulo: (valores[:1], sorted(valores[1:])) for titulo, valores in self.abas(prefixo).items()}
+
+    @property
+    def escritas(self):
+        return sum(n for metodo, n in self.conexoes[-1].total.items() if metodo in conexao.METODOS_ESCRITA)
+
+
+class ArmazemNovo:
+    """Armazém em disco vazio, preparado contra a planilha falsa e sem sincronizar."""
+
+    def __init__(self, ambiente, nome):
+        self.armazem = armazem.ArmazemLocal(str(ambiente.tmp_path / nome))
+        self.ambiente = ambiente
+        rotina.preparar_armazem(self.armazem, lambda: ambiente.planilha)
+
+    def gravar(self, comissoes, aproveitamento):
+        com = ingestao.processar_lote("comissoes", comissoes, workers=1)
+        aprov = ingestao.processar_lote("aproveitamento", aproveitamento, workers=1)
+        return rotina.executar_rotina(self.armazem, lambda: self.ambiente.planilha, com.tabela, aprov.tabela, sincronizar=False)
+
+
+@pytest.fixture
+def ambiente(tmp_path, monkeypatch):
+    return Ambiente(tmp_path, monkeypatch)
+
+
+@pytest.fixture(scope="module")
+def relatorios():
+    return gerar_lote(tecnicos=4, dias=10, arquivos=3, semente=7)
+
+
+def test_incremental_igual_a_reconstrucao(ambiente, relatorios):
+    comissoes, aproveitamento = relatorios
+    for i in range(3):
+        assert ambiente.rodar(
+            "--comissoes", ambiente.pasta(f"com{i}", comissoes[i::3]),
+            "--aproveitamento", ambiente.pasta(f"apr{i}", aproveitamento[i::3]),
+        ) == 0
+    incremental = ambiente.linhas("Consolidado")
+    local = armazem.ArmazemLocal(str(ambiente.tmp_path / "armazem")).ler("Consolidado")
+    assert incremental and sum(len(linhas) for _, linhas in incremental.values()) == len(local)
+
+    assert ambiente.rodar("--reconstruir") == 0
+    assert ambiente.linhas("Consolidado") == incremental
+
+    # Um armazém novo que lê tudo de uma vez chega ao mesmo Consolidado.
+    completo = ArmazemNovo(ambiente, "completo")
+    completo.gravar(comissoes, aproveitamento)
+    assert rotina.executar_reconstrucao(completo.armazem, lambda: ambiente.planilha, sincronizar=False).unificado
+    ordem = ["Data", "Técnico"]
+    esperado = local.sort_values(ordem).reset_index(drop=True)
+    obtido = completo.armazem.ler("Consolidado")[list(local.columns)].sort_values(ordem).reset_index(drop=True)
+    assert obtido.astype(str).equals(esperado.astype(str))
+
+
+def test_repete_apos_429_e_5xx(tmp_path, monkeypatch, relatorios):
+    comissoes, aproveitamento = relatorios
+    cota = CotaFalsa(falhas=[429, 503])
+    ambiente = Ambiente(tmp_path, monkeypatch, cota)
+    assert ambiente.rodar("--comissoes", ambiente.pasta("com", comissoes), "--aproveitamento", ambiente.pasta("apr", aproveitamento)) == 0
+    assert cota.recusadas == 2
+    assert ambiente.conexoes[-1].total["open_by_key"] == 3
+    assert ambiente.abas("Consolidado")
+    assert not armazem.ArmazemLocal(str(tmp_path / "armazem")).pendencias()
+
+
+def test_arquivos_conhecidos_sao_ignorados(ambiente, relatorios):
+    comissoes, aproveitamento = relatorios
+    argumentos = ("--comissoes", ambiente.pasta("com", comissoes), "--aproveitamento", ambiente.pasta("apr", aproveitamento))
+    assert ambiente.rodar(*argumentos) == 0
+    abas = ambiente.abas("")
+    assert ambiente.escritas
+
+    assert ambiente.rodar(*argumentos) == 0
+    assert ambiente.escritas == 0
+    assert ambiente.abas("") == abas
+
+
+def test_armazem_vazio_importa_a_planilha(ambiente, relatorios):
+    comissoes, aproveitamento = relatorios
+    assert ambiente.rodar("--comissoes", ambiente.pasta("com1", comissoes[:2]), "--aproveitamento", ambiente.pasta("apr1", aproveitamento[:2])) == 0
+    antes = {titulo: len(valores) for titulo, valores in ambiente.abas("Consolidado").items()}
+
+    # Outra máquina, disco vazio: grava sem sincronizar e depois reconstrói.
+    argumentos = ("--comissoes", ambiente.pasta("com2", comissoes[2:]), "--aproveitamento", ambiente.pasta("apr2", aproveitamento[2:]))
+    assert ambiente.rodar(*argumentos, "--sem-sincronizar", armazem_local="outro") == 0
+    assert ambiente.rodar("--reconstruir", armazem_local="outro") == 0
+    depois = {titulo: len(valores) for titulo, valores in ambiente.abas("Consolidado").items()}
+    assert all(depois[titulo] >= linhas for titulo, linhas in antes.items())
+    assert sum(depois.values()) > sum(antes.values())
+    assert sum(depois.values()) - len(depois) == len(armazem.ArmazemLocal(str(ambiente.tmp_path / "outro")).ler("Consolidado"))
+
+    # Um armazém que gravou sem importar não pode reescrever as abas.
+    sem_importar = armazem.ArmazemLocal(str(ambiente.tmp_path / "sem_importar"))
+    com = ingestao.processar_lote("comissoes", comissoes[:1], workers=1)
+    aprov = ingestao.processar_lote("aproveitamento", aproveitamento[:1], workers=1)
+    rotina.executar_rotina(sem_importar, lambda: ambiente.planilha, com.tabela, aprov.tabela, sincronizar=False)
+    with pytest.raises(RuntimeError):
+        sem_importar.sincronizar(ambiente.planilha)
+    assert {titulo: len(valores) for titulo, valores in ambiente.abas("Consolidado").items()} == depois
+
+
+def test_armazem_vazio_calcula_os_indicadores(ambiente, relatorios):
+    comissoes, aproveitamento = relatorios
+    assert ambiente.rodar("--comissoes", ambiente.pasta("com", comissoes), "--aproveitamento", ambiente.pasta("apr", aproveitamento)) == 0
+    assert ambiente.rodar("--reconstruir") == 0
+    reconstruido = armazem.ArmazemLocal(str(ambiente.tmp_path / "armazem"))
+
+    # Servidor novo: os indicadores não vão para a planilha, saem do Consolidado importado.
+    novo = ArmazemNovo(ambiente, "novo").armazem
+    assert len(novo.ler("Consolidado")) == len(reconstruido.ler("Consolidado"))
+    for tabela in TABELAS_INDICADORES.values():
+        obtido = novo.ler(tabela).sort_values(CHAVES_INDICADORES).reset_index(drop=True)
+        esperado = reconstruido.ler(tabela).sort_values(CHAVES_INDICADORES).reset_index(drop=True)
+        assert not obtido.empty
+        assert obtido.astype(str).equals(esperado.astype(str))
+
+
+def test_semanas_em_todos_os_meses_que_tocam(ambiente):
+    # 22/12/2025 a 11/01/2026: a semana de 29/12 começa em dezembro e termina em janeiro.
+    comissoes, aproveitamento = gerar_lote(tecnicos=3, dias=21, arquivos=3, semente=11, inicio=date(2025, 12, 22))
+    assert ambiente.rodar("--comissoes", ambiente.pasta("com", comissoes), "--aproveitamento", ambiente.pasta("apr", aproveitamento)) == 0
+
+    # Servidor novo: a visão por semana sai dos indicadores calculados ao preparar o armazém.
+    novo = ArmazemNovo(ambiente, "novo").armazem
+    semana = TABELAS_INDICADORES["semana"]
+
+    def semanas(meses):
+        df = recortar_periodo(novo.ler(semana, particoes_periodo("semana", meses)), "semana", meses)
+        return [f"{periodo:%d/%m/%Y}" for periodo in sorted(set(df["Período"]))]
+
+    assert semanas(["2025-12"]) == ["22/12/2025", "29/12/2025"]
+    assert semanas(["2026-01"]) == ["29/12/2025", "05/01/2026"]
+    assert semanas(["2025-12", "2026-01"]) == ["22/12/2025", "29/12/2025", "05/01/2026"]
+
+
+def test_falha_ao_renomear_aba_antiga_vira_erro_da_sincronizacao(ambiente, relatorios, monkeypatch):
+    comissoes, aproveitamento = relatorios
+    sh = ambiente.planilha
+    antiga = sh.add_worksheet("Comissoes", 100, 10)
+    antiga.update([["Data Processamento", "Nome do Arquivo", "Sigla Técnico", "Horas Vendidas"], ["01/11/2025", "velho.html", "ZZZ", "1,50"]])
+    novo = ArmazemNovo(ambiente, "novo")
+
+    renomear = type(sh).batch_update
+    def recusar_nomes(self, body):
+        if any("updateSheetProperties" in pedido for pedido in body.get("requests", [])): raise ErroApiFalso(400, "Título inválido")
+        return renomear(self, body)
+    monkeypatch.setattr(type(sh), "batch_update", recusar_nomes)
+    resultado = novo.gravar(comissoes[:1], aproveitamento[:1])
+    rotina.sincronizar_armazem(novo.armazem, lambda: sh, resultado)
+    assert not resultado.sincronizado and "Título inválido" in resultado.erro_sincronizacao
+    assert not novo.armazem.pendencias()
+    assert "Comissoes" in sh.abas and ambiente.abas("Comissoes_")
+
+    # Na próxima sincronização com envio, a troca de nome é refeita.
+    monkeypatch.setattr(type(sh), "batch_update", renomear)
+    resultado = novo.gravar(comissoes[1:2], aproveitamento[1:2])
+    rotina.sincronizar_armazem(novo.armazem, lambda: sh, resultado)
+    assert resultado.sincronizado
+    assert "Comissoes (antiga)" in sh.abas and "Comissoes" not in sh.abas
@@ -0,0 +1,216 @@
+"""
+Unificação de Comissoes e Aproveitamento no Consolidado, sobre o armazém
+local (armazem.py), sem nenhuma chamada à API:
+
+  * completo: relê as duas tabelas inteiras e substitui o Consolidado (reparo);
+  * incremental: recalcula só as chaves (Data, Técnico) tocadas no upsert
+    atual, lendo só as partições (meses) dessas chaves, e corrige apenas
+    essas linhas do Consolidado.
+
+As colunas já chegam tipadas (registros.py): as horas entram no merge sem
+passar de novo por texto e as chaves são montadas por valor distinto. O
+envio para as abas mensais da planilha fica com a sincronização.
+
+As duas também mantêm os indicadores por técnico (indicadores.py): a
+completa os recalcula inteiros, a incremental só nos dias, semanas e meses
+das chaves tocadas.
+"""
+import pandas as pd
+from gspread.utils import numericise_all
+
+from armazem import PARTICAO_SEM_DATA, mes_da_data
+from indicadores import TABELAS_INDICADORES, agregar, inicio_periodo, meses_cobertos
+from medicao import cronometrado, etapa
+from normalizacao import (
+    converter_br_para_float_serie,
+    escolher_chave,
+    padronizar_data_quatro_digitos,
+    padronizar_datas_serie,
+)
+from registros import ESQUEMAS, converter_datas_serie, formatar_datas_serie
+
+ABA_COMISSOES = "Comissoes"
+ABA_APROVEITAMENTO = "Aproveitamento"
+ABA_CONSOLIDADO = "Consolidado"
+CHAVES_COMISSOES = ["Data Processamento", "Sigla Técnico"]
+CHAVES_APROVEITAMENTO = ["Data", "Técnico"]
+CHAVES_CONSOLIDADO = ["Data", "Técnico"]
+COLUNAS_NUMERICAS = ['Horas Vendidas', 'Disp', 'TP', 'TG']
+COLUNAS_CONSOLIDADO = ['Data', 'Técnico', 'Horas Vendidas', 'Disp', 'TP', 'TG']
+
+
+# --- CHAVES ---
+def chave_consolidada(data, tecnico):
+    """Chave (Data, Técnico) do Consolidado para uma chave crua de Comissoes/Aproveitamento."""
+    # O técnico passa pelo mesmo numericise do get_all_records usado na reconstrução completa.
+    return padronizar_data_quatro_digitos(data), str(numericise_all([tecnico])[0])
+
+
+def chaves_consolidadas(chaves):
+    return {chave_consolidada(data, tecnico) for data, tecnico in chaves}
+
+
+# --- CONSOLIDAÇÃO ---
+@cronometrado("normalização")
+def normalizar(df_com, df_aprov):
+    """Seleciona as colunas do Consolidado e padroniza datas e números dos dois lados."""
+    # Limpeza e Padronização
+    df_com.columns = [c.strip() for c in df_com.columns]
+    df_aprov.columns = [c.strip() for c in df_aprov.columns]
+    renomear_comissao = {"Data Processamento": "Data", "Sigla Técnico": "Técnico"}
+    df_com = df_com.rename(columns=renomear_comissao)
+
+    cols_com = ['Data', 'Técnico', 'Horas Vendidas']
+    df_com = df_com[[c for c in cols_com if c in df_com.columns]].copy()
+    cols_aprov = ['Data', 'Técnico', 'Disp', 'TP', 'TG']
+    df_aprov = df_aprov[[c for c in cols_aprov if c in df_aprov.columns]].copy()
+
+    # --- APLICA A CORREÇÃO DE DATA AQUI ---
+    # Antes de fazer o Merge, garantimos que "25" vira "2025"
+    if 'Data' in df_com.columns:
+        df_com['Data'] = padronizar_datas_serie(df_com['Data'])
+
+    if 'Data' in df_aprov.columns:
+        df_aprov['Data'] = padronizar_datas_serie(df_aprov['Data'])
+
+    # Conversão Numérica Inicial
+    for col in COLUNAS_NUMERICAS:
+        if col in df_com.columns: df_com[col] = converter_br_para_float_serie(df_com[col])
+        if col in df_aprov.columns: df_aprov[col] = converter_br_para_float_serie(df_aprov[col])
+
+    return df_com, df_aprov
+
+
+@cronometrado("merge")
+def juntar(df_com, df_aprov, centesimos=True):
+    """
+    Merge por (Data, Técnico) de dois lados já normalizados, com a correção /100.
+    Com centesimos=False os números já vêm em horas (armazém tipado) e não são divididos.
+    """
+    # Merge
+    df_com['Key_D'] = df_com['Data'].astype(str)
+    df_com['Key_T'] = df_com['Técnico'].astype(str)
+    df_aprov['Key_D'] = df_aprov['Data'].astype(str)
+    df_aprov['Key_T'] = df_aprov['Técnico'].astype(str)
+
+    df_final = pd.merge(
+        df_com, df_aprov,
+        left_on=['Key_D', 'Key_T'], right_on=['Key_D', 'Key_T'],
+        how='outer', suffixes=('_C', '_A')
+    )
+    # No pandas 3 as colunas de texto têm dtype str e recusam o 0.0; como object ficam como antes.
+    df_final = df_final.astype({c: object for c in df_final.columns if pd.api.types.is_string_dtype(df_final[c].dtype)})
+    df_final.fillna(0.0, inplace=True)
+
+    # Consolidar Chaves (Data e Técnico)
+    if df_final.empty: return pd.DataFrame(columns=COLUNAS_CONSOLIDADO)
+    df_final['Data'] = escolher_chave(df_final['Data_C'], df_final['Data_A'])
+    df_final['Técnico'] = escolher_chave(df_final['Técnico_C'], df_final['Técnico_A'])
+
+    df_final = df_final[[c for c in COLUNAS_CONSOLIDADO if c in df_final.columns]]
+
+    # --- A REGRA DE OURO (CORREÇÃO DECIMAL) ---
+    # Divide todas as colunas numéricas por 100 antes de salvar no Consolidado.
+    if not centesimos: return df_final
+    for col in COLUNAS_NUMERICAS:
+        if col in df_final.columns:
+            df_final[col] = df_final[col] / 100.0
+
+    return df_final
+
+
+def consolidar(df_com, df_aprov, centesimos=True):
+    """Junta Comissões e Aproveitamento por (Data, Técnico) e aplica a correção /100 (se centesimos)."""
+    return juntar(*normalizar(df_com, df_aprov), centesimos=centesimos)
+
+
+# --- MODOS DE UNIFICAÇÃO ---
+def _tecnicos_como_get_all_records(serie):
+    """Técnico com o numericise do get_all_records ('007' -> 7), calculado uma vez por técnico."""
+    codigos, distintos = pd.factorize(serie.astype(str))
+    valores = pd.Series(numericise_all(list(distintos)), dtype=object).to_numpy()
+    return pd.Series(valores[codigos], index=serie.index, dtype=object)
+
+
+def _para_consolidar(df, tabela):
+    """
+    Tabela tipada do armazém -> o que consolidar() recebe das abas: data em
+    dd/mm/aaaa e técnico como o get_all_records entrega; os números seguem
+    float, já em horas (consolidar com centesimos=False).
+    """
+    esquema = ESQUEMAS[tabela.lower()]
+    if df.empty: return pd.DataFrame(columns=esquema.colunas)
+    df = df.copy()
+    df[esquema.data] = formatar_datas_serie(df[esquema.data])
+    df[esquema.tecnico] = _tecnicos_como_get_all_records(df[esquema.tecnico])
+    return df
+
+
+def unificar_completo_local(armazem):
+    """Recalcula todo o Consolidado a partir do armazém e marca a aba para reenvio completo."""
+    df_com = armazem.ler(ABA_COMISSOES)
+    df_aprov = armazem.ler(ABA_APROVEITAMENTO)
+
+    if df_com.empty or df_aprov.empty: return False
+
+    df_final = consolidar(_para_consolidar(df_com, ABA_COMISSOES), _para_consolidar(df_aprov, ABA_APROVEITAMENTO), centesimos=False)
+    armazem.substituir(ABA_CONSOLIDADO, df_final)
+    materializar_indicadores(armazem)
+    return True
+
+
+def _filtrar_chaves(df, tabela, alvo):
+    """Só as linhas cuja chave (data, técnico), já como no Consolidado, está em alvo."""
+    df = _para_consolidar(df, tabela)
+    if df.empty: return df
+    esquema = ESQUEMAS[tabela.lower()]
+    chaves = zip(df[esquema.data].tolist(), df[esquema.tecnico].astype(str).tolist())
+    return df[[chave in alvo for chave in chaves]]
+
+
+def unificar_incremental_local(armazem, chaves):
+    """
+    Recalcula apenas as chaves (data, técnico) informadas, lendo só as partições
+    (meses) dessas chaves. Sem Consolidado no armazém, cai na reconstrução completa.
+    """
+    if armazem.vazio(ABA_CONSOLIDADO): return unificar_completo_local(armazem)
+
+    alvo = chaves_consolidadas(chaves)
+    if not alvo: return True
+
+    meses = sorted(set(mes_da_data(pd.Series([data for data, _ in alvo], dtype=object))) | {PARTICAO_SEM_DATA})
+    df_com = _filtrar_chaves(armazem.ler(ABA_COMISSOES, meses), ABA_COMISSOES, alvo)
+    df_aprov = _filtrar_chaves(armazem.ler(ABA_APROVEITAMENTO, meses), ABA_APROVEITAMENTO, alvo)
+    df_final = consolidar(df_com, df_aprov, centesimos=False)
+    if df_final.empty: return True
+
+    armazem.upsert(ABA_CONSOLIDADO, df_final.fillna(0.0), CHAVES_CONSOLIDADO)
+    materializar_indicadores(armazem, [data for data, _ in alvo])
+    return True
+
+
+# --- INDICADORES (ARMAZÉM LOCAL) ---
+def indicadores_faltando(armazem):
+    """True se há Consolidado mas alguma tabela de indicadores ainda não foi calculada."""
+    return not armazem.vazio(ABA_CONSOLIDADO) and any(armazem.vazio(tabela) for tabela in TABELAS_INDICADORES.values())
+
+
+def materializar_indicadores(armazem, datas=None):
+    """
+    Recalcula as tabelas de indicadores a partir do Consolidado do armazém.
+    Com datas (dd/mm/aaaa), só os períodos que as contêm, lendo só os meses
+    que cobrem esses períodos; sem datas (ou sem indicadores ainda), tudo.
+    """
+    if datas is None or indicadores_faltando(armazem):
+        with etapa("indicadores (completo)"):
+            df_cons = armazem.ler(ABA_CONSOLIDADO)
+            for granularidade, tabela in TABELAS_INDICADORES.items():
+                armazem.substituir(tabela, agregar(df_cons, granularidade))
+        return
+
+    datas = converter_datas_serie(pd.Series(sorted(set(datas)), dtype=object)).dropna()
+    if datas.empty: return
+    with etapa("indicadores", datas=len(datas)):
+        df_cons = armazem.ler(ABA_CONSOLIDADO, meses_cobertos(datas))
+        for granularidade, tabela in TABELAS_INDICADORES.items():
+            armazem.upsert(tabela, agregar(df_cons, granularidade, set(inicio_periodo(datas, granularidade))))